@@ -217,3 +217,36 @@ def test_swagger_ui():
 def test_redoc_ui():
     response = client.get("/api/redoc/")
     assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_create_task_with_idempotency_key(api_key, github_repo):
+    def post():
+        return client.post(
+            "/api/tasks/",
+            {"prompt": "Hello, World!", "github_repo": github_repo.full_name},
+            headers={"X-Api-Key": api_key, "Idempotency-Key": "request-1"},
+            format="json",
+        )
+
+    first = post()
+    retry = post()
+
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+    assert Task.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_idempotency_keys_are_scoped_per_user(api_key, github_repo):
+    _, other_key = UserAPIKey.objects.create_key(name="other", username="otheruser")
+    for key in [api_key, other_key]:
+        response = client.post(
+            "/api/tasks/",
+            {"prompt": "Hello, World!", "github_repo": github_repo.full_name},
+            headers={"X-Api-Key": key, "Idempotency-Key": "request-1"},
+            format="json",
+        )
+        assert response.status_code == 201
+    assert Task.objects.count() == 2
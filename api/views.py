@@ -1,6 +1,8 @@
+from django.db import IntegrityError, transaction
 from drf_spectacular.utils import (
     extend_schema,
     OpenApiExample,
+    OpenApiParameter,
     OpenApiResponse,
     inline_serializer,
 )
@@ -19,6 +21,7 @@ from webhooks.models import GithubRepository
 
 # Number of tasks to show in the task list
 TASK_LIST_LIMIT = 10
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
 
 
 class HasUserAPIKey(BaseHasAPIKey):
@@ -77,10 +80,30 @@ class TaskViewSet(APIView):
         serializer = TaskSerializer(tasks, many=True)
         return Response(serializer.data)
 
+    @staticmethod
+    def get_task_by_idempotency_key(github_user, idempotency_key):
+        return Task.objects.filter(
+            github_user=github_user, idempotency_key=idempotency_key
+        ).first()
+
     @extend_schema(
         request=PromptSerializer,
+        parameters=[
+            OpenApiParameter(
+                "Idempotency-Key",
+                str,
+                OpenApiParameter.HEADER,
+                required=False,
+                description="Unique key for the task. Retrying a request with the same key "
+                "returns the task created by the first request instead of creating another one.",
+            )
+        ],
         responses={
             status.HTTP_201_CREATED: TaskSerializer,
+            status.HTTP_200_OK: OpenApiResponse(
+                response=TaskSerializer,
+                description="A task with the given Idempotency-Key already exists.",
+            ),
             status.HTTP_404_NOT_FOUND: OpenApiResponse(
                 response=inline_serializer(
                     name="NotFound",
@@ -126,6 +149,20 @@ class TaskViewSet(APIView):
     def post(self, request):
         """Create a new task."""
         api_key = UserAPIKey.objects.get_from_key(request.headers["X-Api-Key"])
+        idempotency_key = request.headers.get("Idempotency-Key")
+        if idempotency_key and len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {
+                    "error": f"Idempotency-Key must not be longer than {IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if idempotency_key:
+            existing_task = self.get_task_by_idempotency_key(
+                api_key.username, idempotency_key
+            )
+            if existing_task:
+                return Response(TaskSerializer(existing_task).data)
         serializer = PromptSerializer(data=request.data)
         if serializer.is_valid():
             github_user = api_key.username
@@ -156,21 +193,30 @@ class TaskViewSet(APIView):
             elif serializer.validated_data.get("branch"):
                 branch = serializer.validated_data["branch"]
 
-            task = Task.objects.create(
-                title="A title",
-                user_request=serializer.validated_data["prompt"],
-                installation_id=repo.installation.installation_id,
-                github_project=repo.full_name,
-                issue_number=serializer.validated_data.get("issue_number"),
-                pr_number=serializer.validated_data.get("pr_number"),
-                head=branch,
-                branch=branch,
-                base=pr_base,
-                task_type=TaskType.STANDALONE.value,
-                github_user=github_user,
-                gpt_model=serializer.validated_data["gpt_model"],
-                image=serializer.validated_data.get("image"),
-            )
+            try:
+                with transaction.atomic():
+                    task = Task.objects.create(
+                        title="A title",
+                        user_request=serializer.validated_data["prompt"],
+                        installation_id=repo.installation.installation_id,
+                        github_project=repo.full_name,
+                        issue_number=serializer.validated_data.get("issue_number"),
+                        pr_number=serializer.validated_data.get("pr_number"),
+                        head=branch,
+                        branch=branch,
+                        base=pr_base,
+                        task_type=TaskType.STANDALONE.value,
+                        github_user=github_user,
+                        gpt_model=serializer.validated_data["gpt_model"],
+                        image=serializer.validated_data.get("image"),
+                        idempotency_key=idempotency_key,
+                    )
+            except IntegrityError:
+                # A concurrent request with the same key won the race
+                existing_task = self.get_task_by_idempotency_key(
+                    github_user, idempotency_key
+                )
+                return Response(TaskSerializer(existing_task).data)
             task.schedule()
             serializer = TaskSerializer(task)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
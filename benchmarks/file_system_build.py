@@ -0,0 +1,66 @@
+# flake8: noqa: E402
+"""
+Benchmark: building FileSystem trees of a cold workspace.
+
+Builds the tree of a synthetic git workspace with the sequential walker, the
+threaded walker and from `git ls-files`.
+
+Usage: python benchmarks/file_system_build.py [--files 100000] [--workers 8]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "prpilot.settings")
+
+import django
+
+django.setup()
+
+from django.conf import settings
+
+from engine.file_system import FileSystem
+from file_system_lookup import create_synthetic_tree
+
+
+def measure(label, root: Path, workers: int, use_git: bool):
+    settings.FILE_SYSTEM_WALK_WORKERS = workers
+    settings.FILE_SYSTEM_USE_GIT_LS_FILES = use_git
+    FileSystem.invalidate(root)
+    start = time.perf_counter()
+    file_system = FileSystem(root)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:8.3f}s ({len(file_system.nodes_by_path)} nodes)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        print(f"Creating {args.files} files in {root} ...")
+        create_synthetic_tree(root, args.files)
+        subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+        subprocess.run(["git", "add", "."], cwd=root, check=True)
+
+        sequential = measure("Sequential walk", root, 1, False)
+        threaded = measure(f"Threaded walk ({args.workers})", root, args.workers, False)
+        git = measure("git ls-files", root, args.workers, True)
+        FileSystem.invalidate(root)
+
+    print(f"Threaded speedup: {sequential / threaded:.1f}x")
+    print(f"git ls-files speedup: {sequential / git:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
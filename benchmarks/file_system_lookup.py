@@ -0,0 +1,92 @@
+# flake8: noqa: E402
+"""
+Benchmark: FileSystem.get_node on a large synthetic tree.
+
+Compares the path-keyed node map against the depth-first scan that
+`get_node` used to do for every lookup.
+
+Usage: python benchmarks/file_system_lookup.py [--files 100000] [--lookups 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "prpilot.settings")
+
+import django
+
+django.setup()
+
+from engine.file_system import FileSystem
+
+
+def create_synthetic_tree(root: Path, file_count: int, files_per_dir=100, fan_out=10):
+    """Create `file_count` empty files spread over a two-level directory tree."""
+    paths = []
+    for i in range(file_count):
+        directory = i // files_per_dir
+        relative = Path(
+            f"pkg{directory // fan_out}/mod{directory % fan_out}/file{i}.py"
+        )
+        paths.append(relative)
+    for directory in {p.parent for p in paths}:
+        (root / directory).mkdir(parents=True, exist_ok=True)
+    for relative in paths:
+        (root / relative).touch()
+    return paths
+
+
+def legacy_get_node(tree, path: Path):
+    """The depth-first scan that FileSystem.get_node used to perform."""
+    if tree.path == path:
+        return tree
+    for node in tree.nodes:
+        if node.path == path:
+            return node
+        if node.nodes:
+            result = legacy_get_node(node, path)
+            if result:
+                return result
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        print(f"Creating {args.files} files in {root} ...")
+        paths = create_synthetic_tree(root, args.files)
+        sample = random.Random(42).sample(paths, min(args.lookups, len(paths)))
+
+        start = time.perf_counter()
+        file_system = FileSystem(root)
+        print(f"Tree build: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        for relative in sample:
+            assert file_system.get_node(relative) is not None
+        indexed = time.perf_counter() - start
+
+        legacy_sample = sample[: max(1, len(sample) // 10)]
+        start = time.perf_counter()
+        for relative in legacy_sample:
+            assert legacy_get_node(file_system.tree, root / relative) is not None
+        legacy = (time.perf_counter() - start) * len(sample) / len(legacy_sample)
+
+    print(f"get_node (node map):   {indexed * 1e6 / len(sample):10.2f} us/lookup")
+    print(f"get_node (tree scan):  {legacy * 1e6 / len(sample):10.2f} us/lookup")
+    print(f"Speedup: {legacy / indexed:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# flake8: noqa: E402
+"""
+Benchmark: memory used by FileSystem trees.
+
+Builds the tree of a synthetic workspace with the current slotted nodes and
+with an equivalent of the pydantic model that FileSystemNode used to be, and
+reports the memory held by each tree as measured by tracemalloc.
+
+Usage: python benchmarks/file_system_memory.py [--files 100000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "prpilot.settings")
+
+import django
+
+django.setup()
+
+from pydantic import BaseModel, Field
+
+from engine.file_system import FileSystem
+from file_system_lookup import create_synthetic_tree
+
+
+class LegacyNode(BaseModel):
+    """Shape of the pydantic FileSystemNode that trees used to be built from."""
+
+    path: Path = Field(description="Path of the node in the file system")
+    nodes: List["LegacyNode"] = Field(default=[])
+    parent: Optional["LegacyNode"] = Field(default=None)
+
+
+def build_legacy_tree(path: Path, parent: LegacyNode = None) -> LegacyNode:
+    node = LegacyNode(path=path, parent=parent)
+    for item in path.iterdir():
+        if item.is_dir():
+            node.nodes.append(build_legacy_tree(item, node))
+        else:
+            node.nodes.append(LegacyNode(path=item, parent=node))
+    return node
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    tree = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        print(f"Creating {args.files} files in {root} ...")
+        create_synthetic_tree(root, args.files)
+
+        tree, slotted = measure(lambda: FileSystem(root).tree)
+        del tree
+        tree, legacy = measure(lambda: build_legacy_tree(root))
+        del tree
+
+    print(f"Slotted nodes:  {slotted / 2**20:8.1f} MiB")
+    print(f"Pydantic nodes: {legacy / 2**20:8.1f} MiB")
+    print(f"Reduction: {legacy / slotted:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# flake8: noqa: E402
+"""
+Benchmark: reading a pull request with paginated REST calls vs. the GraphQL loader.
+
+A local server replays canned GitHub API responses for a synthetic pull request,
+in the shapes GitHub returns them, and waits `--latency` milliseconds before
+each response to stand in for the round trip to GitHub. The REST side is the
+former `read_pull_request`, which pages through files, review comments, issue
+comments and commits with PyGithub's default settings. Those space requests
+0.25 seconds apart. The GraphQL side is `load_pull_request` followed by
+`render_pull_request`. Both must render the same markdown.
+
+Usage: python benchmarks/github_pull_request_fetch.py [--files 80] [--latency 80]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "prpilot.settings")
+
+import django
+
+django.setup()
+
+from github import Github
+
+from engine import github_loader
+from engine.agents.github_agent import render_pull_request
+
+OWNER, NAME, NUMBER = "pr-pilot-ai", "benchmark", 1
+REST_PAGE_SIZE = 30
+
+
+def timestamp(minute: int) -> str:
+    return f"2024-01-01T{minute // 60:02d}:{minute % 60:02d}:00Z"
+
+
+def synthetic_pull_request(
+    files: int, review_comments: int, comments: int, commits: int
+):
+    patches = {
+        f"src/module_{i}.py": "\n".join(
+            [f"@@ -1,{i % 7 + 2} +1,{i % 7 + 3} @@"]
+            + [f" line {j}" for j in range(i % 7 + 1)]
+            + [f"-old value {i}", f"+new value {i}", f"+added line {i}"]
+        )
+        for i in range(files)
+    }
+    reviews = []
+    for i in range(review_comments):
+        # Threads of three comments: one on the diff and two replies
+        root = reviews[-1]["in_reply_to_id"] or reviews[-1]["id"] if i % 3 else None
+        reviews.append(
+            {
+                "id": 1000 + i,
+                "path": f"src/module_{i // 3 % files}.py",
+                "in_reply_to_id": root,
+                "created_at": timestamp(i),
+                "user": {"login": f"reviewer{i % 4}"},
+                "body": f"Review comment {i}",
+                "diff_hunk": f"@@ -{i},2 +{i},3 @@\n context\n+changed {i}",
+            }
+        )
+    return {
+        "patches": patches,
+        "reviews": reviews,
+        "comments": [
+            {"user": {"login": f"user{i % 5}"}, "body": f"Issue comment {i}"}
+            for i in range(comments)
+        ],
+        "commits": [
+            {"commit": {"message": f"Commit {i}", "author": {"name": f"Dev {i % 3}"}}}
+            for i in range(commits)
+        ],
+    }
+
+
+class ReplayServer(ThreadingHTTPServer):
+    def __init__(self, pull_request: dict, latency: float):
+        super().__init__(("127.0.0.1", 0), ReplayHandler)
+        self.pull_request = pull_request
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send(self, body, content_type="application/json", headers=None):
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def record(self):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+
+    def paginate(self, items, url):
+        query = parse_qs(url.query)
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", [str(REST_PAGE_SIZE)])[0])
+        headers = {}
+        if page * per_page < len(items):
+            next_page = (
+                f"{self.server.url}{url.path}?per_page={per_page}&page={page + 1}"
+            )
+            headers["Link"] = f'<{next_page}>; rel="next"'
+        self.send(items[(page - 1) * per_page : page * per_page], headers=headers)
+
+    def do_GET(self):
+        self.record()
+        pr = self.server.pull_request
+        base = f"{self.server.url}/repos/{OWNER}/{NAME}"
+        url = urlparse(self.path)
+        path = url.path.removeprefix(f"/repos/{OWNER}/{NAME}")
+        if path == "":
+            self.send({"full_name": f"{OWNER}/{NAME}", "name": NAME, "url": base})
+        elif path == f"/pulls/{NUMBER}" and "diff" in self.headers.get("Accept", ""):
+            self.send(
+                "".join(
+                    f"diff --git a/{name} b/{name}\nindex 1111111..2222222 100644\n"
+                    f"--- a/{name}\n+++ b/{name}\n{patch}\n"
+                    for name, patch in pr["patches"].items()
+                ),
+                content_type="text/plain",
+            )
+        elif path == f"/pulls/{NUMBER}":
+            self.send(
+                {
+                    "number": NUMBER,
+                    "title": "Synthetic pull request",
+                    "body": "Changes many modules",
+                    "url": f"{base}/pulls/{NUMBER}",
+                    "issue_url": f"{base}/issues/{NUMBER}",
+                    "html_url": f"https://github.com/{OWNER}/{NAME}/pull/{NUMBER}",
+                    "head": {"ref": "feature"},
+                    "labels": [{"name": "pr-pilot"}, {"name": "enhancement"}],
+                }
+            )
+        elif path == f"/pulls/{NUMBER}/files":
+            files = [{"filename": n, "patch": p} for n, p in pr["patches"].items()]
+            self.paginate(files, url)
+        elif path == f"/pulls/{NUMBER}/comments":
+            self.paginate(pr["reviews"], url)
+        elif path == f"/issues/{NUMBER}/comments":
+            self.paginate(pr["comments"], url)
+        elif path == f"/pulls/{NUMBER}/commits":
+            self.paginate(pr["commits"], url)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        self.record()
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.send({"data": {"repository": {"pullRequest": self.graphql(request)}}})
+
+    def graphql(self, request):
+        pr = self.server.pull_request
+        threads = {}
+        for review in pr["reviews"]:
+            threads.setdefault(review["in_reply_to_id"] or review["id"], []).append(
+                {
+                    "databaseId": review["id"],
+                    "path": review["path"],
+                    "body": review["body"],
+                    "diffHunk": review["diff_hunk"],
+                    "createdAt": review["created_at"],
+                    "author": {"login": review["user"]["login"]},
+                    "replyTo": review["in_reply_to_id"]
+                    and {"databaseId": review["in_reply_to_id"]},
+                }
+            )
+        connections = {
+            "files": [
+                {
+                    "path": name,
+                    "additions": patch.count("\n+"),
+                    "deletions": patch.count("\n-"),
+                }
+                for name, patch in pr["patches"].items()
+            ],
+            "reviewThreads": [{"comments": {"nodes": c}} for c in threads.values()],
+            "comments": [
+                {"author": comment["user"], "body": comment["body"]}
+                for comment in pr["comments"]
+            ],
+            "commits": pr["commits"],
+        }
+        size = github_loader.PAGE_SIZE
+        paged = re.search(r"(\w+)\(first: \d+, after: \$after\)", request["query"])
+        if paged:
+            offset = int(request["variables"]["after"])
+            connections = {paged.group(1): connections[paged.group(1)]}
+        else:
+            offset = 0
+        result = {
+            name: {
+                "pageInfo": {
+                    "hasNextPage": offset + size < len(nodes),
+                    "endCursor": str(offset + size),
+                },
+                "nodes": nodes[offset : offset + size],
+            }
+            for name, nodes in connections.items()
+        }
+        if not paged:
+            result.update(
+                number=NUMBER,
+                title="Synthetic pull request",
+                body="Changes many modules",
+                url=f"https://github.com/{OWNER}/{NAME}/pull/{NUMBER}",
+                headRefName="feature",
+                labels={"nodes": [{"name": "pr-pilot"}, {"name": "enhancement"}]},
+            )
+        return result
+
+
+def read_pull_request_rest(github: Github) -> str:
+    """`read_pull_request` as it was before the GraphQL loader, minus task events."""
+    pr = github.get_repo(f"{OWNER}/{NAME}").get_pull(NUMBER)
+    labels = ",".join([label.name for label in pr.labels])
+
+    markdown_output = f"# [{pr.number}] {pr.title}\n"
+    markdown_output += f"Branch: {pr.head.ref}\n"
+    markdown_output += f"Labels: {labels}\n\n"
+    markdown_output += f"## PR Body\n{pr.body}\n\n"
+
+    markdown_output += "## Code Changes\n"
+    for file in pr.get_files():
+        markdown_output += f"**{file.filename}**\n```diff\n{file.patch}\n```\n\n"
+
+    markdown_output += "## Review Comments\n"
+    review_comments = list(pr.get_review_comments())
+    review_comments.sort(key=lambda x: x.created_at)
+    for comment in review_comments:
+        if comment.in_reply_to_id:
+            parent_comment = next(
+                (c for c in review_comments if c.id == comment.in_reply_to_id), None
+            )
+            if parent_comment:
+                markdown_output += (
+                    f"**@{comment.user.login} replied to "
+                    f"@{parent_comment.user.login}**\n{comment.body}\n\n"
+                )
+        else:
+            markdown_output += f"**@{comment.user.login} commented on diff:**\n```diff\n{comment.diff_hunk}\n```\n{comment.body}\n\n"
+
+    markdown_output += "## Issue Comments\n"
+    for comment in pr.get_issue_comments():
+        markdown_output += f"**@{comment.user.login} wrote:**\n{comment.body}\n\n"
+
+    markdown_output += "## PR Commits\n"
+    for commit in pr.get_commits():
+        markdown_output += (
+            f"**{commit.commit.author.name}**\n{commit.commit.message}\n\n"
+        )
+    return markdown_output
+
+
+def read_pull_request_graphql(server: ReplayServer) -> str:
+    with patch.object(github_loader, "GITHUB_API_URL", server.url):
+        pr = github_loader.load_pull_request("token", f"{OWNER}/{NAME}", NUMBER)
+    return render_pull_request(pr)
+
+
+def measure(server: ReplayServer, read, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        server.requests = 0
+        start = time.perf_counter()
+        output = read()
+        timings.append(time.perf_counter() - start)
+    return output, server.requests, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=80)
+    parser.add_argument("--review-comments", type=int, default=90)
+    parser.add_argument("--comments", type=int, default=40)
+    parser.add_argument("--commits", type=int, default=60)
+    parser.add_argument(
+        "--latency", type=float, default=80, help="Milliseconds per round trip"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pull_request = synthetic_pull_request(
+        args.files, args.review_comments, args.comments, args.commits
+    )
+    server = ReplayServer(pull_request, args.latency / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    github = Github("token", base_url=server.url)
+
+    rest_output, rest_requests, rest_time = measure(
+        server, lambda: read_pull_request_rest(github), args.repeat
+    )
+    graphql_output, graphql_requests, graphql_time = measure(
+        server, lambda: read_pull_request_graphql(server), args.repeat
+    )
+    server.shutdown()
+    assert rest_output == graphql_output, "REST and GraphQL rendered different output"
+
+    print(
+        f"{args.files} files, {args.review_comments} review comments, "
+        f"{args.comments} issue comments, {args.commits} commits, "
+        f"{args.latency:.0f} ms per round trip, median of {args.repeat} runs\n"
+    )
+    print(f"{'Loader':<10}{'Round trips':>14}{'Wall time':>14}")
+    print(f"{'REST':<10}{rest_requests:>14}{rest_time:>13.2f}s")
+    print(f"{'GraphQL':<10}{graphql_requests:>14}{graphql_time:>13.2f}s")
+    print(f"\nSpeedup: {rest_time / graphql_time:.1f}x, identical markdown output")
+
+
+if __name__ == "__main__":
+    main()
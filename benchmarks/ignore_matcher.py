@@ -0,0 +1,140 @@
+# flake8: noqa: E402
+"""
+Benchmark: compiled IgnoreMatcher vs. the per-pattern fnmatch loop.
+
+Both matchers check the same paths against PR Pilot's default ignore list
+combined with a typical web/Python `.gitignore`.
+
+Usage: python benchmarks/ignore_matcher.py [--paths 50000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "prpilot.settings")
+
+import django
+
+django.setup()
+
+from engine.file_system.ignore_matcher import (
+    DEFAULT_IGNORE_FILE,
+    IgnoreMatcher,
+    read_ignore_patterns,
+)
+
+GITIGNORE = """
+# Dependencies
+node_modules/
+bower_components
+.pnp
+.pnp.js
+# Builds
+/dist
+/build
+/coverage
+.next/
+out/
+*.tsbuildinfo
+# Python
+__pycache__/
+*.py[cod]
+*$py.class
+*.egg-info/
+.eggs/
+.mypy_cache/
+.ruff_cache/
+htmlcov/
+.coverage
+.coverage.*
+# Environments
+.env
+.env.local
+.env.*.local
+.venv
+# Logs
+logs
+*.log
+npm-debug.log*
+yarn-debug.log*
+# Editors
+.vscode/
+*.swp
+*.swo
+.DS_Store
+Thumbs.db
+"""
+
+SOURCE_DIRECTORIES = [
+    "src",
+    "src/components",
+    "src/utils",
+    "api",
+    "api/models",
+    "tests",
+]
+IGNORED_DIRECTORIES = ["node_modules/react", "node_modules/lodash/fp", "dist", ".venv"]
+EXTENSIONS = [".py", ".ts", ".tsx", ".md", ".json", ".pyc", ".log", ".png"]
+
+
+def legacy_should_be_ignored(ignore_list, relative_path: str) -> bool:
+    """The loop that FileSystem.should_be_ignored used to run for every path."""
+    name = relative_path.rsplit("/", 1)[-1]
+    for pattern in ignore_list:
+        if (
+            relative_path.startswith(pattern.rstrip("/") + "/")
+            or relative_path == pattern
+        ):
+            return True
+        if fnmatch(name, pattern) or fnmatch(relative_path, pattern):
+            return True
+    return False
+
+
+def generate_paths(count: int):
+    rng = random.Random(42)
+    paths = []
+    for i in range(count):
+        directories = IGNORED_DIRECTORIES if rng.random() < 0.3 else SOURCE_DIRECTORIES
+        paths.append(f"{rng.choice(directories)}/file{i}{rng.choice(EXTENSIONS)}")
+    return paths
+
+
+def measure(label, check, paths):
+    start = time.perf_counter()
+    ignored = sum(1 for path in paths if check(path))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1e6 / len(paths):8.2f} us/path ({ignored} ignored)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paths", type=int, default=50_000)
+    args = parser.parse_args()
+
+    patterns = set(read_ignore_patterns(DEFAULT_IGNORE_FILE))
+    patterns.update(GITIGNORE.splitlines())
+    legacy_patterns = {p for p in patterns if p.strip() and not p.startswith("#")}
+    paths = generate_paths(args.paths)
+    print(f"{len(legacy_patterns)} patterns, {len(paths)} paths")
+
+    start = time.perf_counter()
+    matcher = IgnoreMatcher(patterns)
+    print(f"Compiling the matcher took {(time.perf_counter() - start) * 1e3:.2f}ms")
+
+    legacy = measure(
+        "fnmatch loop", lambda p: legacy_should_be_ignored(legacy_patterns, p), paths
+    )
+    compiled = measure("IgnoreMatcher.is_ignored", matcher.is_ignored, paths)
+    print(f"Speedup: {legacy / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
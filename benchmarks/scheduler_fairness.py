@@ -0,0 +1,176 @@
+# flake8: noqa: E402
+"""
+Benchmark: task wait times under a skewed load, FIFO vs. fair-share queue.
+
+Simulates a pool of workers while one noisy project submits a burst of API tasks
+and many other projects submit a steady stream of mostly interactive tasks. The
+fair-share queue is a Python model of the scripts in `engine.task_queue`.
+
+Usage: python benchmarks/scheduler_fairness.py [--workers 8] [--burst 300] [--projects 20]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "prpilot.settings")
+
+import django
+
+django.setup()
+
+from django.conf import settings
+
+
+@dataclass
+class SimulatedTask:
+    project: str
+    priority: str
+    submitted: float
+    duration: float
+    started: float = None
+
+
+class FifoQueue:
+    def __init__(self):
+        self.tasks = deque()
+
+    def push(self, task: SimulatedTask):
+        self.tasks.append(task)
+
+    def pop(self):
+        return self.tasks.popleft() if self.tasks else None
+
+
+class FairShareQueue:
+    """Same policy as `PUSH_SCRIPT` and `POP_SCRIPT` in `engine.task_queue`."""
+
+    def __init__(self, weights: dict):
+        self.priorities = sorted(weights.items(), key=lambda item: -item[1])
+        self.rings = {name: deque() for name in weights}
+        self.subqueues = defaultdict(deque)
+        self.passes = defaultdict(float)
+        self.last = 0.0
+
+    def push(self, task: SimulatedTask):
+        subqueue = self.subqueues[(task.priority, task.project)]
+        subqueue.append(task)
+        if len(subqueue) == 1:
+            self.rings[task.priority].append(task.project)
+
+    def pop(self):
+        chosen = None
+        for name, weight in self.priorities:
+            if self.rings[name]:
+                task_pass = max(self.passes[name], self.last)
+                if chosen is None or task_pass < chosen[1]:
+                    chosen = (name, task_pass, weight)
+        if chosen is None:
+            return None
+        name, task_pass, weight = chosen
+        project = self.rings[name].popleft()
+        subqueue = self.subqueues[(name, project)]
+        task = subqueue.popleft()
+        if subqueue:
+            self.rings[name].append(project)
+        self.passes[name] = task_pass + 1 / weight
+        self.last = task_pass
+        return task
+
+
+def generate_load(args, rng: random.Random):
+    tasks = [
+        SimulatedTask("noisy/repo", "batch", 0.0, rng.expovariate(1 / args.mean))
+        for _ in range(args.burst)
+    ]
+    for i in range(args.projects):
+        now = rng.expovariate(args.rate / 60)
+        while now < args.duration:
+            priority = "batch" if rng.random() < 0.2 else "interactive"
+            tasks.append(
+                SimulatedTask(
+                    f"project-{i}", priority, now, rng.expovariate(1 / args.mean)
+                )
+            )
+            now += rng.expovariate(args.rate / 60)
+    return sorted(tasks, key=lambda task: task.submitted)
+
+
+def simulate(queue, tasks, workers: int):
+    """Discrete-event simulation, returns the tasks with their start times."""
+    events = [(task.submitted, 1, i) for i, task in enumerate(tasks)]
+    heapq.heapify(events)
+    idle = workers
+    while events:
+        now, kind, i = heapq.heappop(events)
+        if kind == 1:
+            queue.push(tasks[i])
+        else:
+            idle += 1
+        while idle:
+            task = queue.pop()
+            if task is None:
+                break
+            idle -= 1
+            task.started = now
+            heapq.heappush(events, (now + task.duration, 0, 0))
+    return tasks
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def report(label, tasks):
+    print(label)
+    groups = defaultdict(list)
+    for task in tasks:
+        group = "noisy project" if task.project == "noisy/repo" else task.priority
+        groups[group].append(task.started - task.submitted)
+    for group, waits in sorted(groups.items()):
+        print(
+            f"  {group:<14} {len(waits):5d} tasks  wait p50 {statistics.median(waits):7.0f}s"
+            f"  p95 {percentile(waits, 0.95):7.0f}s  p99 {percentile(waits, 0.99):7.0f}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--burst", type=int, default=300, help="Tasks of the noisy project"
+    )
+    parser.add_argument("--projects", type=int, default=20, help="Other projects")
+    parser.add_argument(
+        "--rate", type=float, default=0.2, help="Tasks per minute per project"
+    )
+    parser.add_argument(
+        "--mean", type=float, default=60, help="Mean task duration in seconds"
+    )
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds of load")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    fifo = simulate(
+        FifoQueue(), generate_load(args, random.Random(args.seed)), args.workers
+    )
+    report("FIFO", fifo)
+    weights = settings.TASK_QUEUE_PRIORITY_WEIGHTS
+    fair = simulate(
+        FairShareQueue(weights),
+        generate_load(args, random.Random(args.seed)),
+        args.workers,
+    )
+    report(f"Fair share {weights}", fair)
+
+
+if __name__ == "__main__":
+    main()
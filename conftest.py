@@ -3,10 +3,10 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
-from django.conf import settings
 
 from accounts.models import PilotUser
 from engine.models.task import Task
+from engine.task_scope import task_scope
 
 
 @pytest.fixture(autouse=True)
@@ -25,8 +25,8 @@ def task(user):
         github_user=user.username,
         github_project="test_project",
     )
-    settings.TASK_ID = task.id
-    return task
+    with task_scope(task.id):
+        yield task
 
 
 @pytest.fixture
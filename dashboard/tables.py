@@ -68,6 +68,7 @@ class EventTable(tables.Table):
             "edit_github_issue",
             "close_pull_request",
             "read_pull_request",
+            "read_pull_request_patch",
             "create_pull_request",
         ]
         if record.action in github_issue_targets:
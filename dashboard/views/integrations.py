@@ -1,6 +1,5 @@
 import logging
 
-import requests
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -16,7 +15,7 @@ from accounts.models import (
     UserBudget,
 )
 from engine.cryptography import encrypt
-
+from engine.http_client import http_session
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +36,7 @@ def add_slack_integration(request):
     scheme = "https" if request.is_secure() else "http"
     domain = request.get_host()
     full_url = f"{scheme}://{domain}{redirect_path}"
-    response = requests.post(
+    response = http_session().post(
         "https://slack.com/api/oauth.v2.access",
         data={
             "code": code,
@@ -91,7 +90,7 @@ def add_sentry_integration(request):
         "client_secret": settings.SENTRY_CLIENT_SECRET,
     }
 
-    resp = requests.post(url, json=payload)
+    resp = http_session().post(url, json=payload)
     data = resp.json()
 
     token = data["token"]
@@ -128,7 +127,7 @@ def add_linear_integration(request):
     scheme = "https" if request.is_secure() else "http"
     domain = request.get_host()
     full_url = f"{scheme}://{domain}{redirect_path}"
-    response = requests.post(
+    response = http_session().post(
         "https://api.linear.app/oauth/token",
         data={
             "code": code,
@@ -12,6 +12,7 @@ from webhooks.models import GithubRepository
 
 from engine.models.task import Task
 from engine.task_engine import TaskEngine
+from engine.task_scope import task_scope
 
 logger = logging.getLogger(__name__)
 
@@ -73,10 +74,9 @@ def run_e2e_test():
         "Find all unresolved Sentry issues that were seen in the last 24h in project `python-django`",
         model="gpt-4o",
     )
-    settings.TASK_ID = str(task.id)
-    os.environ["TASK_ID"] = str(task.id)
-    engine = TaskEngine(task)
-    engine.run()
+    with task_scope(task.id):
+        engine = TaskEngine(task)
+        engine.run()
     print(task.result)
 
 
@@ -1,8 +1,12 @@
 import logging
+import os
+from functools import lru_cache
 from typing import List
 
+import requests
+import tiktoken
 from django.conf import settings
-from github import GithubException, UnknownObjectException
+from github import GithubException
 from github.PullRequest import PullRequest
 from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain_core.prompts import (
@@ -15,9 +19,12 @@ from langchain_core.prompts import (
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 
+from engine.github_loader import load_issue, load_patches, load_pull_request
 from engine.langchain.cost_tracking import CostTrackerCallback
 from engine.models.task import Task
 from engine.models.task_event import TaskEvent
+from engine.task_scope import task_cache
+from webhooks.jwt_tools import get_installation_access_token
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +63,7 @@ def talk_to_github_agent(prompt: str):
 @tool
 def comment_on_github_issue(issue_number: int, comment: str):
     """Comment on a Github issue/PR."""
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
-    issue = repo.get_issue(issue_number)
+    issue = Task.current().get_issue(issue_number)
     comment = issue.create_comment(comment)
     TaskEvent.add(
         actor="assistant",
@@ -83,8 +88,7 @@ def render_github_issue(issue):
 @tool
 def list_open_github_issues():
     """List open issues on Github."""
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
+    repo = Task.current().github_repo
     open_issues = repo.get_issues(state="open")
     open_issues = [issue for issue in open_issues if not issue.pull_request]
     if not open_issues:
@@ -95,89 +99,219 @@ def list_open_github_issues():
 @tool
 def list_open_pull_requests():
     """List open pull requests on Github."""
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
+    repo = Task.current().github_repo
     open_prs = repo.get_pulls(state="open")
     if not open_prs:
         return "No open pull requests found"
     return "\n".join([render_github_issue(pr) for pr in open_prs])
 
 
-@tool
-def read_pull_request(pr_number: int):
-    """Read the pull request and return description + comments + code changes as markdown"""
-    # Initialize GitHub client
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
-    try:
-        pr: PullRequest = repo.get_pull(pr_number)
-    except UnknownObjectException as e:
-        if e.status == 404:
-            TaskEvent.add(
-                actor="assistant",
-                action="read_pull_request",
-                message=f"Pull request #{pr_number} not found",
-            )
-            return f"Pull request #{pr_number} not found"
-        else:
-            raise
+def login(author) -> str:
+    """Login of a comment's author, GitHub reports deleted users as `None`."""
+    return author["login"] if author else "ghost"
 
-    TaskEvent.add(
-        actor="assistant",
-        action="read_pull_request",
-        target=str(pr.number),
-        message=f"Reading pull request [{pr.title}]({pr.html_url})",
+
+def render_review_comments(review_threads) -> str:
+    """Render the review comments of a pull request, with replies next to their parents."""
+    review_comments = sorted(
+        (
+            comment
+            for thread in review_threads
+            for comment in thread["comments"]["nodes"]
+        ),
+        key=lambda comment: comment["createdAt"],
     )
-    labels = ",".join([label.name for label in pr.labels])
+    comments_by_id = {comment["databaseId"]: comment for comment in review_comments}
+    markdown_output = ""
+    for comment in review_comments:
+        if comment["replyTo"]:
+            parent_comment = comments_by_id.get(comment["replyTo"]["databaseId"])
+            if parent_comment:
+                markdown_output += (
+                    f"**@{login(comment['author'])} replied to "
+                    f"@{login(parent_comment['author'])}**\n{comment['body']}\n\n"
+                )
+        else:
+            markdown_output += (
+                f"**@{login(comment['author'])} commented on diff:**\n"
+                f"```diff\n{comment['diffHunk']}\n```\n{comment['body']}\n\n"
+            )
+    return markdown_output
+
+
+@lru_cache()
+def token_encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
 
-    markdown_output = f"# [{pr.number}] {pr.title}\n"
-    markdown_output += f"Branch: {pr.head.ref}\n"
+def relevant_paths(pr: dict, task: Task) -> list:
+    """Paths of the changed files that the task is about, most relevant first."""
+    review_comments = [
+        comment
+        for thread in pr["reviewThreads"]
+        for comment in thread["comments"]["nodes"]
+    ]
+    # The file the user commented on, then files named in the request, then discussed files
+    paths = [c["path"] for c in review_comments if c["databaseId"] == task.comment_id]
+    request = f"{task.pilot_command}\n{task.user_request}"
+    paths += [
+        file["path"]
+        for file in pr["files"]
+        if file["path"] in request or os.path.basename(file["path"]) in request
+    ]
+    paths += [comment["path"] for comment in review_comments]
+    return list(dict.fromkeys(paths))
+
+
+def select_patches(pr: dict, budget: int, relevant=()) -> set:
+    """Paths of the patches that fit into a budget of tokens, the relevant ones first."""
+    rank = {path: index for index, path in enumerate(relevant)}
+    files = sorted(pr["files"], key=lambda file: rank.get(file["path"], len(rank)))
+    selected = set()
+    for file in files:
+        patch = pr["patches"].get(file["path"])
+        if patch is None:
+            continue
+        tokens = len(token_encoding().encode(patch))
+        if tokens <= budget:
+            selected.add(file["path"])
+            budget -= tokens
+    return selected
+
+
+def render_pull_request(pr: dict, patch_budget: int = None, relevant=()) -> str:
+    """
+    Render a pull request loaded with `load_pull_request` as markdown.
+
+    :param patch_budget: Tokens of patches to include, all of them if None
+    :param relevant: Paths of the files whose patches to include first
+    """
+    labels = ",".join([label["name"] for label in pr["labels"]["nodes"]])
+
+    markdown_output = f"# [{pr['number']}] {pr['title']}\n"
+    markdown_output += f"Branch: {pr['headRefName']}\n"
     markdown_output += f"Labels: {labels}\n\n"
-    markdown_output += f"## PR Body\n{pr.body}\n\n"
+    markdown_output += f"## PR Body\n{pr['body']}\n\n"
+
+    if patch_budget is None:
+        selected = {file["path"] for file in pr["files"]}
+    else:
+        selected = select_patches(pr, patch_budget, relevant)
+        markdown_output += "## Changed Files\n"
+        for file in pr["files"]:
+            markdown_output += (
+                f"- `{file['path']}` (+{file['additions']}/-{file['deletions']})\n"
+            )
+        markdown_output += "\n"
 
     markdown_output += "## Code Changes\n"
-    for file in pr.get_files():
-        markdown_output += f"**{file.filename}**\n```diff\n{file.patch}\n```\n\n"
+    omitted = []
+    for file in pr["files"]:
+        if file["path"] in selected:
+            patch = pr["patches"].get(file["path"])
+            markdown_output += f"**{file['path']}**\n```diff\n{patch}\n```\n\n"
+        elif file["path"] in pr["patches"]:
+            omitted.append(f"`{file['path']}`")
+    if omitted:
+        markdown_output += (
+            f"Left out the patches of {', '.join(omitted)} to stay within {patch_budget} tokens. "
+            f"Read them with `read_pull_request_patch`.\n\n"
+        )
 
     markdown_output += "## Review Comments\n"
-    # Collect all review comments and properly format them together with the relevant diff_hunk based on in_reply_to_id
-    review_comments = list(pr.get_review_comments())
-    review_comments.sort(key=lambda x: x.created_at)
-    for comment in review_comments:
-        if comment.in_reply_to_id:
-            # Find the comment that this comment is replying to
-            parent_comment = next(
-                (c for c in review_comments if c.id == comment.in_reply_to_id), None
-            )
-            if parent_comment:
-                markdown_output += (
-                    f"**@{comment.user.login} replied to "
-                    f"@{parent_comment.user.login}**\n{comment.body}\n\n"
-                )
-        else:
-            markdown_output += f"**@{comment.user.login} commented on diff:**\n```diff\n{comment.diff_hunk}\n```\n{comment.body}\n\n"
+    markdown_output += render_review_comments(pr["reviewThreads"])
 
     markdown_output += "## Issue Comments\n"
-    for comment in pr.get_issue_comments():
-        markdown_output += f"**@{comment.user.login} wrote:**\n{comment.body}\n\n"
-
-    markdown_output += "## PR Commits\n"
-    for commit in pr.get_commits():
+    for comment in pr["comments"]:
         markdown_output += (
-            f"**{commit.commit.author.name}**\n{commit.commit.message}\n\n"
+            f"**@{login(comment['author'])} wrote:**\n{comment['body']}\n\n"
         )
 
+    markdown_output += "## PR Commits\n"
+    for commit in pr["commits"]:
+        markdown_output += f"**{commit['commit']['author']['name']}**\n{commit['commit']['message']}\n\n"
+
     return markdown_output
 
 
+def patch_cache() -> dict:
+    """
+    Patches of the pull requests the task read, by project and number. Outside
+    of a task scope, nothing is cached.
+    """
+    storage = task_cache()
+    if storage is None:
+        return {}
+    return storage.setdefault("pull_request_patches", {})
+
+
+@tool
+def read_pull_request(pr_number: int):
+    """Read the pull request and return description + comments + code changes as markdown"""
+    task = Task.current()
+    # Fetch everything in a few queries instead of paging through each list separately
+    pr = load_pull_request(
+        get_installation_access_token(task.installation_id),
+        task.github_project,
+        pr_number,
+    )
+    if pr is None:
+        TaskEvent.add(
+            actor="assistant",
+            action="read_pull_request",
+            message=f"Pull request #{pr_number} not found",
+        )
+        return f"Pull request #{pr_number} not found"
+
+    TaskEvent.add(
+        actor="assistant",
+        action="read_pull_request",
+        target=str(pr["number"]),
+        message=f"Reading pull request [{pr['title']}]({pr['url']})",
+    )
+    # Reading the pull request again refreshes the patches
+    patch_cache()[(task.github_project, pr_number)] = pr["patches"]
+    return render_pull_request(
+        pr, settings.MAX_PR_PATCH_TOKENS, relevant_paths(pr, task)
+    )
+
+
+@tool
+def read_pull_request_patch(pr_number: int, file_path: str):
+    """Read the complete changes that a pull request makes to one file"""
+    task = Task.current()
+    file_path = file_path.lstrip("/")
+    patches = patch_cache().get((task.github_project, pr_number))
+    if patches is None:
+        try:
+            patches = load_patches(
+                get_installation_access_token(task.installation_id),
+                task.github_project,
+                pr_number,
+            )
+        except requests.HTTPError as e:
+            if e.response.status_code == 404:
+                return f"Pull request #{pr_number} not found"
+            raise
+        patch_cache()[(task.github_project, pr_number)] = patches
+    if file_path not in patches:
+        return f"Pull request #{pr_number} has no changes to `{file_path}` that can be shown"
+    TaskEvent.add(
+        actor="assistant",
+        action="read_pull_request_patch",
+        target=str(pr_number),
+        message=f"Reading changes to `{file_path}` in pull request #{pr_number}",
+    )
+    return f"**{file_path}**\n```diff\n{patches[file_path]}\n```\n"
+
+
 @tool
 def create_github_issue(issue_title: str, issue_body: str, labels: List[str] = []):
     """Create a new issue on Github. Provide a fitting title, a detailed description and optional one-word,
     lowercase, alphanumeric labels."""
-    g = Task.current().github
     if "pr-pilot" not in labels:
         labels.append("pr-pilot")
-    repo = g.get_repo(Task.current().github_project)
+    repo = Task.current().github_repo
     issue = repo.create_issue(title=issue_title, body=issue_body, labels=labels)
     TaskEvent.add(
         actor="assistant",
@@ -193,10 +327,8 @@ def edit_github_issue(
     issue_number: int, new_title: str, new_body: str, labels: List[str] = []
 ):
     """Edit the title, labels and body of a Github issue."""
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
     try:
-        issue = repo.get_issue(issue_number)
+        issue = Task.current().get_issue(issue_number)
     except GithubException as e:
         if e.status == 404:
             return f"Issue #{issue_number} not found in project {Task.current().github_project}"
@@ -215,23 +347,29 @@ def edit_github_issue(
 @tool
 def read_github_issue(issue_number: int):
     """Read the issue and return description + comments as markdown"""
-    # Initialize GitHub client
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
-    issue = repo.get_issue(issue_number)
-    labels = ",".join([label.name for label in issue.labels])
+    task = Task.current()
+    issue = load_issue(
+        get_installation_access_token(task.installation_id),
+        task.github_project,
+        issue_number,
+    )
+    if issue is None:
+        return f"Issue #{issue_number} not found in project {task.github_project}"
+    labels = ",".join([label["name"] for label in issue["labels"]["nodes"]])
     TaskEvent.add(
         actor="assistant",
         action="read_github_issue",
-        target=issue.number,
-        message=f"Reading issue [#{issue_number}]({issue.html_url})",
+        target=issue["number"],
+        message=f"Reading issue [#{issue_number}]({issue['url']})",
     )
     # Prepare the markdown string
-    markdown_output = f"# Issue [{issue.number}] {issue.title}"
+    markdown_output = f"# Issue [{issue['number']}] {issue['title']}"
     markdown_output += f"## Labels\n{labels}\n\n"
-    markdown_output += f"## Body\n{issue.body}\n\n## Comments\n"
-    for comment in issue.get_comments():
-        markdown_output += f"**{comment.user.login} wrote:**\n{comment.body}\n\n"
+    markdown_output += f"## Body\n{issue['body']}\n\n## Comments\n"
+    for comment in issue["comments"]:
+        markdown_output += (
+            f"**{login(comment['author'])} wrote:**\n{comment['body']}\n\n"
+        )
 
     return markdown_output
 
@@ -239,11 +377,10 @@ def read_github_issue(issue_number: int):
 @tool
 def add_label_to_issue(issue_number: int, new_label: str):
     """Add a label to a Github issue."""
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
-    issue = repo.get_issue(issue_number)
+    issue = Task.current().get_issue(issue_number)
     if new_label not in [label.name for label in issue.labels]:
         issue.add_to_labels(new_label)
+        Task.current().issue_changed(issue_number)
         TaskEvent.add(
             actor="assistant",
             action="add_label_to_issue",
@@ -258,11 +395,10 @@ def add_label_to_issue(issue_number: int, new_label: str):
 @tool
 def remove_label_from_issue(issue_number: int, label_to_delete: str):
     """Remove a label from a Github issue."""
-    g = Task.current().github
-    repo = g.get_repo(Task.current().github_project)
-    issue = repo.get_issue(issue_number)
+    issue = Task.current().get_issue(issue_number)
     if label_to_delete in [label.name for label in issue.labels]:
         issue.remove_from_labels(label_to_delete)
+        Task.current().issue_changed(issue_number)
         TaskEvent.add(
             actor="assistant",
             action="remove_label_from_issue",
@@ -284,6 +420,7 @@ def create_github_agent():
         list_open_github_issues,
         list_open_pull_requests,
         read_pull_request,
+        read_pull_request_patch,
         read_github_issue,
         create_github_issue,
     ]
@@ -1,11 +1,12 @@
 import json
 import logging
 
-import requests
 from langchain.agents import Tool
 from langchain_core.tools import StructuredTool
 from pydantic.v1 import BaseModel, Field
 
+from engine.agents.integration_tools.metadata_cache import metadata_cache
+from engine.http_client import http_session
 from engine.models.task_event import TaskEvent
 
 LINEAR_API_URL = "https://api.linear.app/graphql"
@@ -19,11 +20,14 @@ def run_graphql_query(api_key: str, query: str):
         "Authorization": f"{api_key}",
         "Content-Type": "application/json",
     }
-    response = requests.post(LINEAR_API_URL, json={"query": query}, headers=headers)
+    response = http_session().post(
+        LINEAR_API_URL, json={"query": query}, headers=headers
+    )
     return response.json()
 
 
-def get_team_id_by_name(api_key, team_name):
+def list_teams(api_key) -> dict:
+    """Return the IDs of all teams by their lower-cased name."""
     query = """
     query {
       teams {
@@ -36,9 +40,17 @@ def get_team_id_by_name(api_key, team_name):
     """
     response = run_graphql_query(api_key, query)
     teams = response["data"]["teams"]["nodes"]
-    for team in teams:
-        if team["name"].lower() == team_name.lower():
-            return team["id"]
+    return {team["name"].lower(): team["id"] for team in teams}
+
+
+def get_team_id_by_name(api_key, team_name):
+    teams = metadata_cache.peek("linear", api_key, "teams")
+    if teams is None or team_name.lower() not in teams:
+        # The team might have been created since the teams were cached
+        teams = list_teams(api_key)
+        metadata_cache.set("linear", api_key, "teams", teams)
+    if team_name.lower() in teams:
+        return teams[team_name.lower()]
     raise ValueError(f"No team found with the name '{team_name}'")
 
 
@@ -97,6 +109,8 @@ def list_linear_tools(api_key: str):
         if "errors" in response:
             message = f"Error creating Linear issue: {response['errors'][0]['message']}"
             issue_id = None
+            # The team might have been deleted or renamed
+            metadata_cache.invalidate("linear", api_key, "teams")
         else:
             issue = response["data"]["issueCreate"]["issue"]
             issue_link = issue["url"]
@@ -0,0 +1,63 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+
+class MetadataCache:
+    """
+    Integration metadata (Linear teams, Slack workspace domains and channel ids)
+    shared by the tool calls of this process.
+
+    Entries are keyed by integration, credential and name, so users never see each
+    other's metadata. They expire after `INTEGRATION_METADATA_TTL_SECONDS` and are
+    invalidated by the tools as soon as an API call shows them to be stale.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(integration: str, credential: str, name: str) -> tuple:
+        # Keep the credentials themselves out of the cache
+        digest = hashlib.sha256(credential.encode("utf-8")).hexdigest()
+        return integration, digest, name
+
+    def get(self, integration: str, credential: str, name: str, load):
+        """Return the cached value, calling `load()` if it's missing or expired."""
+        key = self.key(integration, credential, name)
+        with self.lock:
+            cached = self.entries.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        value = load()
+        expires_at = time.monotonic() + settings.INTEGRATION_METADATA_TTL_SECONDS
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+        return value
+
+    def set(self, integration: str, credential: str, name: str, value):
+        expires_at = time.monotonic() + settings.INTEGRATION_METADATA_TTL_SECONDS
+        with self.lock:
+            self.entries[self.key(integration, credential, name)] = (value, expires_at)
+
+    def peek(self, integration: str, credential: str, name: str):
+        """Return the cached value without loading it, or None."""
+        with self.lock:
+            cached = self.entries.get(self.key(integration, credential, name))
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        return None
+
+    def invalidate(self, integration: str, credential: str, name: str):
+        with self.lock:
+            self.entries.pop(self.key(integration, credential, name), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+metadata_cache = MetadataCache()
@@ -4,6 +4,7 @@ import requests
 from langchain_core.tools import StructuredTool
 from pydantic.v1 import BaseModel, Field
 
+from engine.http_client import http_session
 from engine.models.task_event import TaskEvent
 
 logger = logging.getLogger(__name__)
@@ -21,13 +22,15 @@ class SentryAPI:
 
     def search_issues(self, query: str, project: str) -> dict:
         url = f"{self.base_url}/projects/{self.org}/{project}/issues/"
-        response = requests.get(url, headers=self.headers, params={"query": query})
+        response = http_session().get(
+            url, headers=self.headers, params={"query": query}
+        )
         response.raise_for_status()
         return response.json()
 
     def get_events(self, issue_id: str, include_stacktrace: bool) -> dict:
         url = f"{self.base_url}/organizations/{self.org}/issues/{issue_id}/events/"
-        response = requests.get(
+        response = http_session().get(
             url, headers=self.headers, params={"full": include_stacktrace}
         )
         response.raise_for_status()
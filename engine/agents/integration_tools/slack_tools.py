@@ -1,13 +1,20 @@
 import logging
 import re
 from datetime import datetime
+from functools import lru_cache
 
+from django.conf import settings
 from langchain.tools import Tool
 from langchain_core.tools import StructuredTool
 from pydantic.v1 import BaseModel, Field
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import (
+    ConnectionErrorRetryHandler,
+    RateLimitErrorRetryHandler,
+)
 
+from engine.agents.integration_tools.metadata_cache import metadata_cache
 from engine.models.task_event import TaskEvent
 
 logger = logging.getLogger(__name__)
@@ -19,8 +26,21 @@ def translate_markdown(markdown):
     return re.sub(regex, r"<\2|\1>", markdown).replace("**", "*")
 
 
+@lru_cache(maxsize=64)
+def slack_client(token: str) -> WebClient:
+    """A Slack client per token, reused by all tool calls of this process."""
+    return WebClient(
+        token=token,
+        timeout=int(settings.HTTP_READ_TIMEOUT),
+        retry_handlers=[
+            ConnectionErrorRetryHandler(max_retry_count=settings.HTTP_MAX_RETRIES),
+            RateLimitErrorRetryHandler(max_retry_count=settings.HTTP_MAX_RETRIES),
+        ],
+    )
+
+
 def search_slack_messages(query: str, user_token: str) -> str:
-    client = WebClient(token=user_token)
+    client = slack_client(user_token)
     try:
         response = client.search_messages(query=query)
         matches = response["messages"]["matches"]
@@ -48,23 +68,40 @@ def search_slack_messages(query: str, user_token: str) -> str:
         return msg
 
 
+def post_message(client, bot_token: str, channel: str, text: str):
+    """Post to a channel by its cached ID, which Slack resolves faster than names."""
+    channel_id = metadata_cache.peek("slack", bot_token, f"channel:{channel}")
+    try:
+        response = client.chat_postMessage(channel=channel_id or channel, text=text)
+    except SlackApiError as e:
+        if not channel_id or e.response["error"] != "channel_not_found":
+            raise
+        # The channel was deleted, another one might have taken its name
+        metadata_cache.invalidate("slack", bot_token, f"channel:{channel}")
+        response = client.chat_postMessage(channel=channel, text=text)
+    metadata_cache.set("slack", bot_token, f"channel:{channel}", response["channel"])
+    return response
+
+
 def post_slack_message_to_channel(channel: str, message: str, bot_token: str) -> str:
     """Post a message to a Slack channel."""
-    client = WebClient(token=bot_token)
+    client = slack_client(bot_token)
     try:
         # Post the message
         channel = channel.lstrip("#")
-        response = client.chat_postMessage(
-            channel=channel, text=translate_markdown(message)
-        )
+        response = post_message(client, bot_token, channel, translate_markdown(message))
 
         # Extract channel ID and timestamp
         channel_id = response["channel"]
         timestamp = response["ts"].replace(".", "")
 
         # Fetch the workspace domain
-        team_info = client.team_info()
-        workspace_domain = team_info["team"]["domain"]
+        workspace_domain = metadata_cache.get(
+            "slack",
+            bot_token,
+            "workspace_domain",
+            lambda: client.team_info()["team"]["domain"],
+        )
 
         # Construct message URL
         message_url = (
@@ -25,6 +25,7 @@ from langchain_openai import ChatOpenAI
 from engine.agents.github_agent import (
     read_github_issue,
     read_pull_request,
+    read_pull_request_patch,
     create_github_issue,
     edit_github_issue,
     comment_on_github_issue,
@@ -37,7 +38,8 @@ from engine.langchain.cost_tracking import CostTrackerCallback
 from engine.models.task import Task
 from engine.models.task_event import TaskEvent
 from engine.project import Project
-from engine.util import replace_string_in_directory_path
+from engine.task_scope import get_repo_dir
+from engine.util import parse_line_range, replace_string_in_directory_path
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +56,7 @@ Your job is to fulfill the user request autonomously and provide the response.
 All issues, PR, files and code you have access to are in the context of the `{github_project}` repository.
 
 # How to handle user requests
-- If the user mentions files, you can read them using the `read_files` function
+- If the user mentions files, you can read them using the `read_files` function. Read large files in parts using `path:start-end`
 - If the user mentions classes, methods, etc in the code, you can find them using the `search_for_code_snippets` function
 - If necessary, search the internet to make sure your answers are accurate
 - Keep your answers short and to the point, unless the user asks for a detailed explanation
@@ -96,7 +98,7 @@ def delete_file(path: str):
         target=path,
         message=f"Deleting file {path}",
     )
-    FileSystem().delete_file(path)
+    fs.delete_file(path)
     Project.commit_all_changes(f"Deleted file {path}")
     return f"File deleted: `{path}`"
 
@@ -113,7 +115,7 @@ def copy_file(source: str, destination: str):
         target=source,
         message=f"Copying file {source} to {destination}",
     )
-    FileSystem().copy_file(source, destination)
+    fs.copy_file(source, destination)
     Project.commit_all_changes(f"Copied file {source} to {destination}")
     return f"File copied from {source} to {destination}."
 
@@ -130,7 +132,7 @@ def move_file(source: str, destination: str):
         target=source,
         message=f"Moving file {source} to {destination}",
     )
-    FileSystem().move_file(source, destination)
+    fs.move_file(source, destination)
     Project.commit_all_changes(f"Moved file {source} to {destination}")
     return f"File moved from {source} to {destination}."
 
@@ -171,7 +173,7 @@ def list_directory(path: str):
     directory_content = f"Content of `{path}`:\n\n"
     for child in sorted(node.nodes, key=lambda x: x.path):
         # Replace the root path with an empty string
-        clipped_path = str(child.path).replace(str(settings.REPO_DIR), "")
+        clipped_path = str(child.path).replace(str(get_repo_dir()), "")
         # Replace the directory path with an empty string, leaving file name untouched
         clipped_path = replace_string_in_directory_path(clipped_path, path, "").lstrip(
             "/"
@@ -188,7 +190,11 @@ def list_directory(path: str):
 
 @tool
 def read_files(file_paths: list[str]):
-    """Read the content of the given files."""
+    """Read the content of the given files.
+
+    Append a line range to a path to read only part of a file,
+    e.g. `src/app.py:120-180` or `src/app.py:120` for line 120 to the end.
+    """
     if len(file_paths) > settings.MAX_READ_FILES:
         return f"Too many files ({len(file_paths)}) to read. Please limit to {settings.MAX_READ_FILES} files."
     file_system = FileSystem()
@@ -196,20 +202,44 @@ def read_files(file_paths: list[str]):
         f"`{file_path}`\n" for file_path in file_paths
     )
     TaskEvent.add(actor="assistant", action="read_files", message=message)
-    output = ""
-    for file_path in file_paths:
-        file_path = file_path.lstrip("/")
+    output = []
+    # Budget of non-empty lines shared by all files
+    remaining_lines = settings.MAX_FILE_LINES
+    for file_spec in file_paths:
+        file_path, start, end = parse_line_range(file_spec.lstrip("/"))
         file_node = file_system.get_node(Path(file_path))
-        if file_node:
-            output += f"### {file_path}\n"
-            output += file_node.content
-            output += "\n\n"
-        else:
-            output += f"File not found: `{file_path}`\n"
-    non_empty_line_count = len([line for line in output.split("\n") if line.strip()])
-    if non_empty_line_count > settings.MAX_FILE_LINES:
-        return f"The content of {file_paths} is longer than {settings.MAX_FILE_LINES} lines and too expensive to analyze. Abort!"
-    return output
+        if not file_node or not file_node.is_file:
+            output.append(f"File not found: `{file_path}`\n")
+            continue
+        if remaining_lines <= 0:
+            output.append(
+                f"Skipped `{file_path}`: the line budget of {settings.MAX_FILE_LINES} lines is used up.\n"
+            )
+            continue
+        start = start or 1
+        header = f"### {file_path}"
+        if start > 1 or end:
+            header += f" (lines {start}-{end or 'end'})"
+        lines = [header]
+        line_number = start - 1
+        truncated = False
+        for line in file_node.iter_lines(start, end):
+            if line.strip():
+                if remaining_lines == 0:
+                    truncated = True
+                    break
+                remaining_lines -= 1
+            lines.append(line)
+            line_number += 1
+        output.append("\n".join(lines) + "\n")
+        if truncated:
+            rest = f"{line_number + 1}-{end}" if end else f"{line_number + 1}"
+            output.append(
+                f"[Truncated after line {line_number} to stay within {settings.MAX_FILE_LINES} lines. "
+                f"Read `{file_path}:{rest}` for more.]\n"
+            )
+        output.append("\n")
+    return "".join(output)
 
 
 @tool
@@ -265,7 +295,7 @@ def search_for_code_snippets(search_regex: str, glob: str) -> str:
     Note:
         - Do NOT use file names in the `search_regex` parameter. Use the `glob` parameter to limit the search to specific files.
     """
-    search_path = os.path.join(settings.REPO_DIR, glob)
+    search_path = os.path.join(get_repo_dir(), glob)
     command = f"rg -n {shlex.quote(search_regex)} {str(search_path)}"
     TaskEvent.add(
         actor="assistant",
@@ -283,7 +313,7 @@ def search_for_code_snippets(search_regex: str, glob: str) -> str:
             if not result.stdout:
                 return f"No matches found for pattern `{search_regex}` in `{glob}`."
             result = result.stdout.strip()
-            root_path_replaced = result.replace(str(settings.REPO_DIR), "")
+            root_path_replaced = result.replace(str(get_repo_dir()), "")
             max_100_lines = root_path_replaced.split("\n")[:150]
             return "\n".join(max_100_lines)
         else:
@@ -356,9 +386,7 @@ def fork_issue(github_project: str, issue_number: int):
         + distilled_comments
     )
     # Create a new issue in the forked repository
-    forked_issue = task.github.get_repo(task.github_project).create_issue(
-        title=f"Forked: {title}", body=body
-    )
+    forked_issue = task.github_repo.create_issue(title=f"Forked: {title}", body=body)
     return f"Issue #{issue_number} has been successfully forked to {github_project} as Issue #{forked_issue.number}."
 
 
@@ -376,6 +404,7 @@ def create_pr_pilot_agent(
         remove_label_from_issue,
         read_github_issue,
         read_pull_request,
+        read_pull_request_patch,
         create_github_issue,
         write_file,
         read_files,
@@ -0,0 +1,144 @@
+from unittest.mock import patch
+
+import pytest
+
+from engine.agents.github_agent import (
+    read_pull_request,
+    read_pull_request_patch,
+    render_pull_request,
+)
+
+
+def review_comment(comment_id, created_at, author, reply_to=None, path="app.py"):
+    return {
+        "databaseId": comment_id,
+        "path": path,
+        "body": f"Comment {comment_id}",
+        "diffHunk": "@@ -1 +1 @@",
+        "createdAt": created_at,
+        "author": {"login": author} if author else None,
+        "replyTo": {"databaseId": reply_to} if reply_to else None,
+    }
+
+
+@pytest.fixture
+def pull_request():
+    return {
+        "number": 7,
+        "title": "Add feature",
+        "body": "Adds a feature",
+        "url": "https://github.com/owner/repo/pull/7",
+        "headRefName": "feature",
+        "labels": {"nodes": [{"name": "pr-pilot"}]},
+        "files": [
+            {"path": "app.py", "additions": 1, "deletions": 1},
+            {"path": "logo.png", "additions": 0, "deletions": 0},
+        ],
+        "patches": {"app.py": "@@ -1 +1 @@\n-a\n+b"},
+        "reviewThreads": [
+            {
+                "comments": {
+                    "nodes": [
+                        review_comment(1, "2024-01-01T00:00:00Z", "alice"),
+                        review_comment(3, "2024-01-03T00:00:00Z", None, reply_to=1),
+                    ]
+                }
+            },
+            {"comments": {"nodes": [review_comment(2, "2024-01-02T00:00:00Z", "bob")]}},
+        ],
+        "comments": [{"author": {"login": "carol"}, "body": "LGTM"}],
+        "commits": [{"commit": {"message": "Add feature", "author": {"name": "Dan"}}}],
+    }
+
+
+@pytest.fixture(autouse=True)
+def token_encoding():
+    # Count words instead of downloading the tokenizer
+    with patch("engine.agents.github_agent.token_encoding") as encoding:
+        encoding.return_value.encode = str.split
+        yield
+
+
+@pytest.fixture(autouse=True)
+def installation_token():
+    with patch(
+        "engine.agents.github_agent.get_installation_access_token",
+        return_value="token",
+    ):
+        yield
+
+
+@pytest.mark.django_db
+def test_read_pull_request(task, pull_request):
+    with patch(
+        "engine.agents.github_agent.load_pull_request", return_value=pull_request
+    ) as load:
+        output = read_pull_request.invoke({"pr_number": 7})
+    load.assert_called_once_with("token", "test_project", 7)
+    assert output.startswith("# [7] Add feature\nBranch: feature\nLabels: pr-pilot\n")
+    assert "- `app.py` (+1/-1)\n- `logo.png` (+0/-0)\n" in output
+    assert "**app.py**\n```diff\n@@ -1 +1 @@\n-a\n+b\n```" in output
+    assert "**logo.png**" not in output
+    review = output.split("## Review Comments\n")[1].split("## Issue Comments")[0]
+    assert review == (
+        "**@alice commented on diff:**\n```diff\n@@ -1 +1 @@\n```\nComment 1\n\n"
+        "**@bob commented on diff:**\n```diff\n@@ -1 +1 @@\n```\nComment 2\n\n"
+        "**@ghost replied to @alice**\nComment 3\n\n"
+    )
+    assert "**@carol wrote:**\nLGTM" in output
+    assert "**Dan**\nAdd feature" in output
+
+
+@pytest.mark.django_db
+def test_read_missing_pull_request(task):
+    with patch("engine.agents.github_agent.load_pull_request", return_value=None):
+        assert read_pull_request.invoke({"pr_number": 7}) == "Pull request #7 not found"
+
+
+def test_render_pull_request_includes_all_patches_without_budget(pull_request):
+    output = render_pull_request(pull_request)
+    assert "## Changed Files" not in output
+    assert "**logo.png**\n```diff\nNone\n```" in output
+
+
+def test_render_pull_request_prioritizes_relevant_patches(pull_request):
+    pull_request["files"] = [
+        {"path": f"src/{name}.py", "additions": 50, "deletions": 0}
+        for name in ("first", "second", "third")
+    ]
+    pull_request["patches"] = {
+        f"src/{name}.py": "@@ -0,0 +1,50 @@\n" + "+value = 1\n" * 50
+        for name in ("first", "second", "third")
+    }
+    output = render_pull_request(pull_request, 350, relevant=["src/third.py"])
+    assert "**src/third.py**" in output
+    assert "**src/first.py**" in output
+    assert "**src/second.py**" not in output
+    assert "Left out the patches of `src/second.py` to stay within 350 tokens" in output
+
+
+@pytest.mark.django_db
+def test_read_pull_request_patch(task):
+    patches = {"app.py": "@@ -1 +1 @@\n-a\n+b"}
+    with patch("engine.agents.github_agent.load_patches", return_value=patches) as load:
+        output = read_pull_request_patch.invoke(
+            {"pr_number": 7, "file_path": "/app.py"}
+        )
+        missing = read_pull_request_patch.invoke({"pr_number": 7, "file_path": "x.py"})
+    # The patches are downloaded once for the task
+    load.assert_called_once_with("token", "test_project", 7)
+    assert output == "**app.py**\n```diff\n@@ -1 +1 @@\n-a\n+b\n```\n"
+    assert missing == "Pull request #7 has no changes to `x.py` that can be shown"
+
+
+@pytest.mark.django_db
+def test_read_pull_request_patch_reuses_patches_of_read_pull_request(
+    task, pull_request
+):
+    with patch(
+        "engine.agents.github_agent.load_pull_request", return_value=pull_request
+    ), patch("engine.agents.github_agent.load_patches") as load_patches:
+        read_pull_request.invoke({"pr_number": 7})
+        output = read_pull_request_patch.invoke({"pr_number": 7, "file_path": "app.py"})
+    load_patches.assert_not_called()
+    assert output == "**app.py**\n```diff\n@@ -1 +1 @@\n-a\n+b\n```\n"
@@ -2,6 +2,7 @@ from unittest.mock import patch
 
 import pytest
 
+from engine.agents.integration_tools.metadata_cache import metadata_cache
 from engine.agents.integration_tools.linear_tools import (
     run_graphql_query,
     get_team_id_by_name,
@@ -16,6 +17,13 @@ def mock_task_event():
         yield mock
 
 
+@pytest.fixture(autouse=True)
+def clear_metadata_cache():
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
+
+
 @pytest.fixture
 def api_key():
     return "test_api_key"
@@ -42,7 +50,10 @@ def graphql_response():
 
 def test_run_graphql_query(api_key):
     query = "{ teams { nodes { id name } } }"
-    with patch("requests.post") as mock_post:
+    with patch(
+        "engine.agents.integration_tools.linear_tools.http_session"
+    ) as mock_session:
+        mock_post = mock_session.return_value.post
         mock_post.return_value.json.return_value = {"data": "test_data"}
         response = run_graphql_query(api_key, query)
         mock_post.assert_called_once_with(
@@ -65,6 +76,31 @@ def test_get_team_id_by_name(api_key, team_name, graphql_response):
         assert team_id == "team1"
 
 
+def test_teams_are_cached(api_key, graphql_response):
+    with patch(
+        "engine.agents.integration_tools.linear_tools.run_graphql_query"
+    ) as mock_run_query:
+        mock_run_query.return_value = graphql_response
+        assert get_team_id_by_name(api_key, "Test Team") == "team1"
+        assert get_team_id_by_name(api_key, "another team") == "team2"
+        assert mock_run_query.call_count == 1
+        get_team_id_by_name("other_api_key", "Test Team")
+        assert mock_run_query.call_count == 2
+
+
+def test_teams_are_reloaded_for_unknown_names(api_key, graphql_response):
+    with patch(
+        "engine.agents.integration_tools.linear_tools.run_graphql_query"
+    ) as mock_run_query:
+        mock_run_query.return_value = graphql_response
+        get_team_id_by_name(api_key, "Test Team")
+        graphql_response["data"]["teams"]["nodes"].append(
+            {"id": "team3", "name": "New Team"}
+        )
+        assert get_team_id_by_name(api_key, "New Team") == "team3"
+        assert mock_run_query.call_count == 2
+
+
 def test_get_team_id_by_name_not_found(api_key):
     with patch(
         "engine.agents.integration_tools.linear_tools.run_graphql_query"
@@ -144,3 +180,4 @@ def test_create_linear_issue_tool_error(api_key, team_name, graphql_response):
             title=title, description=description, team_name=team_name
         )
         assert result_message == "Error creating Linear issue: Error creating issue"
+    assert metadata_cache.peek("linear", api_key, "teams") is None
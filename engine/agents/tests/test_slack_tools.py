@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import patch
 from slack_sdk.errors import SlackApiError
+from engine.agents.integration_tools.metadata_cache import metadata_cache
 from engine.agents.integration_tools.slack_tools import (
+    slack_client,
     search_slack_messages,
     post_slack_message_to_channel,
     list_slack_tools,
@@ -10,8 +12,12 @@ from engine.agents.integration_tools.slack_tools import (
 
 @pytest.fixture
 def mock_web_client():
+    slack_client.cache_clear()
+    metadata_cache.clear()
     with patch("engine.agents.integration_tools.slack_tools.WebClient") as mock:
         yield mock
+    slack_client.cache_clear()
+    metadata_cache.clear()
 
 
 @pytest.fixture
@@ -78,6 +84,39 @@ def test_post_message_success(mock_web_client, mock_task_event):
     assert "https://example.slack.com/archives/C1234567890/p1625097600000200" in result
 
 
+def test_post_message_caches_workspace_metadata(mock_web_client, mock_task_event):
+    mock_client = mock_web_client.return_value
+    mock_client.chat_postMessage.return_value = {
+        "channel": "C1234567890",
+        "ts": "1625097600.000200",
+    }
+    mock_client.team_info.return_value = {"team": {"domain": "example"}}
+
+    post_slack_message_to_channel("#test_channel", "First", "bot_token")
+    result = post_slack_message_to_channel("test_channel", "Second", "bot_token")
+    assert "https://example.slack.com/archives/C1234567890/" in result
+    mock_client.team_info.assert_called_once()
+    channels = [
+        call.kwargs["channel"] for call in mock_client.chat_postMessage.call_args_list
+    ]
+    assert channels == ["test_channel", "C1234567890"]
+
+
+def test_post_message_retries_stale_channel_ids(mock_web_client, mock_task_event):
+    mock_client = mock_web_client.return_value
+    metadata_cache.set("slack", "bot_token", "channel:test_channel", "C_DELETED")
+    mock_client.chat_postMessage.side_effect = [
+        SlackApiError(response={"error": "channel_not_found"}, message="Error"),
+        {"channel": "C_NEW", "ts": "1625097600.000200"},
+    ]
+    mock_client.team_info.return_value = {"team": {"domain": "example"}}
+
+    result = post_slack_message_to_channel("test_channel", "Test message", "bot_token")
+    assert "https://example.slack.com/archives/C_NEW/" in result
+    assert mock_client.chat_postMessage.call_args.kwargs["channel"] == "test_channel"
+    assert metadata_cache.peek("slack", "bot_token", "channel:test_channel") == "C_NEW"
+
+
 def test_post_message_error(mock_web_client, mock_task_event):
     mock_client = mock_web_client.return_value
     mock_client.chat_postMessage.side_effect = SlackApiError(
@@ -93,3 +132,13 @@ def test_list_slack_tools():
     assert len(tools) == 2
     assert tools[0].name == "search_slack_workspace"
     assert tools[1].name == "post_slack_message"
+
+
+def test_slack_clients_are_reused_per_token(mock_web_client):
+    slack_client("token")
+    slack_client("token")
+    slack_client("other_token")
+    assert [call.kwargs["token"] for call in mock_web_client.call_args_list] == [
+        "token",
+        "other_token",
+    ]
@@ -3,7 +3,7 @@ import tempfile
 
 import pytest
 
-from engine.agents.pr_pilot_agent import list_directory
+from engine.agents.pr_pilot_agent import list_directory, read_files
 
 
 @pytest.mark.django_db
@@ -34,3 +34,42 @@ def test_list_directories(task):
 - subdir.py
 """.strip()
     )
+
+
+@pytest.fixture
+def repo(tmp_path, settings):
+    settings.REPO_DIR = str(tmp_path)
+    settings.MAX_FILE_LINES = 10
+    (tmp_path / "short.py").write_text("a = 1\n\nb = 2\n")
+    (tmp_path / "long.py").write_text("".join(f"line {i}\n" for i in range(1, 31)))
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_read_files_with_line_range(task, repo):
+    output = read_files.invoke({"file_paths": ["long.py:5-7", "short.py"]})
+    assert output == (
+        "### long.py (lines 5-7)\nline 5\nline 6\nline 7\n\n"
+        "### short.py\na = 1\n\nb = 2\n\n"
+    )
+
+
+@pytest.mark.django_db
+def test_read_files_returns_partial_content_within_line_budget(task, repo):
+    output = read_files.invoke({"file_paths": ["short.py", "long.py", "missing.py"]})
+    assert "a = 1\n\nb = 2" in output
+    assert "line 8\n" in output
+    assert "line 9" not in output
+    assert "Read `long.py:9` for more." in output
+    assert "File not found: `missing.py`" in output
+
+    output = read_files.invoke({"file_paths": ["long.py:1-20", "short.py"]})
+    assert "Read `long.py:11-20` for more." in output
+    assert "Skipped `short.py`" in output
+
+
+@pytest.mark.django_db
+def test_read_files_memory_maps_large_files(task, repo, monkeypatch):
+    monkeypatch.setattr("engine.file_system.file.MMAP_THRESHOLD", 0)
+    output = read_files.invoke({"file_paths": ["long.py:29"]})
+    assert output == "### long.py (lines 29-end)\nline 29\nline 30\n\n"
@@ -2,7 +2,7 @@ import json
 import logging
 import subprocess
 
-from django.conf import settings
+from engine.task_scope import get_repo_dir
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +35,7 @@ def json_to_markdown(json_data):
     for result in results:
 
         rule_id = result.get("check_id")
-        path = result.get("path").replace(str(settings.REPO_DIR), "").lstrip("/")
+        path = result.get("path").replace(str(get_repo_dir()), "").lstrip("/")
         start_line = result.get("start", {}).get("line")
         message = result.get("extra", {}).get("message")
         logger.info(f"Found issue: {message} in {path}:{start_line}")
@@ -45,7 +45,7 @@ def json_to_markdown(json_data):
         markdown_lines.append("\n")  # Add an empty line for spacing
     markdown_lines.append("\n\n")  # Add an empty line for spacing
     for error in errors:
-        message = error.get("message").replace(str(settings.REPO_DIR), "").lstrip("/")
+        message = error.get("message").replace(str(get_repo_dir()), "").lstrip("/")
         logger.info(f"[{error['level']}] {message}")
         markdown_lines.append(f"[{error['level']}] {message}")
 
@@ -53,6 +53,6 @@ def json_to_markdown(json_data):
 
 
 def generate_semgrep_report(semgrep_config="p/python"):
-    semgrep_output = run_semgrep(settings.REPO_DIR, semgrep_config)
+    semgrep_output = run_semgrep(get_repo_dir(), semgrep_config)
     markdown_report = json_to_markdown(semgrep_output)
     return markdown_report
@@ -1,16 +1,46 @@
 import logging
+import mmap
+import os
+from itertools import islice
+from typing import Iterator, Optional
 
 from .file_system_node import FileSystemNode
 
 logger = logging.getLogger(__name__)
 
+# Files larger than this are read through a memory map instead of buffered I/O
+MMAP_THRESHOLD = 1024 * 1024
+
 
 class File(FileSystemNode):
 
+    __slots__ = ()
+
+    is_file = True
+
     @property
     def content(self) -> str:
         return self.path.read_text()
 
+    def iter_lines(self, start: int = 1, end: Optional[int] = None) -> Iterator[str]:
+        """
+        Stream the lines `start` to `end` (1-based, inclusive) of the file without
+        loading it into memory. Line endings are stripped.
+        """
+        path = self.path
+        start = max(start, 1)
+        if os.path.getsize(path) < MMAP_THRESHOLD:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in islice(f, start - 1, end):
+                    yield line.rstrip("\r\n")
+            return
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            lines = iter(mapped.readline, b"")
+            for line in islice(lines, start - 1, end):
+                yield line.decode("utf-8", errors="replace").rstrip("\r\n")
+
     def simple_dict(self, filter="") -> dict:
         """Return a simple dictionary representation of the node."""
         return {"path": str(self.path_relative_to_cwd)}
@@ -1,89 +1,223 @@
 import logging
 import os
-from fnmatch import fnmatch
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Set, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 import yaml
 from django.conf import settings
 
+from engine.task_scope import get_repo_dir
 from .directory import Directory
 from .file import File
 from .file_system_node import FileSystemNode
+from .ignore_matcher import (
+    IgnoreMatcher,
+    compile_ignore_patterns,
+    load_ignore_patterns,
+)
 
 logger = logging.getLogger(__name__)
 
+# Directory trees of git workspaces, keyed by root directory. Each entry holds
+# the mtime of the workspace's git index at the time the tree was known to be
+# accurate, so that checkouts, resets and clones invalidate it automatically,
+# plus the tree itself and its nodes keyed by relative path.
+tree_cache: Dict[str, Tuple[int, FileSystemNode, Dict[str, FileSystemNode]]] = {}
+
+
+def git_index_stamp(root_directory) -> Optional[int]:
+    """Return the mtime of the git index of the given workspace, if it has one."""
+    try:
+        return (Path(root_directory) / ".git" / "index").stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
 
 class FileSystem:
     """Utility class for file system operations."""
 
     def __init__(self, root_directory=None):
         if not root_directory:
-            root_directory = Path(settings.REPO_DIR)
+            root_directory = Path(get_repo_dir())
         self.root_directory = root_directory
         if not self.root_directory.exists():
             raise FileNotFoundError(
                 f"Root directory '{self.root_directory}' does not exist."
             )
-        self.root_directory = self.root_directory
-        self.tree = self._build_tree(self.root_directory)
+        stamp = git_index_stamp(self.root_directory)
+        cached = tree_cache.get(str(self.root_directory))
+        if stamp is not None and cached and cached[0] == stamp:
+            _, self.tree, self.nodes_by_path = cached
+        else:
+            self.tree = self._build_root_tree()
+            self.nodes_by_path = {}
+            self._index_nodes(self.tree, ".")
+            if stamp is not None:
+                tree_cache[str(self.root_directory)] = (
+                    stamp,
+                    self.tree,
+                    self.nodes_by_path,
+                )
 
     def yaml(self, filter="") -> str:
         """Walk through tree in-order and collect paths of all files and directories."""
         return yaml.safe_dump(self.tree.simple_dict(filter))
 
+    @staticmethod
+    def invalidate(root_directory=None):
+        """Drop the cached tree of the given workspace."""
+        tree_cache.pop(str(root_directory or get_repo_dir()), None)
+
+    @staticmethod
+    def refresh_index_stamp(previous_stamp: Optional[int], root_directory=None):
+        """
+        Carry the cached tree of the given workspace over to the current git index.
+
+        Use this after git operations that rewrite the index without touching the
+        working tree (e.g. commits), passing the index stamp taken right before.
+        The tree is only kept if it was accurate at that point.
+        """
+        key = str(root_directory or get_repo_dir())
+        cached = tree_cache.get(key)
+        stamp = git_index_stamp(key)
+        if cached and cached[0] == previous_stamp and stamp is not None:
+            tree_cache[key] = (stamp, *cached[1:])
+
     @property
     def ignore_list(self) -> Set[str]:
         if not hasattr(self, "_ignore_list"):
-            # Create file if it doesn't exist
-            if not os.path.exists(settings.IGNORE_FILE_PATH):
-                default_ignore_content = Path(
-                    os.path.join(os.path.dirname(__file__), "default_ignore.txt")
-                ).read_text()
-                with open(settings.IGNORE_FILE_PATH, "w") as f:
-                    f.write(default_ignore_content)
-            with open(settings.IGNORE_FILE_PATH, "r") as f:
-                self._ignore_list = set(f.read().splitlines())
+            self._ignore_list = load_ignore_patterns(self.root_directory)
         return self._ignore_list
 
-    def _build_tree(self, path: Path, parent: FileSystemNode = None) -> FileSystemNode:
-        """Recursively build a directory tree starting from the given path."""
-        if path.is_dir():
-            node = Directory(path=path, parent=parent)
-        else:
-            node = File(path=path, parent=parent)
-        for item in path.iterdir():
-            if self.should_be_ignored(item):
+    @property
+    def ignore_matcher(self) -> IgnoreMatcher:
+        return compile_ignore_patterns(frozenset(self.ignore_list))
+
+    def _build_root_tree(self) -> FileSystemNode:
+        """Build the tree of the whole workspace."""
+        if (
+            settings.FILE_SYSTEM_USE_GIT_LS_FILES
+            and (self.root_directory / ".git").exists()
+        ):
+            try:
+                return self._build_tree_from_git()
+            except (OSError, subprocess.CalledProcessError) as e:
+                logger.warning(f"Listing files with git failed, walking instead: {e}")
+        return self._build_tree(self.root_directory)
+
+    def _scan_directory(self, path: str, key: str) -> List[Tuple[str, bool]]:
+        """List the names of a directory's entries that aren't ignored, and whether they are directories."""
+        prefix = "" if key == "." else f"{key}/"
+        matcher = self.ignore_matcher
+        entries = []
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                # DirEntry knows the entry type from the directory listing, no stat needed
+                is_dir = entry.is_dir()
+                # Ignored directories are pruned, so they're never descended into
+                if not matcher.match(prefix + entry.name, is_dir):
+                    entries.append((entry.name, is_dir))
+        return entries
+
+    def _build_tree(
+        self, path: Path, parent: FileSystemNode = None, key: str = None
+    ) -> FileSystemNode:
+        """
+        Build a directory tree starting from the given directory.
+
+        The tree is walked level by level. Levels with several directories are
+        listed concurrently, which pays off on network-backed volumes where each
+        listing is dominated by I/O latency.
+        """
+        root = Directory(path, parent)
+        if key is None:
+            key = self._path_key(path)
+        level = [(root, str(path), key)]
+        workers = settings.FILE_SYSTEM_WALK_WORKERS
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            while level:
+                if workers > 1 and len(level) > 1:
+                    listings = pool.map(
+                        lambda item: self._scan_directory(item[1], item[2]), level
+                    )
+                else:
+                    listings = [self._scan_directory(p, k) for _, p, k in level]
+                next_level = []
+                for (node, node_path, node_key), entries in zip(level, listings):
+                    prefix = "" if node_key == "." else f"{node_key}/"
+                    for name, is_dir in entries:
+                        if is_dir:
+                            child = Directory(name, node)
+                            next_level.append(
+                                (child, os.path.join(node_path, name), prefix + name)
+                            )
+                        else:
+                            child = File(name, node)
+                        node.nodes.append(child)
+                level = next_level
+        return root
+
+    def _build_tree_from_git(self) -> FileSystemNode:
+        """Build the tree of the workspace from the files known to git, without walking it."""
+
+        def git_ls_files(*args) -> List[str]:
+            output = subprocess.run(
+                ["git", "ls-files", "-z", *args],
+                cwd=self.root_directory,
+                stdout=subprocess.PIPE,
+                check=True,
+            ).stdout
+            return os.fsdecode(output).split("\0")[:-1]
+
+        deleted = set(git_ls_files("--deleted"))
+        paths = git_ls_files("--cached", "--others", "--exclude-standard")
+        root = Directory(self.root_directory)
+        directories = {".": root}
+        ignored_directories = set()
+        matcher = self.ignore_matcher
+        for path in paths:
+            if path in deleted:
                 continue
-            if item.is_dir():
-                node.nodes.append(self._build_tree(item, node))
-            else:
-                node.nodes.append(File(path=item, parent=node))
-        return node
+            parent_key, _, name = path.rpartition("/")
+            parent_key = parent_key or "."
+            if parent_key in ignored_directories:
+                continue
+            parent = directories.get(parent_key)
+            if parent is None:
+                # Create missing parent directories top-down, pruning ignored ones
+                parent, key = root, "."
+                for part in parent_key.split("/"):
+                    key = part if key == "." else f"{key}/{part}"
+                    if key in ignored_directories:
+                        parent = None
+                        break
+                    if key not in directories:
+                        if matcher.match(key, is_directory=True):
+                            ignored_directories.add(key)
+                            parent = None
+                            break
+                        directories[key] = Directory(part, parent)
+                        parent.nodes.append(directories[key])
+                    parent = directories[key]
+                if parent is None:
+                    ignored_directories.add(parent_key)
+                    continue
+            if not matcher.match(path):
+                parent.nodes.append(File(name, parent))
+        return root
 
     def should_be_ignored(self, path) -> bool:
         """Check if the given path should be ignored, respecting .gitignore-style patterns."""
         if isinstance(path, str):
             path = Path(path)
-        if path.is_absolute():
-            relative_path = str(path.relative_to(settings.REPO_DIR)).rstrip("/")
-        else:
-            relative_path = str(path).rstrip("/")
-
-        # Iterate over each pattern in the ignore list
-        for pattern in self.ignore_list:
-            # Check if the pattern matches the entire directory (including subdirectories and files)
-            if (
-                relative_path.startswith(pattern.rstrip("/") + "/")
-                or relative_path == pattern
-            ):
-                return True
-
-            # Check both the file/directory name and the relative path against the ignore patterns
-            if fnmatch(path.name, pattern) or fnmatch(relative_path, pattern):
-                return True
-
-        return False
+        if not path.is_absolute():
+            path = self.root_directory / path
+        relative_path = self._path_key(path)
+        if relative_path in (None, "."):
+            return False
+        return self.ignore_matcher.is_ignored(relative_path, path.is_dir())
 
     def get_directory_tree(self) -> List[dict]:
         """Build a directory tree from the root using the pre-built tree."""
@@ -92,12 +226,12 @@ class FileSystem:
     def _build_tree_dict(self, node: FileSystemNode, parent_path="") -> List[dict]:
         tree = []
         for child in node.nodes:
-            relative_path = os.path.join(parent_path, child.path.name)
+            relative_path = os.path.join(parent_path, child.name)
             if child.is_directory:
                 tree.append(
                     {
                         "id": relative_path,
-                        "text": child.path.name,
+                        "text": child.name,
                         "type": "default",
                         "children": self._build_tree_dict(child, relative_path),
                     }
@@ -106,7 +240,7 @@ class FileSystem:
                 tree.append(
                     {
                         "id": relative_path,
-                        "text": child.path.name,
+                        "text": child.name,
                         "type": "file",
                     }
                 )
@@ -118,33 +252,40 @@ class FileSystem:
 
     def _list_files_recursive(self, node: FileSystemNode) -> List[Path]:
         files_list = []
+        node_path = node.path
         for child in node.nodes:
             if child.is_directory:
                 files_list.extend(self._list_files_recursive(child))
             else:
-                files_list.append(child.path)
+                files_list.append(node_path / child.name)
         return files_list
 
+    def _path_key(self, path) -> Optional[str]:
+        """Normalize a path into the key used by `nodes_by_path`."""
+        path = Path(path)
+        if path.is_absolute():
+            if not path.is_relative_to(self.root_directory):
+                return None
+            path = path.relative_to(self.root_directory)
+        return Path(os.path.normpath(path)).as_posix()
+
+    def _index_nodes(self, node: FileSystemNode, key: str):
+        """Register a node and everything below it in `nodes_by_path`."""
+        self.nodes_by_path[key] = node
+        for child in node.nodes:
+            child_key = child.name if key == "." else f"{key}/{child.name}"
+            self._index_nodes(child, child_key)
+
+    def _unindex_nodes(self, node: FileSystemNode, key: str):
+        """Remove a node and everything below it from `nodes_by_path`."""
+        self.nodes_by_path.pop(key, None)
+        for child in node.nodes:
+            self._unindex_nodes(child, f"{key}/{child.name}")
+
     def get_node(self, path: Path) -> Optional[FileSystemNode]:
         """Get the node at the given path."""
-        if not path.is_absolute():
-            path = self.root_directory / path
-        return self._get_node_recursive(self.tree, path)
-
-    def _get_node_recursive(
-        self, tree: FileSystemNode, path: Path
-    ) -> Optional[FileSystemNode]:
-        """Recursively get the node at the given path."""
-        if tree.path == path:
-            return tree
-        for node in tree.nodes:
-            if node.path == path:
-                return node
-            if node.is_directory:
-                result = self._get_node_recursive(node, path)
-                if result:
-                    return result
-        return None
+        key = self._path_key(path)
+        return self.nodes_by_path.get(key) if key else None
 
     def save(self, content: str, path: Path) -> FileSystemNode:
         """
@@ -160,12 +301,42 @@ class FileSystem:
             raise ValueError(f"Cannot save content to directory `{absolute_path}`.")
         absolute_path.parent.mkdir(parents=True, exist_ok=True)
         absolute_path.write_text(content)
-        self.tree = self._build_tree(self.root_directory)
+        self._add_to_tree(absolute_path)
         return self.get_node(path)
 
+    def _add_to_tree(self, absolute_path: Path) -> Optional[FileSystemNode]:
+        """Add a path and any of its missing parent directories to the tree."""
+        node = self.tree
+        current = self.root_directory
+        key = "."
+        for part in absolute_path.relative_to(self.root_directory).parts:
+            current = current / part
+            key = part if key == "." else f"{key}/{part}"
+            if self.ignore_matcher.match(key, current.is_dir()):
+                return None
+            child = self.nodes_by_path.get(key)
+            if child is None:
+                if current.is_dir():
+                    child = self._build_tree(current, node, key)
+                else:
+                    child = File(current, node)
+                node.nodes.append(child)
+                self._index_nodes(child, key)
+            node = child
+        return node
+
+    def _remove_from_tree(self, absolute_path: Path):
+        """Remove a path and everything below it from the tree."""
+        key = self._path_key(absolute_path)
+        node = self.nodes_by_path.get(key)
+        if node and node.parent:
+            node.parent.nodes = [n for n in node.parent.nodes if n is not node]
+            self._unindex_nodes(node, key)
+
     def create_directory(self, path):
         absolute_path = self.root_directory / path
         absolute_path.mkdir(parents=True, exist_ok=True)
+        self._add_to_tree(absolute_path)
         logger.info(f"Directory created: {absolute_path}")
 
     def move_file(self, source, destination):
@@ -173,6 +344,8 @@ class FileSystem:
         destination = self.root_directory / destination
         destination.parent.mkdir(parents=True, exist_ok=True)
         source.replace(destination)
+        self._remove_from_tree(source)
+        self._add_to_tree(destination)
         logger.info(f"File moved from {source} to {destination}")
 
     def copy_file(self, source, destination):
@@ -180,11 +353,13 @@ class FileSystem:
         destination = self.root_directory / destination
         destination.parent.mkdir(parents=True, exist_ok=True)
         destination.write_text(source.read_text())
+        self._add_to_tree(destination)
         logger.info(f"File copied from {source} to {destination}")
 
     def delete_file(self, path):
         path = self.root_directory / path
         path.unlink()
+        self._remove_from_tree(path)
         logger.info(f"File deleted: {path}")
 
 
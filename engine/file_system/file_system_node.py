@@ -1,35 +1,46 @@
 import logging
+import os
 from pathlib import Path
 from typing import List, Optional
 
-from django.conf import settings
-from pydantic import Field, BaseModel
+from engine.task_scope import get_repo_dir
 
 logger = logging.getLogger(__name__)
 
 
-class FileSystemNode(BaseModel):
-    """Represents a file in the file system."""
+class FileSystemNode:
+    """
+    Represents a file in the file system.
 
-    path: Path = Field(description="Path of the node in the file system")
-    nodes: List["FileSystemNode"] = Field(
-        description="List of files and directories in the directory", default=[]
-    )
-    parent: Optional["FileSystemNode"] = Field(
-        description="Parent directory", default=None
-    )
+    Nodes only store their name and parent; paths are derived from the root
+    node. Whether a node is a file or a directory is fixed by its class when
+    the tree is built, so checking it never hits the disk.
+    """
 
-    @property
-    def path_relative_to_cwd(self):
-        return self.path.relative_to(settings.REPO_DIR)
+    __slots__ = ("name", "parent", "_root_path")
+
+    is_directory = False
+    is_file = False
+    nodes: List["FileSystemNode"] = ()
+
+    def __init__(self, path, parent: Optional["FileSystemNode"] = None):
+        self.name = os.path.basename(path)
+        self.parent = parent
+        # Only root nodes keep their full path
+        self._root_path = Path(path) if parent is None else None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self.path)!r})"
 
     @property
-    def is_directory(self):
-        return self.path.is_dir()
+    def path(self) -> Path:
+        if self.parent is None:
+            return self._root_path
+        return self.parent.path / self.name
 
     @property
-    def is_file(self):
-        return self.path.is_file()
+    def path_relative_to_cwd(self):
+        return self.path.relative_to(get_repo_dir())
 
     def simple_dict(self, filter="") -> dict:
         """Return a simple dictionary representation of the node."""
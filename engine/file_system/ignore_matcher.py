@@ -0,0 +1,155 @@
+import logging
+import os
+import re
+from fnmatch import translate
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, Iterable, List, Optional, Set
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IGNORE_FILE = os.path.join(os.path.dirname(__file__), "default_ignore.txt")
+
+# Keys marking the end of a literal path in the trie
+MATCH_ANY = "\0any"
+MATCH_DIRECTORY = "\0dir"
+
+
+def _compile(globs: List[str]) -> Optional[re.Pattern]:
+    """Combine several fnmatch-style globs into a single regex."""
+    if not globs:
+        return None
+    return re.compile("|".join(f"(?:{translate(glob)})" for glob in globs))
+
+
+class IgnoreMatcher:
+    """
+    Compiled set of .gitignore-style patterns.
+
+    Patterns without a slash match the name of a file or directory at any depth,
+    patterns with a slash match the path relative to the repository root and
+    patterns ending with a slash only match directories. Literal paths live in a
+    prefix trie, globs are combined into one regex per kind. Negated patterns
+    (`!pattern`) are not supported and skipped.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.names: Set[str] = set()
+        self.directory_names: Set[str] = set()
+        self.paths: Set[str] = set()
+        self.directory_paths: Set[str] = set()
+        self.trie: dict = {}
+        name_globs, directory_name_globs = [], []
+        path_globs, directory_path_globs = [], []
+
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            if pattern.startswith("!"):
+                logger.debug(f"Skipping unsupported negated ignore pattern {pattern}")
+                continue
+            directory_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            while pattern.startswith("**/"):
+                pattern = pattern[3:]
+            anchored = pattern.startswith("/") or "/" in pattern.rstrip("/")
+            pattern = pattern.lstrip("/")
+            if not pattern:
+                continue
+            is_glob = any(char in pattern for char in "*?[")
+
+            if is_glob and anchored:
+                globs = directory_path_globs if directory_only else path_globs
+                globs.append(pattern)
+            elif is_glob:
+                globs = directory_name_globs if directory_only else name_globs
+                globs.append(pattern)
+            elif anchored:
+                (self.directory_paths if directory_only else self.paths).add(pattern)
+                node = self.trie
+                for part in pattern.split("/"):
+                    node = node.setdefault(part, {})
+                node[MATCH_DIRECTORY if directory_only else MATCH_ANY] = True
+            else:
+                (self.directory_names if directory_only else self.names).add(pattern)
+
+        self.name_regex = _compile(name_globs)
+        self.directory_name_regex = _compile(directory_name_globs)
+        self.path_regex = _compile(path_globs)
+        self.directory_path_regex = _compile(directory_path_globs)
+
+    def match(self, relative_path: str, is_directory: bool = False) -> bool:
+        """
+        Check a single path whose parent directories are known not to be ignored,
+        e.g. while walking the tree top-down.
+        """
+        name = relative_path.rsplit("/", 1)[-1]
+        if (
+            name in self.names
+            or relative_path in self.paths
+            or (self.name_regex and self.name_regex.match(name))
+            or (self.path_regex and self.path_regex.match(relative_path))
+        ):
+            return True
+        if not is_directory:
+            return False
+        return bool(
+            name in self.directory_names
+            or relative_path in self.directory_paths
+            or (self.directory_name_regex and self.directory_name_regex.match(name))
+            or (
+                self.directory_path_regex
+                and self.directory_path_regex.match(relative_path)
+            )
+        )
+
+    def is_ignored(self, relative_path: str, is_directory: bool = False) -> bool:
+        """Check a path and all of its parent directories."""
+        parts = relative_path.strip("/").split("/")
+        node = self.trie
+        for depth, part in enumerate(parts):
+            part_is_directory = is_directory or depth < len(parts) - 1
+            if node is not None:
+                node = node.get(part)
+                if node is not None and (
+                    MATCH_ANY in node or (part_is_directory and MATCH_DIRECTORY in node)
+                ):
+                    return True
+            prefix = "/".join(parts[: depth + 1])
+            if self.match(prefix, part_is_directory):
+                return True
+        return False
+
+
+def read_ignore_patterns(path) -> List[str]:
+    """Read the patterns of an ignore file, if it exists."""
+    if not os.path.exists(path):
+        return []
+    return Path(path).read_text().splitlines()
+
+
+def load_ignore_patterns(root_directory) -> Set[str]:
+    """
+    Collect the ignore patterns for a workspace: PR Pilot's defaults and the
+    configured ignore file.
+
+    The repository's own `.gitignore` isn't part of them. It only applies to
+    untracked files and may re-include paths with `!`, so git applies it when
+    the tree is listed with `git ls-files --exclude-standard`.
+    """
+    # Create the ignore file if it doesn't exist
+    if not os.path.exists(settings.IGNORE_FILE_PATH):
+        with open(settings.IGNORE_FILE_PATH, "w") as f:
+            f.write(Path(DEFAULT_IGNORE_FILE).read_text())
+    patterns = set(read_ignore_patterns(DEFAULT_IGNORE_FILE))
+    patterns.update(read_ignore_patterns(settings.IGNORE_FILE_PATH))
+    return patterns
+
+
+@lru_cache(maxsize=32)
+def compile_ignore_patterns(patterns: FrozenSet[str]) -> IgnoreMatcher:
+    """Compile ignore patterns, reusing matchers for identical pattern sets."""
+    return IgnoreMatcher(patterns)
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from github import Github
+from github.Issue import Issue
+from github.PullRequest import PullRequest
+from github.Repository import Repository
+
+from engine.task_scope import task_cache
+
+logger = logging.getLogger(__name__)
+
+# Guards the creation of caches, tasks share their scope with helper threads
+cache_lock = threading.Lock()
+
+
+class GithubCache:
+    """
+    Repositories, issues and pull requests fetched during a task.
+
+    Objects are reused as they are for `GITHUB_CACHE_REVALIDATE_SECONDS`, then
+    revalidated with a conditional request. GitHub answers those with
+    `304 Not Modified` if the object didn't change, which doesn't count
+    against the rate limit.
+    """
+
+    def __init__(self, github: Github):
+        self.github = github
+        self.lock = threading.Lock()
+        # Key -> (object, time it was fetched or last revalidated)
+        self.objects = {}
+
+    def get(self, key, fetch):
+        with self.lock:
+            cached = self.objects.get(key)
+        if cached is None:
+            obj = fetch()
+        else:
+            obj, fetched_at = cached
+            if time.time() - fetched_at < settings.GITHUB_CACHE_REVALIDATE_SECONDS:
+                return obj
+            if obj.update():
+                logger.debug(f"{key} changed on GitHub")
+        with self.lock:
+            self.objects[key] = (obj, time.time())
+        return obj
+
+    def get_repo(self, full_name: str) -> Repository:
+        return self.get(("repo", full_name), lambda: self.github.get_repo(full_name))
+
+    def get_issue(self, full_name: str, number: int) -> Issue:
+        return self.get(
+            ("issue", full_name, number),
+            lambda: self.get_repo(full_name).get_issue(number),
+        )
+
+    def get_pull(self, full_name: str, number: int) -> PullRequest:
+        return self.get(
+            ("pull", full_name, number),
+            lambda: self.get_repo(full_name).get_pull(number),
+        )
+
+    def invalidate(self, *key):
+        """Forget cached objects, e.g. after changing them, or all of them."""
+        with self.lock:
+            if key:
+                self.objects.pop(key, None)
+            else:
+                self.objects.clear()
+
+
+def github_cache(github: Github) -> GithubCache:
+    """
+    The GitHub cache of the current task. Outside of a task scope, a new cache
+    is returned every time, so nothing is cached.
+    """
+    storage = task_cache()
+    if storage is None:
+        return GithubCache(github)
+    with cache_lock:
+        if "github" not in storage:
+            storage["github"] = GithubCache(github)
+        return storage["github"]
@@ -0,0 +1,204 @@
+import logging
+import re
+from typing import Optional
+
+from engine.http_client import http_session
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = "https://api.github.com"
+# Largest page size the GitHub API hands out
+PAGE_SIZE = 100
+
+LABELS = f"labels(first: {PAGE_SIZE}) {{ nodes {{ name }} }}"
+ISSUE_FIELDS = f"number title body url {LABELS}"
+PULL_REQUEST_FIELDS = f"{ISSUE_FIELDS} headRefName"
+
+# Connections that are paged through, and the fields of their nodes
+ISSUE_CONNECTIONS = {
+    "comments": "body author { login }",
+}
+PULL_REQUEST_CONNECTIONS = {
+    "files": "path additions deletions",
+    # Threads with more than a page of comments don't happen in practice
+    "reviewThreads": f"comments(first: {PAGE_SIZE}) {{ nodes {{ "
+    "databaseId path body diffHunk createdAt author { login } replyTo { databaseId } "
+    "} }",
+    "comments": "body author { login }",
+    "commits": "commit { message author { name } }",
+}
+
+# Git quotes paths with special characters and escapes them like C strings,
+# non-ASCII bytes as octal escapes
+DIFF_HEADER = re.compile(
+    r'^diff --git (?:a/.*|"a/(?:[^"\\]|\\.)*") (b/.*|"b/(?:[^"\\]|\\.)*")$'
+)
+QUOTED_PATH_ESCAPE = re.compile(rb"\\([0-7]{3}|.)")
+QUOTED_PATH_ESCAPES = {
+    b"a": b"\a",
+    b"b": b"\b",
+    b"t": b"\t",
+    b"n": b"\n",
+    b"v": b"\v",
+    b"f": b"\f",
+    b"r": b"\r",
+}
+
+
+class GithubQueryError(Exception):
+    pass
+
+
+def run_graphql_query(token: str, query: str, variables: dict) -> dict:
+    """Run a GraphQL query on the GitHub API. Objects that don't exist are None."""
+    response = http_session().post(
+        f"{GITHUB_API_URL}/graphql",
+        json={"query": query, "variables": variables},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    response.raise_for_status()
+    result = response.json()
+    errors = [e for e in result.get("errors", []) if e.get("type") != "NOT_FOUND"]
+    if errors:
+        raise GithubQueryError("; ".join(error["message"] for error in errors))
+    return result["data"]
+
+
+def connection(name: str, fields: str, paged: bool = False) -> str:
+    after = ", after: $after" if paged else ""
+    return (
+        f"{name}(first: {PAGE_SIZE}{after}) "
+        f"{{ pageInfo {{ hasNextPage endCursor }} nodes {{ {fields} }} }}"
+    )
+
+
+def object_query(field: str, selection: str, paged: bool = False) -> str:
+    """Query for an issue or pull request of a repository by its number."""
+    if field == "issueOrPullRequest":
+        selection = (
+            f"... on Issue {{ {selection} }} ... on PullRequest {{ {selection} }}"
+        )
+    after = ", $after: String" if paged else ""
+    return (
+        f"query($owner: String!, $name: String!, $number: Int!{after}) {{ "
+        f"repository(owner: $owner, name: $name) {{ "
+        f"{field}(number: $number) {{ {selection} }} }} }}"
+    )
+
+
+def load_object(
+    token: str, full_name: str, number: int, field: str, fields: str, connections: dict
+) -> Optional[dict]:
+    """
+    Fetch an issue or pull request together with the first page of each of its
+    connections in one query. Only connections with more pages need further queries.
+
+    :return: The object with its connections as lists of nodes, None if it doesn't exist
+    """
+    owner, name = full_name.split("/")
+    variables = {"owner": owner, "name": name, "number": number}
+    selection = " ".join(
+        [fields] + [connection(conn, nodes) for conn, nodes in connections.items()]
+    )
+    data = run_graphql_query(token, object_query(field, selection), variables)
+    obj = data["repository"] and data["repository"][field]
+    if not obj:
+        return None
+    for conn, nodes in connections.items():
+        page = obj[conn]
+        obj[conn] = page["nodes"]
+        while page["pageInfo"]["hasNextPage"]:
+            logger.debug(f"Loading more {conn} of {full_name}#{number}")
+            query = object_query(field, connection(conn, nodes, paged=True), paged=True)
+            data = run_graphql_query(
+                token, query, {**variables, "after": page["pageInfo"]["endCursor"]}
+            )
+            page = data["repository"][field][conn]
+            obj[conn].extend(page["nodes"])
+    return obj
+
+
+def unquote_path(path: str) -> str:
+    """Undo git's quoting of a path in a diff, e.g. `"b/t\\303\\251.py"` becomes `b/té.py`."""
+    if not path.startswith('"'):
+        return path
+
+    def unescape(match):
+        escape = match.group(1)
+        if len(escape) == 3:
+            return bytes([int(escape, 8)])
+        return QUOTED_PATH_ESCAPES.get(escape, escape)
+
+    quoted = path[1:-1].encode("utf-8")
+    return QUOTED_PATH_ESCAPE.sub(unescape, quoted).decode("utf-8", errors="replace")
+
+
+def split_diff(diff: str) -> dict:
+    """Split a unified diff into the patches of its files, shaped like the REST API's `patch`."""
+    patches = {}
+    path, hunks = None, None
+    for line in diff.splitlines():
+        header = DIFF_HEADER.match(line)
+        if header:
+            path, hunks = unquote_path(header.group(1)).removeprefix("b/"), None
+        elif hunks is None and line.startswith("+++ "):
+            new_path = unquote_path(line.removeprefix("+++ "))
+            if new_path.startswith("b/"):
+                path = new_path.removeprefix("b/")
+        elif hunks is None and line.startswith("@@"):
+            hunks = patches[path] = [line]
+        elif hunks is not None:
+            hunks.append(line)
+    return {path: "\n".join(lines) for path, lines in patches.items()}
+
+
+def load_patches(token: str, full_name: str, number: int) -> dict:
+    """Patches of the files a pull request changes, by path."""
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"{GITHUB_API_URL}/repos/{full_name}/pulls/{number}"
+    response = http_session().get(
+        url, headers={**headers, "Accept": "application/vnd.github.diff"}
+    )
+    if response.status_code != 406:
+        response.raise_for_status()
+        return split_diff(response.text)
+    # GitHub refuses to render very large diffs at once, only file by file
+    patches = {}
+    page = 1
+    while True:
+        response = http_session().get(
+            f"{url}/files",
+            params={"per_page": PAGE_SIZE, "page": page},
+            headers=headers,
+        )
+        response.raise_for_status()
+        files = response.json()
+        patches.update({file["filename"]: file.get("patch") for file in files})
+        if len(files) < PAGE_SIZE:
+            return patches
+        page += 1
+
+
+def load_pull_request(token: str, full_name: str, number: int) -> Optional[dict]:
+    """
+    Load a pull request with its files, review threads, comments and commits.
+    The patches of the files are under `patches`.
+    """
+    pr = load_object(
+        token,
+        full_name,
+        number,
+        "pullRequest",
+        PULL_REQUEST_FIELDS,
+        PULL_REQUEST_CONNECTIONS,
+    )
+    if pr:
+        pr["patches"] = load_patches(token, full_name, number)
+    return pr
+
+
+def load_issue(token: str, full_name: str, number: int) -> Optional[dict]:
+    """Load an issue, or the issue side of a pull request, with its comments."""
+    return load_object(
+        token, full_name, number, "issueOrPullRequest", ISSUE_FIELDS, ISSUE_CONNECTIONS
+    )
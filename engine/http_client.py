@@ -0,0 +1,63 @@
+import logging
+from functools import lru_cache
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class IntegrationRetry(Retry):
+    """
+    Retries idempotent requests on server errors, and any request that was
+    rate limited. A 429 means the request wasn't processed, so POSTs are safe
+    to send again.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429 and self.total:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class PooledSession(requests.Session):
+    """A session that gives every request a timeout unless it brings its own."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault(
+            "timeout", (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+        )
+        return super().request(method, url, **kwargs)
+
+
+@lru_cache()
+def http_session() -> PooledSession:
+    """
+    The HTTP session of this process, for calls to GitHub and integrations.
+
+    Connections are kept alive and reused per host. A host gets at most
+    `HTTP_MAX_CONNECTIONS_PER_HOST` concurrent requests, further requests wait
+    for a free connection.
+    """
+    session = PooledSession()
+    # Requests are made on behalf of different users, don't carry cookies between them
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    retry = IntegrationRetry(
+        total=settings.HTTP_MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_maxsize=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,9 +1,11 @@
 import logging
 import os
+from functools import lru_cache
 from pathlib import Path
 
 import yaml
-from jinja2 import FileSystemLoader, Environment, select_autoescape
+from django.conf import settings
+from jinja2 import FileSystemLoader, Environment, select_autoescape, Template
 from kubernetes import config
 from kubernetes.client import BatchV1Api
 
@@ -11,31 +13,42 @@ from kubernetes.client import BatchV1Api
 logger = logging.getLogger(__name__)
 
 
+@lru_cache()
+def load_kube_config():
+    try:
+        config.load_kube_config()
+    except config.config_exception.ConfigException:
+        config.load_incluster_config()
+
+
+@lru_cache()
+def get_image_name() -> str:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    version_txt_path = Path(os.path.join(parent_dir, "version.txt"))
+    version = version_txt_path.read_text().strip()
+    return f"us-west2-docker.pkg.dev/darwin-407004/pr-pilot/pr-pilot-worker:{version}"
+
+
+@lru_cache()
+def get_job_template() -> Template:
+    this_dir = os.path.dirname(os.path.abspath(__file__))
+    file_loader = FileSystemLoader(this_dir)
+    env = Environment(loader=file_loader, autoescape=select_autoescape())
+    return env.get_template("job_template.yaml.j2")
+
+
 class KubernetesJob:
 
     def __init__(self, task):
         self.task = task
 
     def get_image_name(self):
-        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        version_txt_path = Path(os.path.join(parent_dir, "version.txt"))
-        version = version_txt_path.read_text().strip()
-        return (
-            f"us-west2-docker.pkg.dev/darwin-407004/pr-pilot/pr-pilot-worker:{version}"
-        )
+        return get_image_name()
 
     def spawn(self):
-        # Load kubeconfig
-        try:
-            config.load_kube_config()
-        except config.config_exception.ConfigException:
-            config.load_incluster_config()
-
-        # Load the Jinja2 template
-        this_dir = os.path.dirname(os.path.abspath(__file__))
-        file_loader = FileSystemLoader(this_dir)
-        env = Environment(loader=file_loader, autoescape=select_autoescape())
-        template = env.get_template("job_template.yaml.j2")
+        # Config, image and template don't change while the app runs
+        load_kube_config()
+        template = get_job_template()
         # Render the template with variables
         github_project_org, github_project_name = self.task.github_project.split("/")
         job_name = "job-" + str(self.task.id)
@@ -47,6 +60,8 @@ class KubernetesJob:
             github_project_name=github_project_name,
             branch=self.task.branch,
             task_id=str(self.task.id),
+            redis_host=settings.REDIS_HOST,
+            github_token_cache=settings.GITHUB_TOKEN_CACHE,
         )
 
         # Load the rendered template as a Kubernetes object
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from engine.repo_cache import cached_repos, evict_repos, gc_repos, read_metadata
+
+
+class Command(BaseCommand):
+    help = "Garbage collect the repository cache and evict least recently used repositories."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-bytes",
+            type=int,
+            default=settings.REPO_CACHE_MAX_BYTES,
+            help="Evict repositories until the cache is smaller than this",
+        )
+        parser.add_argument(
+            "--skip-gc", action="store_true", help="Don't garbage collect repositories"
+        )
+
+    def handle(self, *args, **options):
+        if not options["skip_gc"]:
+            gc_repos()
+        for path in evict_repos(options["max_bytes"]):
+            self.stdout.write(f"Evicted {path}")
+        for path in cached_repos():
+            metadata = read_metadata(path)
+            self.stdout.write(
+                f"{path}: {metadata.get('size_bytes', 0) / 2**20:.1f} MiB, "
+                f"last used {metadata.get('last_used', 'never')}"
+            )
@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from engine.task_queue import TaskQueue
+
+
+class Command(BaseCommand):
+    help = "Print the task queue metrics."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Print as JSON")
+
+    def handle(self, *args, **options):
+        metrics = TaskQueue().metrics()
+        if options["json"]:
+            self.stdout.write(json.dumps(metrics))
+            return
+        for name, value in metrics.items():
+            self.stdout.write(f"{name}: {value}")
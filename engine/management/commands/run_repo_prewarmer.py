@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from engine.repo_prewarmer import RepoPrewarmer
+
+
+class Command(BaseCommand):
+    help = "Keep the repository cache current in the background."
+
+    def handle(self, *args, **options):
+        prewarmer = RepoPrewarmer()
+        prewarmer.run()
@@ -3,6 +3,7 @@ from sentry_sdk import configure_scope
 
 from engine.models.task import Task
 from engine.task_engine import TaskEngine
+from engine.task_scope import task_scope
 
 
 class Command(BaseCommand):
@@ -14,8 +15,8 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         task_id = options["task_id"]
         task = Task.objects.get(id=task_id)
-        engine = TaskEngine(task)
-        with configure_scope() as scope:
+        with task_scope(task_id), configure_scope() as scope:
+            engine = TaskEngine(task)
             scope.set_tag("task_id", str(task.id))
             scope.set_tag("github_user", task.github_user)
             scope.set_tag("github_project", task.github_project)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from engine.worker_autoscaler import WorkerAutoscaler
+
+
+class Command(BaseCommand):
+    help = "Size the task worker pool from the queue depth."
+
+    def handle(self, *args, **options):
+        autoscaler = WorkerAutoscaler()
+        autoscaler.run()
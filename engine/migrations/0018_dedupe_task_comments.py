@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-18 17:14
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def dedupe_task_comments(apps, schema_editor):
+    """
+    Keep the comment ID only on the first task created for a comment, so that
+    the comment can be made unique. The duplicate tasks and their history stay.
+    """
+    Task = apps.get_model("engine", "Task")
+    duplicates = (
+        Task.objects.filter(comment_id__isnull=False)
+        .values("github_project", "comment_id")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        tasks = Task.objects.filter(
+            github_project=duplicate["github_project"],
+            comment_id=duplicate["comment_id"],
+        ).order_by("created")
+        first = tasks.first()
+        tasks.exclude(id=first.id).update(comment_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("engine", "0017_alter_task_installation_id_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_task_comments, migrations.RunPython.noop),
+    ]
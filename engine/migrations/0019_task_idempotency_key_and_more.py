@@ -0,0 +1,39 @@
+# Generated by Django 5.0.3 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("engine", "0018_dedupe_task_comments"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="idempotency_key",
+            field=models.CharField(
+                blank=True,
+                help_text="Key sent by API clients to safely retry task creation",
+                max_length=255,
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="task",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("comment_id__isnull", False)),
+                fields=("github_project", "comment_id"),
+                name="unique_task_per_comment",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="task",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("idempotency_key__isnull", False)),
+                fields=("github_user", "idempotency_key"),
+                name="unique_task_per_idempotency_key",
+            ),
+        ),
+    ]
@@ -8,11 +8,16 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from github import Github, GithubException
+from github.Issue import Issue
+from github.PullRequest import PullRequest
+from github.Repository import Repository
 
+from engine.github_cache import github_cache
 from engine.task_context.github_issue import GithubIssueContext
 from engine.task_context.pr_review_comment import PRReviewCommentContext
 from engine.task_context.task_context import TaskContext
 from engine.task_scheduler import TaskScheduler
+from engine.task_scope import get_task_id
 from webhooks.jwt_tools import get_installation_access_token
 
 logger = logging.getLogger(__name__)
@@ -55,6 +60,27 @@ class Task(models.Model):
     image = models.BinaryField(
         blank=True, null=True, help_text="An image to be used in the task"
     )
+    idempotency_key = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text="Key sent by API clients to safely retry task creation",
+    )
+
+    class Meta:
+        constraints = [
+            # Webhook redeliveries must not start a second task for the same comment
+            models.UniqueConstraint(
+                fields=["github_project", "comment_id"],
+                condition=models.Q(comment_id__isnull=False),
+                name="unique_task_per_comment",
+            ),
+            models.UniqueConstraint(
+                fields=["github_user", "idempotency_key"],
+                condition=models.Q(idempotency_key__isnull=False),
+                name="unique_task_per_idempotency_key",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -82,15 +108,14 @@ class Task(models.Model):
 
     @staticmethod
     def current() -> "Task":
-        if not settings.TASK_ID:
+        task_id = get_task_id()
+        if not task_id:
             raise ValueError("TASK_ID is not set")
-        return Task.get(settings.TASK_ID)
+        return Task.get(str(task_id))
 
     @staticmethod
     @lru_cache()
     def get(task_id: str) -> "Task":
-        if not settings.TASK_ID:
-            raise ValueError("TASK_ID is not set")
         return Task.objects.get(id=task_id)
 
     @property
@@ -98,6 +123,21 @@ class Task(models.Model):
     def github(self) -> Github:
         return Github(get_installation_access_token(self.installation_id))
 
+    @property
+    def github_repo(self) -> Repository:
+        """The task's repository, cached for as long as the task runs."""
+        return github_cache(self.github).get_repo(self.github_project)
+
+    def get_issue(self, number: int) -> Issue:
+        return github_cache(self.github).get_issue(self.github_project, number)
+
+    def get_pull(self, number: int) -> PullRequest:
+        return github_cache(self.github).get_pull(self.github_project, number)
+
+    def issue_changed(self, number: int):
+        """Forget a cached issue that was changed without updating it."""
+        github_cache(self.github).invalidate("issue", self.github_project, number)
+
     @property
     def reversible_events(self):
         return [
@@ -106,11 +146,10 @@ class Task(models.Model):
 
     @property
     def request_issue(self):
-        repo = self.github.get_repo(self.github_project)
         if self.pr_number:
-            return repo.get_pull(self.pr_number)
+            return self.get_pull(self.pr_number)
         else:
-            return repo.get_issue(self.issue_number)
+            return self.get_issue(self.issue_number)
 
     @property
     def request_comment(self):
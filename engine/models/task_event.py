@@ -1,10 +1,11 @@
 import logging
 import uuid
 
-from django.conf import settings
 from django.db import models
 from github import GithubException
 
+from engine.task_scope import get_task_id
+
 logger = logging.getLogger(__name__)
 
 
@@ -95,7 +96,7 @@ class TaskEvent(models.Model):
         changes=[],
     ):
         if not task_id:
-            task_id = settings.TASK_ID
+            task_id = get_task_id()
         if not task_id:
             raise ValueError(
                 "No task ID was provided. Please set TASK_ID in the environment or pass it as an argument."
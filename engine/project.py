@@ -7,8 +7,10 @@ from github.Repository import Repository
 from pydantic import Field, BaseModel
 
 from engine.file_system import FileSystem
+from engine.file_system.file_system import git_index_stamp
 from engine.models.task_event import TaskEvent
 from engine.models.task import Task
+from engine.task_scope import get_repo_dir
 
 logger = logging.getLogger(__name__)
 
@@ -19,16 +21,12 @@ class Project(BaseModel):
 
     def caching_enabled(self):
         """Determine if caching is enabled for the repository."""
-        task = Task.current()
-        gh = task.github
-        repo: Repository = gh.get_repo(self.name)
-        # Caching is enabled if the repository is public
-        return not repo.private
+        repo: Repository = Task.current().github_repo
+        # Private repositories are only cached if they're isolated per installation
+        return not repo.private or settings.REPO_CACHE_PRIVATE_REPOS
 
     def is_active_open_source_project(self):
-        task = Task.current()
-        gh = task.github
-        repo: Repository = gh.get_repo(self.name)
+        repo: Repository = Task.current().github_repo
         num_contributors = repo.get_contributors().totalCount
         participation = repo.get_stats_participation()
         commits_last_four_weeks = sum(participation.all[-4:])
@@ -49,9 +47,11 @@ class Project(BaseModel):
 
     @staticmethod
     def commit_all_changes(message, push=False):
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
+        index_stamp = git_index_stamp(get_repo_dir())
         repo.git.add(A=True)
         commit = repo.index.commit(message)
+        FileSystem.refresh_index_stamp(index_stamp)
         TaskEvent.add(
             actor="assistant",
             action="commit_changes",
@@ -64,15 +64,15 @@ class Project(BaseModel):
 
     @staticmethod
     def commit_changes_of_file(file_path, message):
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
+        index_stamp = git_index_stamp(get_repo_dir())
         repo.git.add(file_path)
         repo.index.commit(message)
+        FileSystem.refresh_index_stamp(index_stamp)
 
     @staticmethod
     def from_github():
-        task = Task.current()
-        gh = task.github
-        repo = gh.get_repo(task.github_project)
+        repo = Task.current().github_repo
         return Project(name=repo.full_name, main_branch=repo.default_branch)
 
     def load_pilot_hints(self):
@@ -83,36 +83,36 @@ class Project(BaseModel):
 
     def discard_all_changes(self):
         logger.info("Discarding all changes")
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         repo.git.reset(hard=True)
 
     def fetch_remote(self):
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         origin = repo.remote(name="origin")
         origin.fetch()
 
     def checkout_latest_default_branch(self):
         logger.info(f"Checking out latest {self.main_branch} branch")
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         repo.git.checkout(self.main_branch)
 
     def checkout_branch(self, branch):
         logger.info(f"Checking out branch {branch}")
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         repo.git.checkout(branch)
 
     def has_uncommitted_changes(self):
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         return repo.is_dirty(untracked_files=True)
 
     def create_new_branch(self, branch_name):
         logger.info(f"Creating new branch {branch_name}")
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         repo.git.checkout("-b", branch_name)
 
     def push_branch(self, branch):
         logger.info(f"Pushing branch {branch} to origin")
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         origin = repo.remote(name="origin")
         origin.push(
             refspec="{}:refs/heads/{}".format(branch, branch), set_upstream=True
@@ -120,29 +120,47 @@ class Project(BaseModel):
 
     def delete_branch(self, branch):
         logger.info(f"Deleting branch {branch}")
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
         repo.git.branch("-d", branch)
 
+    def deepen_until_merge_base(self, repo: git.Repo):
+        """Fetch more history of a shallow clone until the active branch and the main branch have a merge base."""
+        shallow_file = Path(repo.git_dir) / "shallow"
+        while shallow_file.exists():
+            try:
+                repo.git.merge_base(self.main_branch, repo.active_branch.name)
+                return
+            except git.GitCommandError:
+                pass
+            boundary = shallow_file.read_text()
+            logger.info(
+                f"Deepening shallow clone by {settings.REPO_CLONE_DEPTH} commits"
+            )
+            repo.git.fetch("--deepen", str(settings.REPO_CLONE_DEPTH), "origin")
+            if shallow_file.exists() and shallow_file.read_text() == boundary:
+                # Deepening made no progress, fetch the entire history
+                repo.git.fetch("--unshallow", "origin")
+
     def get_diff_to_main(self):
-        repo = git.Repo(settings.REPO_DIR)
+        repo = git.Repo(get_repo_dir())
+        self.deepen_until_merge_base(repo)
         diff = repo.git.diff(f"{self.main_branch}...{repo.active_branch.name}")
         return diff.strip()
 
     @property
     def active_branch(self):
-        return git.Repo(settings.REPO_DIR).active_branch.name
+        return git.Repo(get_repo_dir()).active_branch.name
 
     def create_pull_request(self, title, body, head, labels=[]):
         if not head:
             head = self.active_branch
         task = Task.current()
-        g = task.github
         # Get the repository where you want to create the pull request
-        repo = g.get_repo(task.github_project)
+        repo = task.github_repo
         logger.info(f"Creating pull request from {head} to {self.main_branch}")
         labels.append("pr-pilot")
         if task.issue_number:
-            issue = repo.get_issue(task.issue_number)
+            issue = task.get_issue(task.issue_number)
             body += f"\n**Origin:** [{issue.title}]({task.comment_url})"
         pr = repo.create_pull(title=title, body=body, head=head, base=self.main_branch)
         pr.set_labels(*labels)
@@ -0,0 +1,137 @@
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+from github import Github
+
+from engine.repo_cache import (
+    RepoCache,
+    cache_lock,
+    cached_repos,
+    read_metadata,
+    select_clone_strategy,
+)
+from webhooks.jwt_tools import get_installation_access_token
+
+logger = logging.getLogger(__name__)
+
+
+def request_prewarm(
+    github_repo: str, installation_id: int, private: bool, size_kb: int = None
+):
+    """
+    Ask all workers to bring their cache of a repository up to date.
+
+    :param size_kb: Size of the repository as reported by GitHub, looked up by the workers if unknown
+    """
+    if not settings.REPO_CACHE_PREWARM:
+        return
+    if private and not settings.REPO_CACHE_PRIVATE_REPOS:
+        return
+    message = json.dumps(
+        {
+            "repo": github_repo,
+            "installation_id": installation_id,
+            "private": private,
+            "size_kb": size_kb,
+        }
+    )
+    try:
+        client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0)
+        client.publish(settings.REPO_CACHE_PREWARM_CHANNEL, message)
+    except redis.RedisError as e:
+        logger.warning(f"Could not request prewarming of {github_repo}: {e}")
+
+
+class RepoPrewarmer:
+    """
+    Keeps a worker's repository cache current in the background, so that tasks
+    only need a local checkout. Repositories are fetched when webhooks announce
+    a task and hot repositories are refreshed periodically.
+    """
+
+    def __init__(self):
+        self.redis = redis.Redis(
+            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+        )
+        self.last_refresh = 0
+
+    def prewarm(
+        self,
+        github_repo: str,
+        installation_id: int,
+        private: bool,
+        clone=True,
+        size_kb: int = None,
+    ):
+        """Clone or fetch a repository into the cache."""
+        token = (
+            get_installation_access_token(installation_id) if installation_id else ""
+        )
+        cache = RepoCache(
+            github_repo, token, installation_id=installation_id if private else None
+        )
+        strategy = "full"
+        if clone:
+            if size_kb is None:
+                size_kb = Github(token or None).get_repo(github_repo).size
+            # Clone the cache the way a task would
+            strategy = select_clone_strategy(size_kb)
+        # Don't wait for a task that's already updating the cache
+        with cache_lock(cache.cache_destination, blocking=False) as locked:
+            if locked and cache.update_cache(strategy, clone=clone):
+                logger.info(f"Prewarmed cache of {github_repo}")
+
+    def refresh_hot_repos(self):
+        """Fetch the latest changes of repositories used within `REPO_CACHE_HOT_SECONDS`."""
+        for path in cached_repos():
+            metadata = read_metadata(path)
+            if (
+                time.time() - metadata.get("last_used", 0)
+                > settings.REPO_CACHE_HOT_SECONDS
+            ):
+                continue
+            if "repo" not in metadata:
+                continue
+            installation_id = metadata.get("installation_id")
+            try:
+                # Public repositories are fetched without credentials
+                self.prewarm(
+                    metadata["repo"],
+                    installation_id,
+                    private=installation_id is not None,
+                    clone=False,
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to refresh cache of {metadata['repo']}", exc_info=e
+                )
+
+    def handle_message(self, data: bytes):
+        message = json.loads(data)
+        try:
+            self.prewarm(
+                message["repo"],
+                message["installation_id"],
+                message["private"],
+                size_kb=message.get("size_kb"),
+            )
+        except Exception as e:
+            logger.error(f"Failed to prewarm cache of {message['repo']}", exc_info=e)
+
+    def run(self):
+        logger.info("Running repository cache prewarmer")
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(settings.REPO_CACHE_PREWARM_CHANNEL)
+        while True:
+            message = pubsub.get_message(timeout=1.0)
+            if message:
+                self.handle_message(message["data"])
+            if (
+                time.time() - self.last_refresh
+                > settings.REPO_CACHE_REFRESH_INTERVAL_SECONDS
+            ):
+                self.last_refresh = time.time()
+                self.refresh_hot_repos()
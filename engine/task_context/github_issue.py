@@ -11,8 +11,7 @@ class GithubIssueContext(TaskContext):
 
     def respond_to_user(self, message):
         """Respond to the user's comment on the issue"""
-        repo = self.task.github.get_repo(self.task.github_project)
-        issue = repo.get_issue(self.task.issue_number)
+        issue = self.task.get_issue(self.task.issue_number)
         comment = issue.create_comment(message)
         self.task.response_comment_id = comment.id
         self.task.response_comment_url = comment.html_url
@@ -16,8 +16,7 @@ class PRReviewCommentContext(TaskContext):
 
     def respond_to_user(self, message):
         """Respond to the user's comment on the issue"""
-        repo = self.task.github.get_repo(self.task.github_project)
-        pr = repo.get_pull(self.task.pr_number)
+        pr = self.task.get_pull(self.task.pr_number)
         comment = pr.create_review_comment_reply(self.task.comment_id, message)
         self.task.response_comment_id = comment.id
         self.task.response_comment_url = comment.html_url
@@ -2,7 +2,6 @@ import base64
 import logging
 import os
 import shutil
-import threading
 from decimal import Decimal
 
 from django.conf import settings
@@ -14,6 +13,8 @@ from github.PullRequest import PullRequest
 from accounts.models import UserBudget, PilotUser
 from engine.agents.integration_tools import integration_tools_for_user
 from engine.agents.pr_pilot_agent import create_pr_pilot_agent
+from engine.file_system import FileSystem
+from engine.github_cache import github_cache
 from engine.langchain.generate_pr_info import generate_pr_info, LabelsAndTitle
 from engine.langchain.generate_task_title import generate_task_title
 from engine.models.cost_item import CostItem
@@ -21,8 +22,9 @@ from engine.models.task import Task, TaskType
 from engine.models.task_bill import TaskBill
 from engine.models.task_event import TaskEvent
 from engine.project import Project
-from engine.repo_cache import RepoCache
-from engine.util import slugify
+from engine.repo_cache import RepoCache, select_clone_strategy
+from engine.task_scope import context_thread, get_repo_dir
+from engine.util import extract_file_paths, slugify
 from webhooks.jwt_tools import get_installation_access_token
 
 logger = logging.getLogger(__name__)
@@ -45,7 +47,7 @@ class TaskEngine:
         )
         self.github_token = get_installation_access_token(self.task.installation_id)
         self.github = Github(self.github_token)
-        self.github_repo = self.github.get_repo(self.task.github_project)
+        self.github_repo = github_cache(self.github).get_repo(self.task.github_project)
         self.project = Project(
             name=self.github_repo.full_name, main_branch=self.github_repo.default_branch
         )
@@ -60,7 +62,7 @@ class TaskEngine:
                 slugified_basis = slugified_basis[: slugified_basis.rindex("-")]
 
         unique_branch_name = slugified_basis[:24]
-        repo = Repo(settings.REPO_DIR)
+        repo = Repo(get_repo_dir())
 
         counter = 1
         original_branch_name = unique_branch_name
@@ -109,10 +111,10 @@ class TaskEngine:
 
     def generate_task_title(self):
         if self.task.task_type == TaskType.GITHUB_PR_REVIEW_COMMENT:
-            pr = self.github_repo.get_pull(self.task.pr_number)
+            pr = self.task.get_pull(self.task.pr_number)
             self.task.title = generate_task_title(pr.body, self.task.user_request)
         elif self.task.task_type == TaskType.GITHUB_ISSUE:
-            issue = self.github_repo.get_issue(self.task.issue_number)
+            issue = self.task.get_issue(self.task.issue_number)
             self.task.title = generate_task_title(issue.body, self.task.user_request)
         else:
             self.task.title = generate_task_title("", self.task.user_request)
@@ -135,7 +137,7 @@ class TaskEngine:
             self.task.save()
             return self.task.result
         # Generate task title in the background
-        task_title_thread = threading.Thread(target=self.generate_task_title)
+        task_title_thread = context_thread(self.generate_task_title)
         task_title_thread.start()
         self.clone_github_repo()
 
@@ -267,14 +269,23 @@ class TaskEngine:
             target=self.task.github_project,
             message="Cloning repository",
         )
-        if os.path.exists(settings.REPO_DIR):
+        if os.path.exists(get_repo_dir()):
             logger.info("Deleting existing directory contents.")
-            shutil.rmtree(settings.REPO_DIR)
-        cache = RepoCache(self.task.github_project, self.github_token)
+            shutil.rmtree(get_repo_dir())
+        FileSystem.invalidate()
+        cache = RepoCache(
+            self.task.github_project,
+            self.github_token,
+            installation_id=(
+                self.task.installation_id if self.github_repo.private else None
+            ),
+        )
+        sparse_paths = extract_file_paths(self.task.user_request)
+        strategy = select_clone_strategy(self.github_repo.size, sparse_paths)
         if self.project.caching_enabled():
             logger.info("Caching is enabled! Setting up workspace...")
-            cache.setup_workspace()
+            cache.setup_workspace(strategy)
         else:
             # If caching is disabled, clone it directly into the workspace
             logger.info("Caching is disabled! Cloning directly into workspace...")
-            cache.clone(settings.REPO_DIR)
+            cache.clone(get_repo_dir(), strategy, sparse_paths)
@@ -0,0 +1,404 @@
+import logging
+import socket
+import time
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker waits for the doorbell before looking for tasks anyway
+DOORBELL_TIMEOUT = 5
+
+# Appends a task to the sub-queue of its project and puts the project into the
+# ring of its priority class, unless it's already waiting there.
+# KEYS: sub-queue, ring, doorbell  ARGV: task ID, project
+PUSH_SCRIPT = """
+if redis.call('RPUSH', KEYS[1], ARGV[1]) == 1 then
+  redis.call('RPUSH', KEYS[2], ARGV[2])
+end
+redis.call('RPUSH', KEYS[3], '1')
+"""
+
+# Takes the next task: retried tasks in the main queue first, then the head of
+# the next project's sub-queue in the priority class that's furthest behind its
+# weighted share (stride scheduling). Classes don't bank their share while
+# they're idle, their pass never falls behind the last dispatched pass.
+# KEYS: main queue, processing list, passes, one ring per priority class
+# ARGV: track (1 or 0), sub-queue prefix, then name and weight of each class
+# The sub-queue keys are only known once a project was picked, so the script
+# builds them from the prefix. On Redis Cluster, that only works if they hash
+# to the slot of the declared keys, see `TaskQueue`.
+POP_SCRIPT = """
+local task = redis.call('LPOP', KEYS[1])
+if not task then
+  local floor = tonumber(redis.call('HGET', KEYS[3], '_last') or '0')
+  local chosen, chosen_pass, chosen_weight, chosen_ring
+  for i = 4, #KEYS do
+    if redis.call('LLEN', KEYS[i]) > 0 then
+      local name = ARGV[2 * i - 5]
+      local pass = math.max(tonumber(redis.call('HGET', KEYS[3], name) or '0'), floor)
+      if not chosen or pass < chosen_pass then
+        chosen, chosen_pass, chosen_ring = name, pass, KEYS[i]
+        chosen_weight = tonumber(ARGV[2 * i - 4])
+      end
+    end
+  end
+  if not chosen then
+    return false
+  end
+  local project = redis.call('LPOP', chosen_ring)
+  local subqueue = ARGV[2] .. chosen .. ':' .. project
+  task = redis.call('LPOP', subqueue)
+  if redis.call('LLEN', subqueue) > 0 then
+    redis.call('RPUSH', chosen_ring, project)
+  end
+  redis.call('HSET', KEYS[3], chosen, tostring(chosen_pass + 1 / chosen_weight), '_last', tostring(chosen_pass))
+  if not task then
+    return false
+  end
+end
+if ARGV[1] == '1' then
+  redis.call('RPUSH', KEYS[2], task)
+end
+return task
+"""
+
+# Takes a task off a processing list and pushes it to the dead-letter list or,
+# as a retry, to the front of the main queue. Nothing is pushed if the task was
+# acknowledged or released by another worker in the meantime.
+# KEYS: processing list, target list, attempts, enqueued, doorbell
+# ARGV: task ID, dead (1 or 0), time queued, ring doorbell (1 or 0)
+RELEASE_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+  return 0
+end
+if ARGV[2] == '1' then
+  redis.call('RPUSH', KEYS[2], ARGV[1])
+  redis.call('HDEL', KEYS[3], ARGV[1])
+else
+  redis.call('LPUSH', KEYS[2], ARGV[1])
+  redis.call('ZADD', KEYS[4], ARGV[3], ARGV[1])
+  if ARGV[4] == '1' then
+    redis.call('RPUSH', KEYS[5], '1')
+  end
+end
+return 1
+"""
+
+
+class TaskQueue:
+    """
+    Redis queue of task IDs.
+
+    In reliable mode (`REDIS_QUEUE_RELIABLE`), popped tasks are moved to a
+    processing list of the worker with `BLMOVE` and stay there until they are
+    acknowledged. While a task runs, its worker refreshes a heartbeat key that
+    expires after `TASK_QUEUE_VISIBILITY_TIMEOUT` seconds. Tasks whose heartbeat
+    expired, e.g. because their worker pod died, are reclaimed by any worker and
+    put back into the queue, until they've been attempted
+    `TASK_QUEUE_MAX_ATTEMPTS` times. Then they're moved to the dead-letter list.
+
+    In fair-share mode (`REDIS_QUEUE_FAIR_SHARE`), every project has its own
+    sub-queue per priority class. Projects take turns within a class and the
+    classes share the workers according to `TASK_QUEUE_PRIORITY_WEIGHTS`, so a
+    project with many tasks can't hold up everybody else. Workers block on a
+    doorbell list that gets a token for every task and take tasks with a script.
+
+    All keys of a queue start with `REDIS_QUEUE`. On Redis Cluster, the scripts
+    need all of them in one slot, so `REDIS_QUEUE` has to be a hash tag there,
+    e.g. `{tasks}`.
+    """
+
+    def __init__(self, client: redis.Redis = None, worker_id: str = None):
+        self.redis = client or redis.Redis(
+            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+        )
+        self.reliable = settings.REDIS_QUEUE_RELIABLE
+        # StatefulSet pods keep their host name, so a restarted worker finds its own processing list
+        self.worker_id = worker_id or socket.gethostname()
+        self.queue_key = settings.REDIS_QUEUE
+        self.processing_key = self.processing_key_of(self.worker_id)
+        self.workers_key = f"{self.queue_key}:workers"
+        self.attempts_key = f"{self.queue_key}:attempts"
+        self.dead_letter_key = f"{self.queue_key}:dead"
+        # Tasks seen without heartbeat in the last reclaim, see `reclaim`
+        self.suspects = set()
+        self.fair_share = settings.REDIS_QUEUE_FAIR_SHARE
+        self.doorbell_key = f"{self.queue_key}:doorbell"
+        self.passes_key = f"{self.queue_key}:passes"
+        self.pool_key = f"{self.queue_key}:pool"
+        # Waiting tasks by the time they were queued, for the age of the oldest one
+        self.enqueued_key = f"{self.queue_key}:enqueued"
+        # Highest weight first, it wins ties
+        self.priorities = sorted(
+            settings.TASK_QUEUE_PRIORITY_WEIGHTS.items(), key=lambda item: -item[1]
+        )
+        self.push_script = self.redis.register_script(PUSH_SCRIPT)
+        self.pop_script = self.redis.register_script(POP_SCRIPT)
+        self.release_script = self.redis.register_script(RELEASE_SCRIPT)
+
+    def processing_key_of(self, worker_id: str) -> str:
+        return f"{self.queue_key}:processing:{worker_id}"
+
+    def heartbeat_key(self, task_id: str) -> str:
+        return f"{self.queue_key}:heartbeat:{task_id}"
+
+    def pool_worker_key(self, worker_id: str) -> str:
+        return f"{self.queue_key}:pool:{worker_id}"
+
+    def ring_key(self, priority: str) -> str:
+        return f"{self.queue_key}:ring:{priority}"
+
+    def subqueue_key(self, priority: str, project: str) -> str:
+        return f"{self.queue_key}:fair:{priority}:{project}"
+
+    def push(self, task_id: str, project: str = None, priority: str = None):
+        """
+        Queue a task. In fair-share mode, tasks with a project are queued in the
+        project's sub-queue of the given priority class.
+        """
+        pipeline = self.redis.pipeline()
+        pipeline.zadd(self.enqueued_key, {task_id: time.time()})
+        if not self.fair_share or project is None:
+            pipeline.rpush(self.queue_key, task_id)
+            if self.fair_share:
+                pipeline.rpush(self.doorbell_key, 1)
+        else:
+            priority = priority or self.priorities[-1][0]
+            if priority not in settings.TASK_QUEUE_PRIORITY_WEIGHTS:
+                raise ValueError(f"Invalid task priority: {priority}")
+            self.push_script(
+                keys=[
+                    self.subqueue_key(priority, project),
+                    self.ring_key(priority),
+                    self.doorbell_key,
+                ],
+                args=[task_id, project],
+                client=pipeline,
+            )
+        pipeline.execute()
+
+    def pop_fair(self, timeout: int = 0) -> Optional[bytes]:
+        deadline = time.monotonic() + timeout if timeout else None
+        keys = [self.queue_key, self.processing_key, self.passes_key]
+        args = [1 if self.reliable else 0, f"{self.queue_key}:fair:"]
+        for name, weight in self.priorities:
+            keys.append(self.ring_key(name))
+            args += [name, weight]
+        while True:
+            wait = DOORBELL_TIMEOUT
+            if deadline:
+                wait = max(min(wait, deadline - time.monotonic()), 0.01)
+            # The doorbell only wakes workers up. A worker may take another task
+            # than the one it was woken up for, or one without a token, if a
+            # worker died between the two steps.
+            self.redis.blpop([self.doorbell_key], timeout=wait)
+            task_id = self.pop_script(keys=keys, args=args)
+            if task_id is not None:
+                return task_id
+            if deadline and time.monotonic() >= deadline:
+                return None
+
+    def pop(self, timeout: int = 0) -> Optional[str]:
+        """Wait for the next task. Returns None if `timeout` seconds pass without one."""
+        if self.fair_share:
+            task_id = self.pop_fair(timeout)
+        elif not self.reliable:
+            item = self.redis.blpop([self.queue_key], timeout=timeout)
+            task_id = item[1] if item else None
+        else:
+            task_id = self.redis.blmove(
+                self.queue_key, self.processing_key, timeout, "LEFT", "RIGHT"
+            )
+        if task_id is None:
+            return None
+        task_id = task_id.decode("utf-8")
+        pipeline = self.redis.pipeline()
+        pipeline.zrem(self.enqueued_key, task_id)
+        if self.reliable:
+            pipeline.set(
+                self.heartbeat_key(task_id),
+                self.worker_id,
+                ex=settings.TASK_QUEUE_VISIBILITY_TIMEOUT,
+            )
+            pipeline.hincrby(self.attempts_key, task_id, 1)
+            pipeline.sadd(self.workers_key, self.worker_id)
+        pipeline.execute()
+        return task_id
+
+    def heartbeat(self, task_ids: List[str]):
+        """Signal that the given tasks are still being worked on."""
+        if not self.reliable or not task_ids:
+            return
+        pipeline = self.redis.pipeline()
+        for task_id in task_ids:
+            pipeline.set(
+                self.heartbeat_key(task_id),
+                self.worker_id,
+                ex=settings.TASK_QUEUE_VISIBILITY_TIMEOUT,
+            )
+        pipeline.execute()
+
+    def ack(self, task_id: str):
+        """Remove a finished task from the queue for good."""
+        if not self.reliable:
+            return
+        pipeline = self.redis.pipeline()
+        pipeline.lrem(self.processing_key, 1, task_id)
+        pipeline.delete(self.heartbeat_key(task_id))
+        pipeline.hdel(self.attempts_key, task_id)
+        pipeline.execute()
+
+    def release(self, processing_key: str, task_id: str) -> Optional[str]:
+        """
+        Take a task off a processing list and queue it again, or move it to the
+        dead-letter list if it ran out of attempts.
+
+        :return: The list the task was moved to, None if another worker got to it first
+        """
+        attempts = int(self.redis.hget(self.attempts_key, task_id) or 0)
+        dead = attempts >= settings.TASK_QUEUE_MAX_ATTEMPTS
+        target = self.dead_letter_key if dead else self.queue_key
+        # LMOVE can't move a specific element, so remove and push in a script.
+        # Retried tasks go to the front, they've waited long enough.
+        removed = self.release_script(
+            keys=[
+                processing_key,
+                target,
+                self.attempts_key,
+                self.enqueued_key,
+                self.doorbell_key,
+            ],
+            args=[task_id, 1 if dead else 0, time.time(), 1 if self.fair_share else 0],
+        )
+        if not removed:
+            # The task was acknowledged or released in the meantime
+            return None
+        logger.warning(
+            f"Task {task_id} stalled after {attempts} attempt(s), moved to {target}"
+        )
+        return target
+
+    def recover(self) -> List[Tuple[str, str]]:
+        """Release the tasks that this worker left behind before it restarted."""
+        if not self.reliable:
+            return []
+        released = []
+        for task_id in self.redis.lrange(self.processing_key, 0, -1):
+            task_id = task_id.decode("utf-8")
+            target = self.release(self.processing_key, task_id)
+            if target:
+                released.append((task_id, target))
+        return released
+
+    def reclaim(self) -> List[Tuple[str, str]]:
+        """
+        Release the tasks of all workers whose heartbeat expired.
+
+        A task is only reclaimed if it had no heartbeat in two consecutive calls,
+        so that tasks that were just popped, but don't have a heartbeat yet,
+        aren't taken away from their worker.
+
+        :return: The released tasks and the lists they were moved to
+        """
+        if not self.reliable:
+            return []
+        released = []
+        suspects = set()
+        for worker_id in self.redis.smembers(self.workers_key):
+            processing_key = self.processing_key_of(worker_id.decode("utf-8"))
+            task_ids = [
+                t.decode("utf-8") for t in self.redis.lrange(processing_key, 0, -1)
+            ]
+            if not task_ids:
+                self.redis.srem(self.workers_key, worker_id)
+                continue
+            pipeline = self.redis.pipeline()
+            for task_id in task_ids:
+                pipeline.exists(self.heartbeat_key(task_id))
+            for task_id, alive in zip(task_ids, pipeline.execute()):
+                if alive:
+                    continue
+                if (processing_key, task_id) not in self.suspects:
+                    suspects.add((processing_key, task_id))
+                    continue
+                target = self.release(processing_key, task_id)
+                if target:
+                    released.append((task_id, target))
+        self.suspects = suspects
+        return released
+
+    def dead_letters(self) -> List[str]:
+        return [
+            t.decode("utf-8") for t in self.redis.lrange(self.dead_letter_key, 0, -1)
+        ]
+
+    def depth(self) -> int:
+        """Number of tasks waiting to be picked up."""
+        if not self.fair_share:
+            return self.redis.llen(self.queue_key)
+        pipeline = self.redis.pipeline()
+        pipeline.llen(self.queue_key)
+        for name, _ in self.priorities:
+            pipeline.lrange(self.ring_key(name), 0, -1)
+        queued, *rings = pipeline.execute()
+        # Only projects in a ring have tasks waiting
+        for (name, _), projects in zip(self.priorities, rings):
+            for project in projects:
+                pipeline.llen(self.subqueue_key(name, project.decode("utf-8")))
+        return queued + sum(pipeline.execute())
+
+    def register_worker(self, idle: int, slots: int):
+        """
+        Announce how many tasks this worker could take right now. Workers that
+        stop announcing drop out of the pool after the visibility timeout.
+        """
+        pipeline = self.redis.pipeline()
+        pipeline.hset(
+            self.pool_worker_key(self.worker_id), mapping={"idle": idle, "slots": slots}
+        )
+        pipeline.expire(
+            self.pool_worker_key(self.worker_id), settings.TASK_QUEUE_VISIBILITY_TIMEOUT
+        )
+        pipeline.sadd(self.pool_key, self.worker_id)
+        pipeline.execute()
+
+    def pool_workers(self) -> Dict[str, Tuple[int, int]]:
+        """Idle and total task slots of each live worker."""
+        worker_ids = list(self.redis.smembers(self.pool_key))
+        pipeline = self.redis.pipeline()
+        for worker_id in worker_ids:
+            pipeline.hgetall(self.pool_worker_key(worker_id.decode("utf-8")))
+        workers = {}
+        for worker_id, state in zip(worker_ids, pipeline.execute()):
+            if not state:
+                self.redis.srem(self.pool_key, worker_id)
+                continue
+            workers[worker_id.decode("utf-8")] = (
+                int(state[b"idle"]),
+                int(state[b"slots"]),
+            )
+        return workers
+
+    def pool_capacity(self) -> Tuple[int, int]:
+        """Idle and total task slots of all live workers."""
+        workers = self.pool_workers().values()
+        return sum(idle for idle, _ in workers), sum(slots for _, slots in workers)
+
+    def metrics(self) -> dict:
+        """Load of the queue and the worker pool, for autoscalers and dashboards."""
+        idle, slots = self.pool_capacity()
+        depth = self.depth()
+        oldest = self.redis.zrange(self.enqueued_key, 0, 0, withscores=True)
+        return {
+            "depth": depth,
+            "oldest_age_seconds": round(time.time() - oldest[0][1], 1) if oldest else 0,
+            "in_flight": slots - idle,
+            "idle_slots": idle,
+            "slots": slots,
+            # Tasks that need a worker, running or waiting
+            "backlog": depth + slots - idle,
+            "dead_letters": self.redis.llen(self.dead_letter_key),
+        }
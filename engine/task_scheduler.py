@@ -1,25 +1,26 @@
 import logging
-import os
 import threading
+
 import redis
 
 from accounts.models import UserBudget
 from engine.job import KubernetesJob
+from engine.task_queue import TaskQueue
 from engine.util import run_task_in_background
 from prpilot import settings
 
-
 logger = logging.getLogger(__name__)
 
+# People waiting for an answer on GitHub go ahead of API and dashboard tasks
+INTERACTIVE_TASK_TYPES = ["github_issue", "github_review_comment"]
+
 
 class TaskScheduler:
 
     def __init__(self, task):
         self.task = task
         self.context = self.task.context
-        self.redis_queue = redis.Redis(
-            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
-        )
+        self.task_queue = TaskQueue()
 
     def user_budget_empty(self):
         budget = UserBudget.get_user_budget(self.task.github_user)
@@ -36,6 +37,31 @@ class TaskScheduler:
         rate_limit = self.task.github.get_rate_limit()
         return rate_limit.core.remaining == 0
 
+    def priority(self) -> str:
+        """Priority class of the task in the fair-share queue"""
+        if self.task.task_type in INTERACTIVE_TASK_TYPES:
+            return "interactive"
+        return "batch"
+
+    def enqueue(self):
+        self.task_queue.push(
+            str(self.task.id),
+            project=self.task.github_project,
+            priority=self.priority(),
+        )
+
+    def pool_has_capacity(self) -> bool:
+        """
+        Check if an idle worker would pick up the task. Concurrent schedulers may
+        both see the same idle slot, then one of the tasks waits for the next.
+        """
+        try:
+            idle, _ = self.task_queue.pool_capacity()
+            return idle > self.task_queue.depth()
+        except redis.RedisError as e:
+            logger.warning(f"Could not check worker pool capacity: {e}")
+            return False
+
     def schedule(self):
         self.context.acknowledge_user_prompt()
         if self.user_budget_empty():
@@ -74,8 +100,6 @@ class TaskScheduler:
             return
         if settings.JOB_STRATEGY == "thread":
             # In local development, just run the task in a background thread
-            settings.TASK_ID = self.task.id
-            os.environ["TASK_ID"] = str(self.task.id)
             logger.info(f"Running task in debug mode: {self.task.id}")
             thread = threading.Thread(
                 target=run_task_in_background, args=(self.task.id,)
@@ -90,7 +114,15 @@ class TaskScheduler:
             logger.info(f"Running task in log mode: {self.task.id}")
         elif settings.JOB_STRATEGY == "redis":
             logger.info(f"Scheduling task via Redis: {self.task.id}")
-            self.redis_queue.rpush(settings.REDIS_QUEUE, str(self.task.id))
+            self.enqueue()
+        elif settings.JOB_STRATEGY == "hybrid":
+            # Idle workers start right away, a new job pod has to boot first
+            if self.pool_has_capacity():
+                logger.info(f"Scheduling task via worker pool: {self.task.id}")
+                self.enqueue()
+            else:
+                logger.info(f"Worker pool exhausted, spawning job: {self.task.id}")
+                KubernetesJob(self.task).spawn()
         else:
             raise ValueError(f"Invalid JOB_STRATEGY: {settings.JOB_STRATEGY}")
 
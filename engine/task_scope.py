@@ -0,0 +1,55 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Optional
+
+from django.conf import settings
+
+# Task being run and its workspace, local to the thread or coroutine running it
+current_task_id: ContextVar[Optional[str]] = ContextVar("current_task_id", default=None)
+current_repo_dir: ContextVar[Optional[str]] = ContextVar(
+    "current_repo_dir", default=None
+)
+# Objects cached for as long as the task runs, see `task_cache`
+current_task_cache: ContextVar[Optional[dict]] = ContextVar(
+    "current_task_cache", default=None
+)
+
+
+def get_task_id() -> Optional[str]:
+    """ID of the current task, falling back to the `TASK_ID` of single-task processes."""
+    return current_task_id.get() or settings.TASK_ID
+
+
+def get_repo_dir() -> str:
+    """Workspace of the current task, falling back to `REPO_DIR`."""
+    return current_repo_dir.get() or settings.REPO_DIR
+
+
+def task_cache() -> Optional[dict]:
+    """Storage that lives as long as the current task scope, None outside of one."""
+    return current_task_cache.get()
+
+
+@contextmanager
+def task_scope(task_id, repo_dir: str = None):
+    """Run the enclosed code on behalf of a task, optionally in its own workspace."""
+    task_token = current_task_id.set(str(task_id))
+    repo_token = current_repo_dir.set(repo_dir) if repo_dir else None
+    cache_token = current_task_cache.set({})
+    try:
+        yield
+    finally:
+        current_task_cache.reset(cache_token)
+        if repo_token:
+            current_repo_dir.reset(repo_token)
+        current_task_id.reset(task_token)
+
+
+def context_thread(target, *args, **kwargs) -> threading.Thread:
+    """
+    Create a thread that runs `target` in a copy of the current context, so that
+    it acts on behalf of the same task. Threads don't inherit context variables.
+    """
+    context = copy_context()
+    return threading.Thread(target=context.run, args=(target, *args), kwargs=kwargs)
@@ -1,37 +1,149 @@
 import logging
 import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import redis
 from django.conf import settings
-from sentry_sdk import configure_scope
+from django.db import connections
+from sentry_sdk import Hub, configure_scope
 
+from engine.file_system import FileSystem
 from engine.models.task import Task
+from engine.repo_cache import maintain_cache
+from engine.repo_prewarmer import RepoPrewarmer
 from engine.task_engine import TaskEngine
+from engine.task_queue import TaskQueue
+from engine.task_scope import task_scope
 
 logger = logging.getLogger(__name__)
 
 
 class TaskWorker:
+    """
+    Runs tasks from the Redis queue. Up to `TASK_WORKER_CONCURRENCY` tasks run at
+    the same time, each in its own thread and workspace.
+
+    Workers announce their idle slots, so that the scheduler can tell whether a
+    task would be picked up right away. With `REDIS_QUEUE_RELIABLE`, the worker
+    also sends heartbeats for the tasks it runs and reclaims the stalled tasks
+    of other workers.
+    """
 
     def __init__(self):
-        self.redis_queue = redis.Redis(
-            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+        self.queue = TaskQueue()
+        self.concurrency = max(settings.TASK_WORKER_CONCURRENCY, 1)
+        # Only take tasks off the queue when there's a thread to run them
+        self.slots = threading.Semaphore(self.concurrency)
+        self.pool = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="task"
         )
+        self.maintenance_lock = threading.Lock()
+        self.last_cache_maintenance = 0
+        self.in_flight = set()
+        self.in_flight_lock = threading.Lock()
+
+    def fail_dead_tasks(self, released):
+        """Mark tasks that ran out of attempts as failed, nobody will pick them up again."""
+        for task_id, target in released:
+            if target != self.queue.dead_letter_key:
+                continue
+            logger.error(f"Task {task_id} moved to dead-letter list")
+            Task.objects.filter(id=task_id).update(
+                status="failed",
+                result="The task was interrupted too many times and has been given up.",
+            )
+
+    def announce(self):
+        """Update the worker's idle slots in the worker pool."""
+        with self.in_flight_lock:
+            idle = self.concurrency - len(self.in_flight)
+        try:
+            self.queue.register_worker(idle, self.concurrency)
+        except redis.RedisError as e:
+            logger.warning(f"Could not announce idle slots: {e}")
+
+    def keep_alive(self):
+        """
+        Stay in the worker pool, send heartbeats for running tasks and reclaim
+        stalled tasks of other workers.
+        """
+        # Heartbeats have to arrive well within the visibility timeout
+        interval = max(settings.TASK_QUEUE_VISIBILITY_TIMEOUT / 4, 1)
+        while True:
+            try:
+                self.announce()
+                with self.in_flight_lock:
+                    running = list(self.in_flight)
+                self.queue.heartbeat(running)
+                self.fail_dead_tasks(self.queue.reclaim())
+            except Exception as e:
+                logger.error("Failed to maintain task queue", exc_info=e)
+            finally:
+                connections.close_all()
+            time.sleep(interval)
+
+    def maintain_repo_cache(self):
+        """Keep the worker's repository cache within its size limit, between tasks."""
+        if (
+            time.time() - self.last_cache_maintenance
+            < settings.REPO_CACHE_MAINTENANCE_INTERVAL_SECONDS
+        ):
+            return
+        # Other threads keep running tasks while one of them maintains the cache
+        if not self.maintenance_lock.acquire(blocking=False):
+            return
+        try:
+            maintain_cache()
+        except OSError as e:
+            logger.error("Failed to maintain repository cache", exc_info=e)
+        finally:
+            self.last_cache_maintenance = time.time()
+            self.maintenance_lock.release()
+
+    def run_task(self, task_id: str):
+        """Run a task in its own workspace and clean up afterwards."""
+        workspace = os.path.join(settings.TASK_WORKSPACES_DIR, task_id)
+        try:
+            with task_scope(task_id, workspace), Hub(Hub.current):
+                task = Task.objects.get(id=task_id)
+                engine = TaskEngine(task)
+                with configure_scope() as scope:
+                    scope.set_tag("task_id", str(task.id))
+                    scope.set_tag("github_user", task.github_user)
+                    scope.set_tag("github_project", task.github_project)
+                    scope.set_tag("github_issue", task.issue_number)
+                    scope.set_tag("github_pr", task.pr_number)
+                    engine.run()
+        except Exception as e:
+            logger.error(f"Failed to run task {task_id}", exc_info=e)
+        finally:
+            self.queue.ack(task_id)
+            with self.in_flight_lock:
+                self.in_flight.discard(task_id)
+            self.announce()
+            shutil.rmtree(workspace, ignore_errors=True)
+            FileSystem.invalidate(workspace)
+            # Database connections are per thread, don't leave them open in the pool
+            connections.close_all()
+            self.slots.release()
+        self.maintain_repo_cache()
 
     def run(self):
-        logger.info("Running task worker")
+        logger.info(f"Running task worker with {self.concurrency} threads")
+        if settings.REPO_CACHE_PREWARM:
+            threading.Thread(target=RepoPrewarmer().run, daemon=True).start()
+        if self.queue.reliable:
+            # Tasks this worker was running before it restarted
+            self.fail_dead_tasks(self.queue.recover())
+        threading.Thread(target=self.keep_alive, daemon=True).start()
         while True:
-            _, task_id = self.redis_queue.blpop([settings.REDIS_QUEUE])
-            task_id = task_id.decode("utf-8")
-            settings.TASK_ID = task_id
-            os.environ["TASK_ID"] = task_id
+            self.slots.acquire()
+            task_id = self.queue.pop()
             logger.info(f"Received task {task_id}")
-            task = Task.objects.get(id=task_id)
-            engine = TaskEngine(task)
-            with configure_scope() as scope:
-                scope.set_tag("task_id", str(task.id))
-                scope.set_tag("github_user", task.github_user)
-                scope.set_tag("github_project", task.github_project)
-                scope.set_tag("github_issue", task.issue_number)
-                scope.set_tag("github_pr", task.pr_number)
-                engine.run()
+            with self.in_flight_lock:
+                self.in_flight.add(task_id)
+            self.announce()
+            self.pool.submit(self.run_task, task_id)
@@ -0,0 +1,181 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from engine.file_system import FileSystem
+from engine.file_system.file_system import tree_cache, git_index_stamp
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """A minimal workspace with a git index, so that its tree gets cached."""
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "index").write_text("")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").write_text("print('hello')")
+    (tmp_path / "README.md").write_text("# Hello")
+    yield tmp_path
+    FileSystem.invalidate(tmp_path)
+
+
+def touch_index(workspace: Path):
+    stamp = git_index_stamp(workspace)
+    os.utime(workspace / ".git" / "index", ns=(stamp + 10**9, stamp + 10**9))
+
+
+def test_tree_is_reused_until_git_index_changes(workspace):
+    first = FileSystem(workspace)
+    assert FileSystem(workspace).tree is first.tree
+
+    touch_index(workspace)
+    assert FileSystem(workspace).tree is not first.tree
+
+
+def test_workspaces_without_git_index_are_not_cached(tmp_path):
+    (tmp_path / "file.txt").write_text("content")
+    FileSystem(tmp_path)
+    assert str(tmp_path) not in tree_cache
+
+
+def test_save_updates_cached_tree_incrementally(workspace):
+    fs = FileSystem(workspace)
+    fs.save("new content", Path("docs/guide/index.md"))
+
+    cached = FileSystem(workspace)
+    assert cached.tree is fs.tree
+    node = cached.get_node(Path("docs/guide/index.md"))
+    assert node is not None
+    assert node.parent.path == workspace / "docs" / "guide"
+
+
+def test_move_copy_and_delete_update_cached_tree(workspace):
+    fs = FileSystem(workspace)
+    fs.copy_file("README.md", "docs/README.md")
+    fs.move_file("src/main.py", "src/app/main.py")
+    fs.delete_file("README.md")
+
+    cached = FileSystem(workspace)
+    assert cached.get_node(Path("docs/README.md"))
+    assert cached.get_node(Path("src/app/main.py"))
+    assert not cached.get_node(Path("src/main.py"))
+    assert not cached.get_node(Path("README.md"))
+
+
+def test_refresh_index_stamp_keeps_accurate_tree(workspace):
+    fs = FileSystem(workspace)
+    stamp = git_index_stamp(workspace)
+    touch_index(workspace)
+    FileSystem.refresh_index_stamp(stamp, workspace)
+    assert FileSystem(workspace).tree is fs.tree
+
+    # A stamp that doesn't match the cached tree must not revive it
+    touch_index(workspace)
+    FileSystem.refresh_index_stamp(stamp, workspace)
+    assert FileSystem(workspace).tree is not fs.tree
+
+
+def test_get_node_normalizes_paths(workspace):
+    fs = FileSystem(workspace)
+    node = fs.get_node(Path("src/main.py"))
+    assert node is not None
+    assert fs.get_node(Path("./src//main.py")) is node
+    assert fs.get_node(workspace / "src" / "main.py") is node
+    assert fs.get_node(Path(".")) is fs.tree
+    assert fs.get_node(Path("../outside.txt")) is None
+    assert fs.get_node(Path("/elsewhere/src/main.py")) is None
+
+
+def test_nodes_keep_their_type_without_touching_the_disk(workspace):
+    fs = FileSystem(workspace)
+    directory = fs.get_node(Path("src"))
+    file = fs.get_node(Path("src/main.py"))
+    (workspace / "src" / "main.py").unlink()
+    (workspace / "src").rmdir()
+
+    assert directory.is_directory and not directory.is_file
+    assert file.is_file and not file.is_directory
+    assert file.path == workspace / "src" / "main.py"
+    assert file.parent is directory
+    assert not hasattr(file, "__dict__")
+
+
+def tree_paths(fs: FileSystem):
+    return sorted(str(path) for path in fs.nodes_by_path)
+
+
+def test_parallel_walk_builds_the_same_tree(tmp_path, settings):
+    for i in range(20):
+        (tmp_path / f"pkg{i % 4}" / f"mod{i % 3}").mkdir(parents=True, exist_ok=True)
+        (tmp_path / f"pkg{i % 4}" / f"mod{i % 3}" / f"file{i}.py").write_text("")
+    (tmp_path / "venv" / "lib").mkdir(parents=True)
+
+    settings.FILE_SYSTEM_WALK_WORKERS = 1
+    sequential = tree_paths(FileSystem(tmp_path))
+    settings.FILE_SYSTEM_WALK_WORKERS = 8
+    parallel = tree_paths(FileSystem(tmp_path))
+
+    assert parallel == sequential
+    assert "pkg3/mod2/file11.py" in parallel
+    assert not any(path.startswith("venv") for path in parallel)
+
+
+def test_tree_from_git_ls_files(tmp_path, settings):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").write_text("")
+    (tmp_path / "src" / "deleted.py").write_text("")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.js").write_text("")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+    (tmp_path / "src" / "deleted.py").unlink()
+    (tmp_path / "untracked.txt").write_text("")
+
+    settings.FILE_SYSTEM_USE_GIT_LS_FILES = True
+    try:
+        fs = FileSystem(tmp_path)
+        assert tree_paths(fs) == [
+            ".",
+            ".gitignore",
+            "src",
+            "src/main.py",
+            "untracked.txt",
+        ]
+        assert fs.get_node(Path("src")).is_directory
+    finally:
+        FileSystem.invalidate(tmp_path)
+
+
+def test_gitignore_never_hides_tracked_files(tmp_path, settings):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    # Whitelist-style .gitignore: ignore everything but src/
+    (tmp_path / ".gitignore").write_text("/*\n!/src\n")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+    git("add", "src", "-f", ".gitignore")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+
+    settings.FILE_SYSTEM_USE_GIT_LS_FILES = True
+    try:
+        fs = FileSystem(tmp_path)
+        assert tree_paths(fs) == [".", ".gitignore", "src", "src/a.py"]
+        assert fs.get_node(Path("src/a.py"))
+    finally:
+        FileSystem.invalidate(tmp_path)
+
+
+def test_yaml_lists_the_tree(workspace, settings):
+    settings.REPO_DIR = str(workspace)
+    listing = FileSystem(workspace).yaml()
+    assert "main.py" in listing
+    assert "README.md" in listing
@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from engine.github_cache import github_cache
+from engine.project import Project
+from engine.task_scope import context_thread, task_scope
+
+
+@pytest.fixture
+def github():
+    return MagicMock()
+
+
+@pytest.fixture(autouse=True)
+def revalidate_after(settings):
+    settings.GITHUB_CACHE_REVALIDATE_SECONDS = 30
+
+
+def test_objects_are_reused_within_a_task(github):
+    with task_scope("task-1"):
+        first = github_cache(github).get_issue("owner/repo", 1)
+        second = github_cache(github).get_issue("owner/repo", 1)
+        github_cache(github).get_pull("owner/repo", 2)
+    assert first is second
+    github.get_repo.assert_called_once_with("owner/repo")
+    github.get_repo.return_value.get_issue.assert_called_once_with(1)
+    github.get_repo.return_value.get_pull.assert_called_once_with(2)
+
+
+def test_objects_are_revalidated_after_a_while(github):
+    with task_scope("task-1"), patch("engine.github_cache.time.time") as now:
+        now.return_value = 1000
+        issue = github_cache(github).get_issue("owner/repo", 1)
+        now.return_value = 1031
+        assert github_cache(github).get_issue("owner/repo", 1) is issue
+        assert github_cache(github).get_issue("owner/repo", 1) is issue
+    issue.update.assert_called_once()
+    github.get_repo.return_value.get_issue.assert_called_once()
+
+
+def test_invalidated_objects_are_fetched_again(github):
+    with task_scope("task-1"):
+        github_cache(github).get_issue("owner/repo", 1)
+        github_cache(github).invalidate("issue", "owner/repo", 1)
+        github_cache(github).get_issue("owner/repo", 1)
+    assert github.get_repo.return_value.get_issue.call_count == 2
+    github.get_repo.assert_called_once()
+
+
+def test_caches_are_not_shared_between_tasks(github):
+    with task_scope("task-1"):
+        cache = github_cache(github)
+        thread = context_thread(lambda: seen.append(github_cache(github)))
+        seen = []
+        thread.start()
+        thread.join()
+    assert seen == [cache]
+    with task_scope("task-2"):
+        assert github_cache(github) is not cache
+    assert github_cache(github) is not github_cache(github)
+
+
+@pytest.mark.django_db
+def test_project_reuses_the_task_repository(task, settings):
+    settings.REPO_CACHE_PRIVATE_REPOS = False
+    github = MagicMock()
+    repo = github.get_repo.return_value
+    repo.full_name, repo.default_branch, repo.private = "test_project", "main", False
+    with patch("engine.models.task.Github", return_value=github), patch(
+        "engine.models.task.get_installation_access_token"
+    ):
+        project = Project.from_github()
+        assert project.caching_enabled()
+        assert project.caching_enabled()
+    github.get_repo.assert_called_once_with("test_project")
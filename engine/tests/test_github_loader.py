@@ -0,0 +1,140 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from engine.github_loader import (
+    GithubQueryError,
+    load_issue,
+    load_patches,
+    run_graphql_query,
+    split_diff,
+)
+
+DIFF = """diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -1,2 +1,2 @@
+-print("hello")
++print("hello world")
+ exit()
+diff --git a/old.txt b/new.txt
+similarity index 100%
+rename from old.txt
+rename to new.txt
+diff --git a/logo.png b/logo.png
+new file mode 100644
+Binary files /dev/null and b/logo.png differ
+diff --git a/gone.md b/gone.md
+deleted file mode 100644
+--- a/gone.md
++++ /dev/null
+@@ -1 +0,0 @@
+-+++ b/not-a-header
+\\ No newline at end of file
+"""
+
+
+def page(nodes, cursor=None):
+    return {
+        "pageInfo": {"hasNextPage": cursor is not None, "endCursor": cursor},
+        "nodes": nodes,
+    }
+
+
+def issue_data(comments):
+    return {
+        "repository": {
+            "issueOrPullRequest": {
+                "number": 1,
+                "title": "Bug",
+                "comments": comments,
+            }
+        }
+    }
+
+
+def test_split_diff_matches_rest_patches():
+    assert split_diff(DIFF) == {
+        "app.py": '@@ -1,2 +1,2 @@\n-print("hello")\n+print("hello world")\n exit()',
+        "gone.md": "@@ -1 +0,0 @@\n-+++ b/not-a-header\n\\ No newline at end of file",
+    }
+
+
+def test_split_diff_unquotes_paths():
+    diff = (
+        'diff --git "a/t\\303\\251.py" "b/t\\303\\251.py"\n'
+        "index 1111111..2222222 100644\n"
+        '--- "a/t\\303\\251.py"\n'
+        '+++ "b/t\\303\\251.py"\n'
+        "@@ -1 +1 @@\n"
+        "-a\n"
+        "+b\n"
+        'diff --git "a/with\\ttab" "b/with\\ttab"\n'
+        "new file mode 100644\n"
+        "@@ -0,0 +1 @@\n"
+        "+c\n"
+    )
+    assert split_diff(diff) == {
+        "té.py": "@@ -1 +1 @@\n-a\n+b",
+        "with\ttab": "@@ -0,0 +1 @@\n+c",
+    }
+
+
+def test_load_issue_pages_through_connections():
+    with patch("engine.github_loader.run_graphql_query") as query:
+        query.side_effect = [
+            issue_data(page([{"body": "first"}], cursor="c1")),
+            issue_data(page([{"body": "second"}], cursor="c2")),
+            issue_data(page([{"body": "third"}])),
+        ]
+        issue = load_issue("token", "owner/repo", 1)
+    assert [comment["body"] for comment in issue["comments"]] == [
+        "first",
+        "second",
+        "third",
+    ]
+    assert query.call_count == 3
+    assert query.call_args_list[0].args[2] == {
+        "owner": "owner",
+        "name": "repo",
+        "number": 1,
+    }
+    assert query.call_args_list[2].args[2]["after"] == "c2"
+    assert "after: $after" in query.call_args_list[2].args[1]
+
+
+@pytest.mark.parametrize("data", [{"repository": None}, issue_data(None)])
+def test_load_issue_returns_none_for_missing_issues(data):
+    data["repository"] and data["repository"].update(issueOrPullRequest=None)
+    with patch("engine.github_loader.run_graphql_query", return_value=data):
+        assert load_issue("token", "owner/repo", 1) is None
+
+
+def test_run_graphql_query_ignores_not_found_errors():
+    response = MagicMock()
+    response.json.return_value = {
+        "data": {"repository": {"pullRequest": None}},
+        "errors": [{"type": "NOT_FOUND", "message": "Could not resolve"}],
+    }
+    with patch("engine.github_loader.http_session") as session:
+        session.return_value.post.return_value = response
+        assert run_graphql_query("token", "query", {}) == {
+            "repository": {"pullRequest": None}
+        }
+    response.json.return_value["errors"][0]["type"] = "FORBIDDEN"
+    with patch("engine.github_loader.http_session") as session:
+        session.return_value.post.return_value = response
+        with pytest.raises(GithubQueryError):
+            run_graphql_query("token", "query", {})
+
+
+def test_load_patches_falls_back_to_files_for_large_diffs():
+    too_large = MagicMock(status_code=406)
+    files = MagicMock(status_code=200)
+    files.json.return_value = [{"filename": "app.py", "patch": "@@ -1 +1 @@"}]
+    with patch("engine.github_loader.http_session") as session:
+        get = session.return_value.get
+        get.side_effect = [too_large, files]
+        assert load_patches("token", "owner/repo", 1) == {"app.py": "@@ -1 +1 @@"}
+    assert get.call_args_list[1].args[0].endswith("/repos/owner/repo/pulls/1/files")
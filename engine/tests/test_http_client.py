@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+import pytest
+
+from engine.http_client import IntegrationRetry, http_session
+
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    http_session.cache_clear()
+    yield
+    http_session.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "method, status, retried",
+    [
+        ("GET", 503, True),
+        ("GET", 429, True),
+        ("POST", 429, True),
+        ("POST", 503, False),
+        ("GET", 404, False),
+    ],
+)
+def test_retries(method, status, retried):
+    retry = IntegrationRetry(total=3, status_forcelist=(429, 500, 502, 503, 504))
+    assert retry.is_retry(method, status) is retried
+
+
+def test_session_is_shared_and_pooled(settings):
+    settings.HTTP_MAX_CONNECTIONS_PER_HOST = 4
+    session = http_session()
+    assert http_session() is session
+    adapter = session.get_adapter("https://api.linear.app/graphql")
+    assert adapter._pool_maxsize == 4
+    assert adapter._pool_block is True
+
+
+def test_requests_get_a_default_timeout(settings):
+    settings.HTTP_CONNECT_TIMEOUT = 2
+    settings.HTTP_READ_TIMEOUT = 20
+    with patch("requests.Session.request") as request:
+        http_session().get("https://sentry.io/api/0/")
+        http_session().post("https://sentry.io/api/0/", timeout=5)
+    assert request.call_args_list[0].kwargs["timeout"] == (2, 20)
+    assert request.call_args_list[1].kwargs["timeout"] == 5
+
+
+def test_cookies_are_not_kept():
+    policy = http_session().cookies.get_policy()
+    assert policy.allowed_domains() == ()
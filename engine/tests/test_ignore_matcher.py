@@ -0,0 +1,72 @@
+import pytest
+
+from engine.file_system import FileSystem
+from engine.file_system.ignore_matcher import IgnoreMatcher
+
+PATTERNS = [
+    "# comment",
+    "",
+    "node_modules",
+    "*.pyc",
+    "/build",
+    "docs/_build",
+    "logs/",
+    "config/*.local.yaml",
+    "**/*.egg-info",
+    "!keep.pyc",
+]
+
+
+@pytest.fixture
+def matcher():
+    return IgnoreMatcher(PATTERNS)
+
+
+@pytest.mark.parametrize(
+    "path,is_directory,ignored",
+    [
+        ("node_modules", True, True),
+        ("web/node_modules/react/index.js", False, True),
+        ("src/main.py", False, False),
+        ("src/main.pyc", False, True),
+        ("keep.pyc", False, True),
+        ("build/output.o", False, True),
+        ("src/build/output.o", False, False),
+        ("docs/_build/index.html", False, True),
+        ("docs/index.md", False, False),
+        ("logs", True, True),
+        ("app/logs/today.txt", False, True),
+        ("logs", False, False),
+        ("config/dev.local.yaml", False, True),
+        ("config/dev.yaml", False, False),
+        ("lib/pr_pilot.egg-info/PKG-INFO", False, True),
+    ],
+)
+def test_is_ignored(matcher, path, is_directory, ignored):
+    assert matcher.is_ignored(path, is_directory) == ignored
+
+
+def test_match_only_checks_the_path_itself(matcher):
+    assert matcher.match("web/node_modules", True)
+    assert not matcher.match("web/node_modules/react", True)
+
+
+def test_file_system_prunes_ignored_directories(tmp_path, monkeypatch):
+    (tmp_path / "venv").mkdir()
+    (tmp_path / "venv" / "schema.py").write_text("")
+    (tmp_path / "main.py").write_text("")
+    (tmp_path / "main.pyc").write_text("")
+    checked_paths = []
+    original_match = IgnoreMatcher.match
+
+    def match(self, relative_path, is_directory=False):
+        checked_paths.append(relative_path)
+        return original_match(self, relative_path, is_directory)
+
+    monkeypatch.setattr(IgnoreMatcher, "match", match)
+    fs = FileSystem(tmp_path)
+
+    assert fs.list_files() == [tmp_path / "main.py"]
+    assert "venv/schema.py" not in checked_paths
+    assert fs.should_be_ignored("venv/schema.py")
+    assert not fs.should_be_ignored("main.py")
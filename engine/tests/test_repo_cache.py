@@ -0,0 +1,280 @@
+import os
+import subprocess
+import time
+from unittest.mock import patch
+
+import git
+import pytest
+
+from engine.project import Project
+from engine.repo_cache import (
+    RepoCache,
+    cached_repos,
+    evict_repos,
+    gc_repos,
+    read_metadata,
+    select_clone_strategy,
+    update_metadata,
+)
+from engine.util import extract_file_paths
+
+
+def run_git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@test", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+def commit_file(repo_dir, path, content):
+    file_path = repo_dir / path
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text(content)
+    run_git(repo_dir, "add", path)
+    run_git(repo_dir, "commit", "-q", "-m", f"Update {path}")
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """A repository with a `feature` branch that diverged from `main` a few commits ago."""
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    run_git(origin, "init", "-q", "-b", "main")
+    run_git(origin, "config", "uploadpack.allowFilter", "true")
+    commit_file(origin, "README.md", "# Project")
+    commit_file(origin, "src/app.py", "print('app')")
+    commit_file(origin, "docs/guide.md", "# Guide")
+    run_git(origin, "checkout", "-q", "-b", "feature")
+    for i in range(3):
+        commit_file(origin, "src/app.py", f"print('feature {i}')")
+    run_git(origin, "checkout", "-q", "main")
+    for i in range(3):
+        commit_file(origin, "docs/guide.md", f"# Guide {i}")
+    return origin
+
+
+@pytest.fixture
+def cache(origin, tmp_path):
+    cache = RepoCache("owner/repo", "token", workspace=str(tmp_path / "workspace"))
+    cache.git_repo_url = cache.cache_repo_url = f"file://{origin}"
+    return cache
+
+
+@pytest.mark.parametrize(
+    "strategy,size_kb,paths,expected",
+    [
+        ("auto", 1024, ["src/app.py"], "full"),
+        ("auto", 100 * 1024, ["src/app.py"], "partial"),
+        ("auto", 2 * 1024 * 1024, ["src/app.py"], "partial"),
+        ("sparse", 1024, ["src/app.py"], "sparse"),
+        ("auto", 2 * 1024 * 1024, [], "partial"),
+        ("shallow", 2 * 1024 * 1024, [], "shallow"),
+        ("sparse", 1024, [], "partial"),
+        ("unknown", 1024, [], "full"),
+    ],
+)
+def test_select_clone_strategy(settings, strategy, size_kb, paths, expected):
+    settings.REPO_CLONE_STRATEGY = strategy
+    assert select_clone_strategy(size_kb, paths) == expected
+
+
+def test_partial_clone_fetches_contents_on_demand(cache, tmp_path):
+    destination = tmp_path / "partial"
+    cache.clone(str(destination), "partial")
+    repo = git.Repo(destination)
+    assert repo.git.config("remote.origin.partialclonefilter") == "blob:none"
+    repo.git.checkout("feature")
+    assert (destination / "src" / "app.py").read_text() == "print('feature 2')"
+
+
+def test_sparse_clone_checks_out_referenced_paths(cache, tmp_path):
+    destination = tmp_path / "sparse"
+    cache.clone(str(destination), "sparse", ["src/app.py"])
+    assert (destination / "README.md").exists()
+    assert (destination / "src" / "app.py").exists()
+    assert not (destination / "docs").exists()
+
+
+@pytest.mark.django_db
+def test_shallow_clone_is_deepened_for_diff_to_main(cache, tmp_path, settings):
+    settings.REPO_CLONE_DEPTH = 1
+    settings.REPO_DIR = str(tmp_path / "shallow")
+    cache.clone(settings.REPO_DIR, "shallow")
+    repo = git.Repo(settings.REPO_DIR)
+    repo.git.checkout("feature")
+    assert len(list(repo.iter_commits("feature"))) == 1
+
+    diff = Project(name="owner/repo", main_branch="main").get_diff_to_main()
+    assert "+print('feature 2')" in diff
+    assert "docs/guide.md" not in diff
+
+
+def test_extract_file_paths():
+    text = "Fix `src/app.py` and docs/, see https://example.com/a/b and README.md."
+    assert extract_file_paths(text) == ["src/app.py", "docs", "README.md"]
+
+
+@pytest.mark.parametrize("strategy", ["full", "partial"])
+def test_workspace_shares_objects_with_cache(cache, tmp_path, strategy):
+    cache.cache_destination = str(tmp_path / "cache")
+    cache.setup_workspace(strategy)
+
+    workspace = git.Repo(cache.workspace)
+    alternates = tmp_path / "workspace" / ".git" / "objects" / "info" / "alternates"
+    assert alternates.read_text().strip() == str(
+        tmp_path / "cache" / ".git" / "objects"
+    )
+    assert workspace.remote("origin").url == cache.git_repo_url
+    assert "origin/feature" in [ref.name for ref in workspace.remote("origin").refs]
+    workspace.git.checkout("feature")
+    assert (
+        tmp_path / "workspace" / "src" / "app.py"
+    ).read_text() == "print('feature 2')"
+
+
+def test_workspace_of_shallow_cache_copies_objects(cache, tmp_path, settings):
+    settings.REPO_CLONE_DEPTH = 1
+    cache.cache_destination = str(tmp_path / "cache")
+    cache.setup_workspace("shallow")
+
+    alternates = tmp_path / "workspace" / ".git" / "objects" / "info" / "alternates"
+    assert not alternates.exists()
+    assert read_metadata(cache.cache_destination)["workspaces"] == {}
+    workspace = git.Repo(cache.workspace)
+    workspace.git.checkout("feature")
+    assert (
+        tmp_path / "workspace" / "src" / "app.py"
+    ).read_text() == "print('feature 2')"
+
+
+def test_private_cache_is_isolated_and_keeps_no_token(origin, tmp_path, settings):
+    settings.REPO_CACHE_DIR = str(tmp_path / "cache")
+    cache = RepoCache(
+        "owner/repo", "secret-token", str(tmp_path / "workspace"), installation_id=42
+    )
+    assert cache.cache_destination == str(
+        tmp_path / "cache" / "installations" / "42" / "owner" / "repo"
+    )
+    cache.cache_repo_url = f"file://{origin}"
+    cache.setup_workspace()
+
+    config = (
+        tmp_path
+        / "cache"
+        / "installations"
+        / "42"
+        / "owner"
+        / "repo"
+        / ".git"
+        / "config"
+    )
+    assert "secret-token" not in config.read_text()
+    assert git.Repo(cache.workspace).remote("origin").url == cache.git_repo_url
+
+    # Reusing the cache requires access to the repository
+    cache.cache_repo_url = f"file://{tmp_path / 'gone'}"
+    with pytest.raises(PermissionError):
+        cache.setup_workspace()
+    assert not cache.is_cloned()
+
+
+def test_credential_helper_supplies_token(tmp_path):
+    cache = RepoCache("owner/repo", "secret-token", str(tmp_path / "workspace"))
+    result = subprocess.run(
+        ["git", "credential", "fill"],
+        input="protocol=https\nhost=github.com\n\n",
+        capture_output=True,
+        text=True,
+        env={**os.environ, **cache.credential_env},
+        check=True,
+    )
+    assert "username=x-access-token\npassword=secret-token" in result.stdout
+
+
+def create_cached_repo(cache_dir, name, size, last_used):
+    path = cache_dir / name
+    (path / ".git").mkdir(parents=True)
+    (path / "data").write_bytes(b"x" * size)
+    update_metadata(str(path), last_used=last_used)
+    return str(path)
+
+
+@patch("engine.repo_cache.record_metrics")
+def test_setup_workspace_records_usage_and_metrics(record_metrics, cache, tmp_path):
+    cache.cache_destination = str(tmp_path / "cache")
+    cache.setup_workspace()
+    assert record_metrics.call_args.kwargs.keys() == {
+        "misses",
+        "clone_seconds",
+        "fetches",
+        "fetch_seconds",
+    }
+    # The cache was just fetched, so the second task doesn't fetch again
+    cache.setup_workspace()
+    assert [c.kwargs for c in record_metrics.call_args_list[1:]] == [{"hits": 1}]
+
+    metadata = read_metadata(cache.cache_destination)
+    assert metadata["repo"] == "owner/repo"
+    assert time.time() - metadata["last_used"] < 60
+    assert list(metadata["workspaces"]) == [cache.workspace]
+
+
+@patch("engine.repo_cache.record_metrics")
+def test_evict_least_recently_used_repos(record_metrics, tmp_path, settings):
+    settings.REPO_CACHE_DIR = str(tmp_path)
+    settings.REPO_CACHE_MIN_IDLE_SECONDS = 3600
+    now = time.time()
+    oldest = create_cached_repo(tmp_path, "owner/oldest", 1000, now - 30000)
+    older = create_cached_repo(
+        tmp_path, "installations/1/owner/older", 1000, now - 20000
+    )
+    recent = create_cached_repo(tmp_path, "owner/recent", 1000, now - 10000)
+    in_use = create_cached_repo(tmp_path, "owner/in-use", 1000, now - 10)
+    assert set(cached_repos()) == {oldest, older, recent, in_use}
+
+    # The repo in use is kept even though it's the reason the cache is too large
+    assert evict_repos(max_bytes=1500) == [oldest, older, recent]
+    assert cached_repos() == [in_use]
+    assert read_metadata(in_use)["size_bytes"] > 1000
+    assert record_metrics.call_args.kwargs["evictions"] == 3
+
+
+@patch("engine.repo_cache.record_metrics")
+def test_objects_of_live_workspaces_survive_gc(_, cache, tmp_path, settings):
+    settings.REPO_CACHE_GC_INTERVAL_SECONDS = 0
+    cache_dir = tmp_path / "cache"
+    cache.cache_destination = str(cache_dir / "owner" / "repo")
+    cache.setup_workspace()
+    feature = git.Repo(cache.cache_destination).commit("origin/feature").hexsha
+    # The branch disappears from the cache, only the workspace still needs its commits
+    run_git(cache.cache_destination, "update-ref", "-d", "refs/remotes/origin/feature")
+    run_git(cache.cache_destination, "reflog", "expire", "--expire=now", "--all")
+    run_git(cache.cache_destination, "config", "gc.pruneExpire", "now")
+
+    gc_repos(str(cache_dir))
+    git.Repo(cache.workspace).git.checkout(feature)
+
+    # Once the workspace is gone, the objects are pruned
+    subprocess.run(["rm", "-rf", cache.workspace], check=True)
+    gc_repos(str(cache_dir))
+    missing = subprocess.run(
+        ["git", "cat-file", "-e", feature], cwd=cache.cache_destination
+    )
+    assert missing.returncode
+    assert read_metadata(cache.cache_destination)["workspaces"] == {}
+
+
+@patch("engine.repo_cache.record_metrics")
+def test_repos_of_live_workspaces_are_not_evicted(_, tmp_path, settings):
+    settings.REPO_CACHE_DIR = str(tmp_path)
+    settings.REPO_CACHE_MIN_IDLE_SECONDS = 0
+    workspace = tmp_path / "workspace"
+    (workspace / ".git").mkdir(parents=True)
+    borrowed = create_cached_repo(tmp_path, "owner/borrowed", 1000, 0)
+    update_metadata(borrowed, workspaces={str(workspace): time.time()})
+    idle = create_cached_repo(tmp_path, "owner/idle", 1000, 10)
+
+    assert evict_repos(max_bytes=0) == [idle]
+    assert cached_repos() == [borrowed]
@@ -0,0 +1,114 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from engine.repo_cache import cache_lock, update_metadata
+from engine.repo_prewarmer import RepoPrewarmer, request_prewarm
+
+
+@pytest.fixture
+def redis_client():
+    with patch("engine.repo_prewarmer.redis.Redis") as redis_class:
+        yield redis_class.return_value
+
+
+@pytest.fixture
+def repo_cache():
+    with patch("engine.repo_prewarmer.RepoCache") as repo_cache_class, patch(
+        "engine.repo_prewarmer.get_installation_access_token", return_value="token"
+    ):
+        yield repo_cache_class
+
+
+@pytest.mark.parametrize(
+    "prewarm,private,cache_private,published",
+    [
+        (True, False, False, True),
+        (True, True, False, False),
+        (True, True, True, True),
+        (False, False, False, False),
+    ],
+)
+def test_request_prewarm(
+    settings, redis_client, prewarm, private, cache_private, published
+):
+    settings.REPO_CACHE_PREWARM = prewarm
+    settings.REPO_CACHE_PRIVATE_REPOS = cache_private
+    request_prewarm("owner/repo", 123, private, size_kb=2048)
+    assert redis_client.publish.called == published
+    if published:
+        channel, message = redis_client.publish.call_args.args
+        assert json.loads(message) == {
+            "repo": "owner/repo",
+            "installation_id": 123,
+            "private": private,
+            "size_kb": 2048,
+        }
+
+
+def test_prewarm_skips_caches_in_use(redis_client, repo_cache, tmp_path, settings):
+    settings.REPO_CLONE_STRATEGY = "auto"
+    settings.REPO_PARTIAL_CLONE_THRESHOLD_KB = 50 * 1024
+    cache = repo_cache.return_value
+    cache.cache_destination = str(tmp_path / "owner" / "repo")
+    prewarmer = RepoPrewarmer()
+
+    prewarmer.handle_message(
+        json.dumps(
+            {
+                "repo": "owner/repo",
+                "installation_id": 123,
+                "private": True,
+                "size_kb": 1024,
+            }
+        )
+    )
+    repo_cache.assert_called_with("owner/repo", "token", installation_id=123)
+    cache.update_cache.assert_called_once_with("full", clone=True)
+
+    with cache_lock(cache.cache_destination):
+        prewarmer.prewarm("owner/repo", 123, private=True, size_kb=1024)
+    cache.update_cache.assert_called_once()
+
+
+def test_prewarm_looks_up_unknown_repo_size(
+    redis_client, repo_cache, tmp_path, settings
+):
+    settings.REPO_CLONE_STRATEGY = "auto"
+    settings.REPO_PARTIAL_CLONE_THRESHOLD_KB = 50 * 1024
+    repo_cache.return_value.cache_destination = str(tmp_path / "owner" / "repo")
+    with patch("engine.repo_prewarmer.Github") as github:
+        github.return_value.get_repo.return_value.size = 100 * 1024
+        RepoPrewarmer().handle_message(
+            json.dumps({"repo": "owner/repo", "installation_id": 123, "private": True})
+        )
+    github.assert_called_once_with("token")
+    github.return_value.get_repo.assert_called_once_with("owner/repo")
+    repo_cache.return_value.update_cache.assert_called_once_with("partial", clone=True)
+
+
+def test_refresh_hot_repos(redis_client, repo_cache, tmp_path, settings):
+    settings.REPO_CACHE_DIR = str(tmp_path)
+    settings.REPO_CACHE_HOT_SECONDS = 3600
+    for path, repo, installation_id, last_used in [
+        ("owner/hot", "owner/hot", None, time.time() - 60),
+        ("owner/cold", "owner/cold", None, time.time() - 7200),
+        ("installations/7/owner/private", "owner/private", 7, time.time() - 60),
+    ]:
+        (tmp_path / path / ".git").mkdir(parents=True)
+        update_metadata(
+            str(tmp_path / path),
+            repo=repo,
+            installation_id=installation_id,
+            last_used=last_used,
+        )
+    repo_cache.return_value = MagicMock(cache_destination=str(tmp_path / "lock"))
+
+    RepoPrewarmer().refresh_hot_repos()
+    assert sorted(c.args for c in repo_cache.call_args_list) == [
+        ("owner/hot", ""),
+        ("owner/private", "token"),
+    ]
+    repo_cache.return_value.update_cache.assert_called_with("full", clone=False)
@@ -0,0 +1,297 @@
+from unittest.mock import ANY, MagicMock, call, patch
+
+import pytest
+from redis.crc import key_slot
+
+from engine.task_queue import TaskQueue
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+@pytest.fixture
+def queue(settings, client):
+    settings.REDIS_QUEUE = "tasks"
+    settings.REDIS_QUEUE_RELIABLE = True
+    settings.TASK_QUEUE_VISIBILITY_TIMEOUT = 120
+    settings.TASK_QUEUE_MAX_ATTEMPTS = 3
+    return TaskQueue(client, worker_id="worker-0")
+
+
+def test_simple_queue_pops_without_tracking(settings, client):
+    settings.REDIS_QUEUE_RELIABLE = False
+    client.blpop.return_value = (b"tasks", b"task-1")
+    queue = TaskQueue(client, worker_id="worker-0")
+
+    assert queue.pop() == "task-1"
+    queue.ack("task-1")
+    client.blmove.assert_not_called()
+    pipeline = client.pipeline.return_value
+    pipeline.zrem.assert_called_once_with("tasks:enqueued", "task-1")
+    pipeline.hincrby.assert_not_called()
+    pipeline.lrem.assert_not_called()
+
+
+def test_pop_moves_task_to_processing_list(queue, client):
+    client.blmove.return_value = b"task-1"
+    pipeline = client.pipeline.return_value
+
+    assert queue.pop() == "task-1"
+    client.blmove.assert_called_once_with(
+        "tasks", "tasks:processing:worker-0", 0, "LEFT", "RIGHT"
+    )
+    pipeline.set.assert_called_once_with("tasks:heartbeat:task-1", "worker-0", ex=120)
+    pipeline.hincrby.assert_called_once_with("tasks:attempts", "task-1", 1)
+    pipeline.sadd.assert_called_once_with("tasks:workers", "worker-0")
+
+
+def test_ack_removes_task_for_good(queue, client):
+    pipeline = client.pipeline.return_value
+    queue.ack("task-1")
+    pipeline.lrem.assert_called_once_with("tasks:processing:worker-0", 1, "task-1")
+    pipeline.delete.assert_called_once_with("tasks:heartbeat:task-1")
+    pipeline.hdel.assert_called_once_with("tasks:attempts", "task-1")
+
+
+def test_stalled_task_is_reclaimed_on_second_pass(queue, client):
+    client.smembers.return_value = {b"worker-1"}
+    client.lrange.return_value = [b"task-1", b"task-2"]
+    client.hget.return_value = b"1"
+    # task-1 has a heartbeat, task-2 doesn't
+    client.pipeline.return_value.execute.return_value = [1, 0]
+    queue.release_script.return_value = 1
+
+    # A task that was just popped may not have a heartbeat yet
+    assert queue.reclaim() == []
+    queue.release_script.assert_not_called()
+
+    assert queue.reclaim() == [("task-2", "tasks")]
+    queue.release_script.assert_called_once_with(
+        keys=[
+            "tasks:processing:worker-1",
+            "tasks",
+            "tasks:attempts",
+            "tasks:enqueued",
+            "tasks:doorbell",
+        ],
+        args=["task-2", 0, ANY, 0],
+    )
+
+
+def test_task_out_of_attempts_is_dead_lettered(queue, client):
+    client.hget.return_value = b"3"
+    queue.release_script.return_value = 1
+
+    assert queue.release("tasks:processing:worker-1", "task-1") == "tasks:dead"
+    keys = queue.release_script.call_args.kwargs["keys"]
+    assert keys[:2] == ["tasks:processing:worker-1", "tasks:dead"]
+    assert queue.release_script.call_args.kwargs["args"][:2] == ["task-1", 1]
+
+
+def test_release_returns_none_if_task_is_gone(queue, client):
+    client.hget.return_value = b"1"
+    queue.release_script.return_value = 0
+
+    assert queue.release("tasks:processing:worker-1", "task-1") is None
+
+
+def test_recover_releases_own_tasks(queue, client):
+    client.lrange.return_value = [b"task-1"]
+    client.hget.return_value = b"1"
+    queue.release_script.return_value = 1
+
+    assert queue.recover() == [("task-1", "tasks")]
+    assert call("tasks:processing:worker-0", 0, -1) in client.lrange.call_args_list
+
+
+def test_empty_workers_are_forgotten(queue, client):
+    client.smembers.return_value = {b"worker-1"}
+    client.lrange.return_value = []
+
+    assert queue.reclaim() == []
+    client.srem.assert_called_once_with("tasks:workers", b"worker-1")
+
+
+@pytest.fixture
+def fair_queue(queue, settings):
+    settings.REDIS_QUEUE_FAIR_SHARE = True
+    settings.TASK_QUEUE_PRIORITY_WEIGHTS = {"batch": 1, "interactive": 4}
+    return TaskQueue(queue.redis, worker_id="worker-0")
+
+
+def test_fair_share_push_queues_task_per_project(fair_queue, client):
+    fair_queue.push("task-1", project="owner/repo", priority="interactive")
+    fair_queue.push_script.assert_called_once_with(
+        keys=[
+            "tasks:fair:interactive:owner/repo",
+            "tasks:ring:interactive",
+            "tasks:doorbell",
+        ],
+        args=["task-1", "owner/repo"],
+        client=client.pipeline.return_value,
+    )
+    with pytest.raises(ValueError):
+        fair_queue.push("task-2", project="owner/repo", priority="urgent")
+
+
+def test_fair_share_push_without_project_rings_doorbell(fair_queue, client):
+    fair_queue.push("task-1")
+    pipeline = client.pipeline.return_value
+    pipeline.rpush.assert_any_call("tasks", "task-1")
+    pipeline.rpush.assert_any_call("tasks:doorbell", 1)
+    fair_queue.push_script.assert_not_called()
+
+
+def test_fair_share_pop_waits_for_doorbell_and_tracks_task(fair_queue, client):
+    fair_queue.pop_script.side_effect = [None, b"task-1"]
+
+    assert fair_queue.pop() == "task-1"
+    assert client.blpop.call_count == 2
+    fair_queue.pop_script.assert_called_with(
+        keys=[
+            "tasks",
+            "tasks:processing:worker-0",
+            "tasks:passes",
+            "tasks:ring:interactive",
+            "tasks:ring:batch",
+        ],
+        args=[1, "tasks:fair:", "interactive", 4, "batch", 1],
+    )
+    client.pipeline.return_value.hincrby.assert_called_once_with(
+        "tasks:attempts", "task-1", 1
+    )
+
+
+def test_fair_share_pop_times_out(fair_queue, client):
+    fair_queue.pop_script.return_value = None
+    assert fair_queue.pop(timeout=0.01) is None
+
+
+def test_fair_share_depth_counts_waiting_projects(fair_queue, client):
+    pipeline = client.pipeline.return_value
+    pipeline.execute.side_effect = [
+        [2, [b"owner/a", b"owner/b"], [b"owner/c"]],
+        [3, 1, 4],
+    ]
+
+    assert fair_queue.depth() == 10
+    pipeline.llen.assert_any_call("tasks:fair:interactive:owner/b")
+    pipeline.llen.assert_any_call("tasks:fair:batch:owner/c")
+
+
+def test_pool_capacity_forgets_silent_workers(queue, client):
+    client.smembers.return_value = [b"worker-0", b"worker-1"]
+    client.pipeline.return_value.execute.return_value = [
+        {b"idle": b"1", b"slots": b"2"},
+        {},
+    ]
+
+    assert queue.pool_capacity() == (1, 2)
+    client.srem.assert_called_once_with("tasks:pool", b"worker-1")
+
+
+def test_metrics(queue, client):
+    client.smembers.return_value = [b"worker-0"]
+    client.llen.side_effect = [3, 1]
+    client.pipeline.return_value.execute.return_value = [
+        {b"idle": b"1", b"slots": b"4"}
+    ]
+    client.zrange.return_value = [(b"task-1", 1000.0)]
+
+    with patch("engine.task_queue.time.time", return_value=1030.0):
+        metrics = queue.metrics()
+
+    assert metrics == {
+        "depth": 3,
+        "oldest_age_seconds": 30.0,
+        "in_flight": 3,
+        "idle_slots": 1,
+        "slots": 4,
+        "backlog": 6,
+        "dead_letters": 1,
+    }
+
+
+@pytest.fixture
+def redis_queue(settings):
+    """A fair-share queue on an in-memory Redis that runs the Lua scripts."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    settings.REDIS_QUEUE = "{tasks}"
+    settings.REDIS_QUEUE_RELIABLE = True
+    settings.REDIS_QUEUE_FAIR_SHARE = True
+    settings.TASK_QUEUE_VISIBILITY_TIMEOUT = 120
+    settings.TASK_QUEUE_PRIORITY_WEIGHTS = {"interactive": 2, "batch": 1}
+    return TaskQueue(fakeredis.FakeRedis(), worker_id="worker-0")
+
+
+def test_scripts_let_projects_take_turns(redis_queue):
+    for task_id in ["a1", "a2", "a3"]:
+        redis_queue.push(task_id, project="owner/a", priority="batch")
+    redis_queue.push("b1", project="owner/b", priority="batch")
+    assert redis_queue.depth() == 4
+
+    popped = [redis_queue.pop(timeout=0.01) for _ in range(4)]
+
+    assert popped == ["a1", "b1", "a2", "a3"]
+    assert redis_queue.pop(timeout=0.01) is None
+    assert redis_queue.depth() == 0
+    processing = redis_queue.redis.lrange(redis_queue.processing_key, 0, -1)
+    assert processing == [b"a1", b"b1", b"a2", b"a3"]
+
+
+def test_scripts_share_workers_by_priority_weight(redis_queue):
+    for i in range(6):
+        redis_queue.push(f"i{i}", project="owner/a", priority="interactive")
+        redis_queue.push(f"b{i}", project="owner/b", priority="batch")
+
+    popped = [redis_queue.pop(timeout=0.01) for _ in range(6)]
+
+    assert sorted(task[0] for task in popped) == ["b", "b", "i", "i", "i", "i"]
+
+
+def test_scripts_take_retried_tasks_first(redis_queue):
+    redis_queue.push("new", project="owner/a")
+    assert redis_queue.pop(timeout=0.01) == "new"
+    redis_queue.push("next", project="owner/a")
+    redis_queue.release(redis_queue.processing_key, "new")
+
+    assert redis_queue.pop(timeout=0.01) == "new"
+    assert redis_queue.pop(timeout=0.01) == "next"
+
+
+def test_release_pushes_nothing_if_task_is_gone(redis_queue):
+    redis_queue.push("task-1", project="owner/a")
+    assert redis_queue.pop(timeout=0.01) == "task-1"
+    redis_queue.ack("task-1")
+
+    assert redis_queue.release(redis_queue.processing_key, "task-1") is None
+    assert redis_queue.depth() == 0
+    assert redis_queue.redis.zcard(redis_queue.enqueued_key) == 0
+
+
+def test_release_dead_letters_tasks_out_of_attempts(redis_queue, settings):
+    settings.TASK_QUEUE_MAX_ATTEMPTS = 1
+    redis_queue.push("task-1", project="owner/a")
+    assert redis_queue.pop(timeout=0.01) == "task-1"
+
+    target = redis_queue.release(redis_queue.processing_key, "task-1")
+
+    assert target == redis_queue.dead_letter_key
+    assert redis_queue.dead_letters() == ["task-1"]
+    assert redis_queue.redis.llen(redis_queue.processing_key) == 0
+    assert not redis_queue.redis.hexists(redis_queue.attempts_key, "task-1")
+
+
+def test_hash_tagged_queue_keys_share_a_cluster_slot(redis_queue):
+    keys = [
+        redis_queue.queue_key,
+        redis_queue.processing_key,
+        redis_queue.passes_key,
+        redis_queue.doorbell_key,
+        redis_queue.ring_key("batch"),
+        redis_queue.subqueue_key("batch", "owner/a"),
+    ]
+    assert len({key_slot(key.encode()) for key in keys}) == 1
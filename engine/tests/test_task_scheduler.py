@@ -41,3 +41,38 @@ def test_user_can_write(task, permission, can_write):
         permission
     )
     assert scheduler.user_can_write() == can_write
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "task_type,priority",
+    [
+        ("github_issue", "interactive"),
+        ("github_review_comment", "interactive"),
+        ("standalone", "batch"),
+    ],
+)
+def test_priority(task, task_type, priority):
+    task.task_type = task_type
+    assert TaskScheduler(task).priority() == priority
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("idle,depth,spawned", [(2, 1, False), (1, 1, True)])
+def test_hybrid_strategy_bursts_to_jobs(task, idle, depth, spawned):
+    task.github_project = "owner/repo"
+    scheduler = TaskScheduler(task)
+    scheduler.task_queue = MagicMock()
+    scheduler.task_queue.pool_capacity.return_value = (idle, 4)
+    scheduler.task_queue.depth.return_value = depth
+    scheduler.context = MagicMock()
+    with patch.object(scheduler, "user_budget_empty", return_value=False), patch.object(
+        scheduler, "user_can_write", return_value=True
+    ), patch("engine.task_scheduler.settings.JOB_STRATEGY", "hybrid"), patch(
+        "engine.task_scheduler.KubernetesJob"
+    ) as job_class:
+        scheduler.schedule()
+
+    assert job_class.return_value.spawn.called == spawned
+    assert scheduler.task_queue.push.called != spawned
+    assert task.status == "scheduled"
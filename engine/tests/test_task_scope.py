@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from engine.models.task import Task
+from engine.models.task_event import TaskEvent
+from engine.task_scope import (
+    context_thread,
+    get_repo_dir,
+    get_task_id,
+    task_scope,
+)
+from engine.util import run_task_in_background
+
+
+def test_task_scope_overrides_settings(settings):
+    settings.TASK_ID = None
+    settings.REPO_DIR = "/repo"
+    with task_scope("task-1", "/workspaces/task-1"):
+        assert get_task_id() == "task-1"
+        assert get_repo_dir() == "/workspaces/task-1"
+        with task_scope("task-2"):
+            assert get_task_id() == "task-2"
+            assert get_repo_dir() == "/workspaces/task-1"
+    assert get_task_id() is None
+    assert get_repo_dir() == "/repo"
+
+
+def test_context_thread_inherits_task_scope():
+    seen = []
+    with task_scope("task-1"):
+        plain = threading.Thread(target=lambda: seen.append(get_task_id()))
+        scoped = context_thread(lambda: seen.append(get_task_id()))
+    for thread in (plain, scoped):
+        thread.start()
+        thread.join()
+    assert seen == [None, "task-1"]
+
+
+@pytest.mark.django_db
+def test_task_events_are_recorded_for_the_scoped_task(task, user):
+    other = Task.objects.create(
+        github_user=user.username, github_project="other", installation_id=1
+    )
+    with task_scope(other.id):
+        assert Task.current() == other
+        TaskEvent.add(actor="assistant", action="other_event")
+    TaskEvent.add(actor="assistant", action="own_event")
+
+    assert [e.action for e in other.events.all()] == ["other_event"]
+    assert [e.action for e in task.events.all()] == ["own_event"]
+
+
+def test_run_task_in_background_is_scoped(settings, tmp_path):
+    settings.TASK_ID = None
+    settings.TASK_WORKSPACES_DIR = str(tmp_path)
+    seen = {}
+
+    def run_task(command, task_id):
+        seen[task_id] = (get_task_id(), get_repo_dir())
+
+    with patch("engine.util.call_command", side_effect=run_task), patch(
+        "engine.util.FileSystem.invalidate"
+    ) as invalidate:
+        threads = [
+            threading.Thread(target=run_task_in_background, args=(task_id,))
+            for task_id in ("task-1", "task-2")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert seen == {
+        "task-1": ("task-1", str(tmp_path / "task-1")),
+        "task-2": ("task-2", str(tmp_path / "task-2")),
+    }
+    assert settings.TASK_ID is None
+    # The cached trees of the removed workspaces are dropped
+    invalidated = {c.args[0] for c in invalidate.call_args_list}
+    assert invalidated == {str(tmp_path / "task-1"), str(tmp_path / "task-2")}
@@ -0,0 +1,77 @@
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from engine.task_scope import get_repo_dir, get_task_id
+from engine.task_worker import TaskWorker
+
+
+@pytest.fixture
+def worker(settings, tmp_path):
+    settings.TASK_WORKER_CONCURRENCY = 2
+    settings.TASK_WORKSPACES_DIR = str(tmp_path)
+    settings.TASK_ID = None
+    with patch("engine.task_queue.redis.Redis"), patch(
+        "engine.task_worker.Task"
+    ) as task_class, patch("engine.task_worker.maintain_cache"):
+        task_class.objects.get.side_effect = lambda id: MagicMock(id=id)
+        yield TaskWorker()
+
+
+def test_tasks_run_concurrently_in_their_own_workspaces(worker, tmp_path):
+    both_running = threading.Barrier(2, timeout=5)
+    seen = {}
+
+    def run_engine(task):
+        def run():
+            workspace = get_repo_dir()
+            os.makedirs(workspace)
+            # Both tasks have to be running at the same time to pass the barrier
+            both_running.wait()
+            seen[task.id] = (get_task_id(), workspace)
+
+        return MagicMock(run=run)
+
+    with patch("engine.task_worker.TaskEngine", side_effect=run_engine):
+        for task_id in ["task-1", "task-2"]:
+            worker.slots.acquire()
+            worker.pool.submit(worker.run_task, task_id)
+        worker.pool.shutdown(wait=True)
+
+    assert seen == {
+        "task-1": ("task-1", str(tmp_path / "task-1")),
+        "task-2": ("task-2", str(tmp_path / "task-2")),
+    }
+    # Workspaces are removed and the slots are free again
+    assert os.listdir(tmp_path) == []
+    assert worker.slots.acquire(blocking=False) and worker.slots.acquire(blocking=False)
+
+
+def test_failing_task_frees_its_slot(worker):
+    with patch("engine.task_worker.TaskEngine", side_effect=ValueError("boom")):
+        worker.slots.acquire()
+        worker.run_task("task-1")
+    assert worker.slots._value == 2
+
+
+def test_finished_task_is_acknowledged(worker):
+    worker.queue = MagicMock()
+    worker.in_flight.add("task-1")
+    with patch("engine.task_worker.TaskEngine"):
+        worker.slots.acquire()
+        worker.run_task("task-1")
+    worker.queue.ack.assert_called_once_with("task-1")
+    assert worker.in_flight == set()
+
+
+def test_dead_tasks_are_marked_failed(worker):
+    worker.queue = MagicMock(dead_letter_key="tasks:dead")
+    with patch("engine.task_worker.Task") as task_class:
+        worker.fail_dead_tasks([("task-1", "tasks"), ("task-2", "tasks:dead")])
+    task_class.objects.filter.assert_called_once_with(id="task-2")
+    assert (
+        task_class.objects.filter.return_value.update.call_args.kwargs["status"]
+        == "failed"
+    )
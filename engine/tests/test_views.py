@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+import pytest
+from django.urls import reverse
+
+METRICS = {"depth": 2, "oldest_age_seconds": 12.5, "in_flight": 1}
+
+
+@pytest.fixture(autouse=True)
+def task_queue():
+    with patch("engine.views.TaskQueue") as task_queue_class:
+        task_queue_class.return_value.metrics.return_value = METRICS
+        yield task_queue_class
+
+
+@pytest.fixture
+def token(settings):
+    settings.QUEUE_METRICS_TOKEN = "secret"
+    return {"HTTP_AUTHORIZATION": "Bearer secret"}
+
+
+def test_queue_metrics_as_json(client, token):
+    response = client.get(reverse("queue_metrics"), **token)
+    assert response.status_code == 200
+    assert response.json() == METRICS
+
+
+def test_queue_metrics_for_prometheus(client, token):
+    response = client.get(reverse("queue_metrics"), {"format": "prometheus"}, **token)
+    assert response.content.decode() == (
+        "pr_pilot_task_queue_depth 2\n"
+        "pr_pilot_task_queue_oldest_age_seconds 12.5\n"
+        "pr_pilot_task_queue_in_flight 1\n"
+    )
+
+
+def test_queue_metrics_require_token(client, settings):
+    settings.QUEUE_METRICS_TOKEN = "secret"
+    assert client.get(reverse("queue_metrics")).status_code == 403
+    response = client.get(reverse("queue_metrics"), HTTP_AUTHORIZATION="Bearer secret")
+    assert response.status_code == 200
+
+
+def test_queue_metrics_are_closed_without_token(client, settings):
+    settings.QUEUE_METRICS_TOKEN = None
+    assert client.get(reverse("queue_metrics")).status_code == 403
+    response = client.get(reverse("queue_metrics"), HTTP_AUTHORIZATION="Bearer ")
+    assert response.status_code == 403
@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from engine.worker_autoscaler import WorkerAutoscaler, desired_replicas
+
+
+@pytest.fixture
+def pool_settings(settings):
+    settings.TASK_WORKER_POOL_MIN = 1
+    settings.TASK_WORKER_POOL_MAX = 10
+    settings.TASK_WORKER_POOL_HEADROOM = 1
+    settings.TASK_WORKER_SCALE_DOWN_DELAY_SECONDS = 300
+    return settings
+
+
+@pytest.mark.parametrize(
+    "queued,busy,concurrency,replicas",
+    [(0, 0, 1, 1), (3, 2, 1, 6), (3, 2, 2, 4), (100, 0, 1, 10)],
+)
+def test_desired_replicas(pool_settings, queued, busy, concurrency, replicas):
+    assert desired_replicas(queued, busy, concurrency) == replicas
+
+
+@pytest.fixture
+def autoscaler(pool_settings):
+    pool_settings.TASK_WORKER_CONCURRENCY = 1
+    pool_settings.TASK_WORKER_STATEFULSET = "pr-pilot-worker"
+    with patch("engine.worker_autoscaler.load_kube_config"), patch(
+        "engine.worker_autoscaler.AppsV1Api"
+    ), patch("engine.worker_autoscaler.TaskQueue"):
+        autoscaler = WorkerAutoscaler()
+    autoscaler.queue = MagicMock()
+    autoscaler.scale = MagicMock()
+    return autoscaler
+
+
+def test_scales_up_right_away(autoscaler):
+    autoscaler.queue.pool_workers.return_value = {
+        "pr-pilot-worker-0": (0, 1),
+        "pr-pilot-worker-1": (0, 1),
+    }
+    autoscaler.queue.depth.return_value = 3
+    autoscaler.apps.read_namespaced_stateful_set_scale.return_value.spec.replicas = 2
+
+    autoscaler.autoscale()
+    autoscaler.scale.assert_called_once_with(6)
+
+
+def test_scales_down_after_delay(autoscaler):
+    autoscaler.queue.pool_workers.return_value = {
+        f"pr-pilot-worker-{i}": (1, 1) for i in range(4)
+    }
+    autoscaler.queue.depth.return_value = 0
+    autoscaler.apps.read_namespaced_stateful_set_scale.return_value.spec.replicas = 4
+
+    with patch("engine.worker_autoscaler.time.time", return_value=1000):
+        autoscaler.autoscale()
+    autoscaler.scale.assert_not_called()
+
+    with patch("engine.worker_autoscaler.time.time", return_value=1300):
+        autoscaler.autoscale()
+    autoscaler.scale.assert_called_once_with(1)
+
+
+def test_does_not_scale_down_busy_workers(autoscaler):
+    autoscaler.queue.pool_workers.return_value = {
+        "pr-pilot-worker-0": (1, 1),
+        "pr-pilot-worker-1": (1, 1),
+        "pr-pilot-worker-2": (0, 1),
+        "pr-pilot-worker-3": (1, 1),
+    }
+    autoscaler.queue.depth.return_value = 0
+    autoscaler.apps.read_namespaced_stateful_set_scale.return_value.spec.replicas = 4
+
+    with patch("engine.worker_autoscaler.time.time", return_value=1000):
+        autoscaler.autoscale()
+    with patch("engine.worker_autoscaler.time.time", return_value=1300):
+        autoscaler.autoscale()
+    # Only the idle worker-3 goes, worker-2 is still running a task
+    autoscaler.scale.assert_called_once_with(3)
+
+    autoscaler.scale.reset_mock()
+    autoscaler.queue.pool_workers.return_value = {
+        "pr-pilot-worker-0": (1, 1),
+        "pr-pilot-worker-1": (1, 1),
+        "pr-pilot-worker-2": (0, 1),
+    }
+    autoscaler.apps.read_namespaced_stateful_set_scale.return_value.spec.replicas = 3
+    with patch("engine.worker_autoscaler.time.time", return_value=2000):
+        autoscaler.autoscale()
+    autoscaler.scale.assert_not_called()
@@ -1,8 +1,13 @@
 import os
 import re
+import shutil
 
 from django.conf import settings
 from django.core.management import call_command
+from django.db import connections
+
+from engine.file_system import FileSystem
+from engine.task_scope import task_scope
 
 
 def slugify(text: str) -> str:
@@ -25,9 +30,15 @@ def clean_code_block_with_language_specifier(response):
 
 
 def run_task_in_background(task_id):
-    os.environ["TASK_ID"] = str(task_id)
-    settings.TASK_ID = str(task_id)
-    call_command("run_task", task_id)
+    """Run a task in its own workspace, without affecting other tasks of the process."""
+    workspace = os.path.join(settings.TASK_WORKSPACES_DIR, str(task_id))
+    try:
+        with task_scope(task_id, workspace):
+            call_command("run_task", str(task_id))
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+        FileSystem.invalidate(workspace)
+        connections.close_all()
 
 
 def replace_string_in_directory_path(path, old_dir, new_dir):
@@ -44,3 +55,39 @@ def replace_string_in_directory_path(path, old_dir, new_dir):
     # Reconstruct the path from the modified parts
     new_path = os.sep.join(new_parts)
     return new_path
+
+
+def parse_line_range(file_path: str):
+    """
+    Split a `path:start-end` file reference into the path and its line range.
+
+    `path:start` reads from `start` to the end of the file. Paths without a
+    range return `None` for both bounds.
+    """
+    match = re.fullmatch(r"(.+?):(\d+)(?:-(\d+))?", file_path)
+    if not match:
+        return file_path, None, None
+    path, start, end = match.groups()
+    return path, int(start), int(end) if end else None
+
+
+def extract_file_paths(text: str) -> list:
+    """
+    Find the file and directory paths mentioned in a text, e.g. `src/app.py`,
+    `docs/` or `README.md`. URLs are not considered paths.
+    """
+    paths = []
+    for token in re.split(r"[\s`'\"(),;<>\[\]]+", text):
+        token = token.rstrip(".:!?")
+        if "://" in token or token.startswith(("@", "#", "-")):
+            continue
+        if not re.fullmatch(r"[\w./-]+", token) or ".." in token:
+            continue
+        path = token[2:] if token.startswith("./") else token.lstrip("/")
+        if not path.rstrip("/"):
+            continue
+        if "/" in path or re.fullmatch(r"[\w-]+\.[A-Za-z]\w{0,9}", path):
+            path = path.rstrip("/")
+            if path not in paths:
+                paths.append(path)
+    return paths
@@ -0,0 +1,35 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_GET
+
+from engine.task_queue import TaskQueue
+
+
+def prometheus_metrics(metrics: dict) -> str:
+    return "".join(
+        f"pr_pilot_task_queue_{name} {value}\n" for name, value in metrics.items()
+    )
+
+
+@require_GET
+def queue_metrics(request):
+    """
+    Task queue metrics for autoscalers, as JSON for the KEDA metrics API scaler
+    or in the Prometheus text format with `?format=prometheus`.
+
+    Requires the `QUEUE_METRICS_TOKEN` bearer token, nobody can read the
+    metrics until it's configured.
+    """
+    if not settings.QUEUE_METRICS_TOKEN:
+        return HttpResponseForbidden()
+    expected = f"Bearer {settings.QUEUE_METRICS_TOKEN}"
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+        return HttpResponseForbidden()
+    metrics = TaskQueue().metrics()
+    if request.GET.get("format") == "prometheus":
+        return HttpResponse(
+            prometheus_metrics(metrics), content_type="text/plain; version=0.0.4"
+        )
+    return JsonResponse(metrics)
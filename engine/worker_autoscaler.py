@@ -0,0 +1,96 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from kubernetes.client import AppsV1Api
+
+from engine.job import load_kube_config
+from engine.task_queue import TaskQueue
+
+logger = logging.getLogger(__name__)
+
+
+def desired_replicas(queued: int, busy: int, concurrency: int) -> int:
+    """Workers needed for the running and waiting tasks, plus idle ones for new tasks."""
+    needed = math.ceil((queued + busy) / max(concurrency, 1))
+    replicas = needed + settings.TASK_WORKER_POOL_HEADROOM
+    return min(
+        max(replicas, settings.TASK_WORKER_POOL_MIN), settings.TASK_WORKER_POOL_MAX
+    )
+
+
+class WorkerAutoscaler:
+    """
+    Sizes the task worker StatefulSet from the queue depth and the busy slots
+    of the worker pool. Scales up right away and down only after the pool has
+    been too big for `TASK_WORKER_SCALE_DOWN_DELAY_SECONDS`, so that a short
+    lull doesn't throw away warm workers.
+
+    A StatefulSet removes its pods from the highest ordinal down, so the pool
+    never shrinks below a worker that is still running tasks.
+    """
+
+    def __init__(self):
+        self.queue = TaskQueue()
+        self.oversized_since = None
+        load_kube_config()
+        self.apps = AppsV1Api()
+
+    def current_replicas(self) -> int:
+        scale = self.apps.read_namespaced_stateful_set_scale(
+            settings.TASK_WORKER_STATEFULSET, settings.TASK_WORKER_NAMESPACE
+        )
+        return scale.spec.replicas
+
+    def scale(self, replicas: int):
+        logger.info(f"Scaling {settings.TASK_WORKER_STATEFULSET} to {replicas}")
+        self.apps.patch_namespaced_stateful_set_scale(
+            settings.TASK_WORKER_STATEFULSET,
+            settings.TASK_WORKER_NAMESPACE,
+            {"spec": {"replicas": replicas}},
+        )
+
+    def smallest_safe_replicas(self, workers: dict) -> int:
+        """Replicas that keep every busy worker pod of the StatefulSet."""
+        prefix = f"{settings.TASK_WORKER_STATEFULSET}-"
+        replicas = 0
+        for worker_id, (idle, slots) in workers.items():
+            ordinal = worker_id.removeprefix(prefix)
+            if idle < slots and ordinal != worker_id and ordinal.isdigit():
+                replicas = max(replicas, int(ordinal) + 1)
+        return replicas
+
+    def autoscale(self):
+        workers = self.queue.pool_workers()
+        idle = sum(idle for idle, _ in workers.values())
+        slots = sum(slots for _, slots in workers.values())
+        desired = desired_replicas(
+            self.queue.depth(), slots - idle, settings.TASK_WORKER_CONCURRENCY
+        )
+        current = self.current_replicas()
+        if desired < current:
+            desired = min(max(desired, self.smallest_safe_replicas(workers)), current)
+        if desired > current:
+            self.oversized_since = None
+            self.scale(desired)
+        elif desired < current:
+            if self.oversized_since is None:
+                self.oversized_since = time.time()
+            elif (
+                time.time() - self.oversized_since
+                >= settings.TASK_WORKER_SCALE_DOWN_DELAY_SECONDS
+            ):
+                self.oversized_since = None
+                self.scale(desired)
+        else:
+            self.oversized_since = None
+
+    def run(self):
+        logger.info("Running task worker autoscaler")
+        while True:
+            try:
+                self.autoscale()
+            except Exception as e:
+                logger.error("Failed to autoscale task workers", exc_info=e)
+            time.sleep(settings.TASK_WORKER_AUTOSCALE_INTERVAL_SECONDS)
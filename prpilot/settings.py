@@ -172,6 +172,17 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 GITHUB_CLIENT_ID = os.getenv("GITHUB_APP_CLIENT_ID")
 GITHUB_CLIENT_SECRET = os.getenv("GITHUB_APP_SECRET")
 GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+# GitHub objects cached during a task are revalidated with a conditional request after this long
+GITHUB_CACHE_REVALIDATE_SECONDS = int(
+    os.getenv("GITHUB_CACHE_REVALIDATE_SECONDS", "30")
+)
+# Process GitHub webhooks in the request (sync) or queue them for the webhook consumer (redis)
+WEBHOOK_STRATEGY = os.getenv("WEBHOOK_STRATEGY", "sync")
+WEBHOOK_QUEUE = os.getenv("WEBHOOK_QUEUE", "webhooks")
+# Deliveries still processing after this long are taken to be lost with their consumer
+WEBHOOK_PROCESSING_TIMEOUT_SECONDS = int(
+    os.getenv("WEBHOOK_PROCESSING_TIMEOUT_SECONDS", "600")
+)
 GITHUB_APP_ID = os.getenv("GITHUB_APP_ID")
 
 # Add at the end of the file
@@ -224,19 +235,76 @@ SOCIAL_AUTH_URL_NAMESPACE = "social"
 PRIVATE_KEY_PATH = os.getenv(
     "GITHUB_APP_PRIVATE_KEY_PATH", os.path.join(BASE_DIR, "github_app_private_key.pem")
 )
+# Outgoing HTTP requests to GitHub and integrations, see engine/http_client.py
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+# Linear teams and Slack workspace metadata are cached by the integration tools this long
+INTEGRATION_METADATA_TTL_SECONDS = int(
+    os.getenv("INTEGRATION_METADATA_TTL_SECONDS", "3600")
+)
+# Where installation tokens are cached: "memory" for each process, "redis" for all of them
+GITHUB_TOKEN_CACHE = os.getenv("GITHUB_TOKEN_CACHE", "memory")
 TASK_ID = os.getenv("TASK_ID")
 REPO_DIR = os.getenv("REPO_DIR", "/repo")
 REPO_CACHE_DIR = os.getenv("REPO_CACHE_DIR", "/repo_cache")
+# Cache private repositories too, in a separate directory for every installation
+REPO_CACHE_PRIVATE_REPOS = (
+    os.getenv("REPO_CACHE_PRIVATE_REPOS", "false").lower() == "true"
+)
+# How repositories are cloned: full, shallow, partial, sparse or auto (full or partial by repository size)
+REPO_CLONE_STRATEGY = os.getenv("REPO_CLONE_STRATEGY", "auto")
+# Number of commits fetched by shallow clones and by each deepening fetch
+REPO_CLONE_DEPTH = int(os.getenv("REPO_CLONE_DEPTH", "50"))
+# Size in KB (as reported by GitHub) above which `auto` clones without blobs
+REPO_PARTIAL_CLONE_THRESHOLD_KB = int(
+    os.getenv("REPO_PARTIAL_CLONE_THRESHOLD_KB", str(50 * 1024))
+)
+# Least recently used repositories are evicted when the cache grows beyond this size
+REPO_CACHE_MAX_BYTES = int(os.getenv("REPO_CACHE_MAX_BYTES", str(16 * 1024**3)))
+# Repositories used more recently than this may still back a running task and aren't evicted
+REPO_CACHE_MIN_IDLE_SECONDS = int(os.getenv("REPO_CACHE_MIN_IDLE_SECONDS", "3600"))
+# How often workers evict repositories and how often each repository is garbage collected
+REPO_CACHE_MAINTENANCE_INTERVAL_SECONDS = int(
+    os.getenv("REPO_CACHE_MAINTENANCE_INTERVAL_SECONDS", str(6 * 3600))
+)
+REPO_CACHE_GC_INTERVAL_SECONDS = int(
+    os.getenv("REPO_CACHE_GC_INTERVAL_SECONDS", str(24 * 3600))
+)
+# Redis hash collecting repository cache metrics
+REPO_CACHE_METRICS_KEY = os.getenv("REPO_CACHE_METRICS_KEY", "repo_cache:metrics")
+# Fetch repositories into the workers' caches as soon as webhooks announce a task
+REPO_CACHE_PREWARM = os.getenv("REPO_CACHE_PREWARM", "false").lower() == "true"
+REPO_CACHE_PREWARM_CHANNEL = os.getenv(
+    "REPO_CACHE_PREWARM_CHANNEL", "repo_cache:prewarm"
+)
+# Tasks don't fetch repositories that were fetched more recently than this
+REPO_CACHE_FRESH_SECONDS = int(os.getenv("REPO_CACHE_FRESH_SECONDS", "60"))
+# The prewarmer refreshes repositories used within REPO_CACHE_HOT_SECONDS this often
+REPO_CACHE_REFRESH_INTERVAL_SECONDS = int(
+    os.getenv("REPO_CACHE_REFRESH_INTERVAL_SECONDS", "600")
+)
+REPO_CACHE_HOT_SECONDS = int(os.getenv("REPO_CACHE_HOT_SECONDS", str(24 * 3600)))
 MAX_FILE_LINES = 600
+# Tokens of file patches that `read_pull_request` includes, the rest is listed
+MAX_PR_PATCH_TOKENS = 6000
 MAX_FILE_SEARCH_RESULTS = 50
 MAX_READ_FILES = 5
 IGNORE_FILE_PATH = Path(os.getcwd()) / ".pilotignore"
+# Number of threads listing directories concurrently when building file trees
+FILE_SYSTEM_WALK_WORKERS = int(os.getenv("FILE_SYSTEM_WALK_WORKERS", "8"))
+# Build file trees of git workspaces from `git ls-files` instead of walking them
+FILE_SYSTEM_USE_GIT_LS_FILES = (
+    os.getenv("FILE_SYSTEM_USE_GIT_LS_FILES", "false").lower() == "true"
+)
 CREDIT_MULTIPLIER = 2
 OPEN_SOURCE_CONTRIBUTOR_THRESHOLD = 5
 OPEN_SOURCE_CONTRIBUTOR_DISCOUNT_PERCENT = 20.0
 OPEN_SOURCE_COMMITS_THRESHOLD = 10
 APPEND_SLASH = True  # Default is True
-# Defines where jobs are executed: kubernetes, thread or log
+# Defines where jobs are executed: kubernetes, redis, hybrid, thread or log.
+# hybrid runs tasks on idle workers and bursts to Kubernetes jobs when there are none.
 JOB_STRATEGY = os.getenv("JOB_STRATEGY", "kubernetes")
 
 license_json = json.loads(Path(BASE_DIR / "licenses.json").read_text())
@@ -311,7 +379,37 @@ TASK_RATE_LIMIT = 10  # per 10 minutes
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = os.getenv("REDIS_PORT", 6379)
+# Prefix of all task queue keys, use a hash tag like "{tasks}" on Redis Cluster
 REDIS_QUEUE = os.getenv("REDIS_QUEUE", "tasks")
+# Number of tasks a worker runs at the same time
+TASK_WORKER_CONCURRENCY = int(os.getenv("TASK_WORKER_CONCURRENCY", "1"))
+# Workers check out every task's repository into its own directory in here
+TASK_WORKSPACES_DIR = os.getenv("TASK_WORKSPACES_DIR", "/workspaces")
+# Keep tasks in a processing list until they're done, so that tasks of crashed workers are retried
+REDIS_QUEUE_RELIABLE = os.getenv("REDIS_QUEUE_RELIABLE", "false").lower() == "true"
+# Tasks without a heartbeat for this long are considered stalled and handed to another worker
+TASK_QUEUE_VISIBILITY_TIMEOUT = int(os.getenv("TASK_QUEUE_VISIBILITY_TIMEOUT", "120"))
+# Stalled tasks are moved to the dead-letter list after this many attempts
+TASK_QUEUE_MAX_ATTEMPTS = int(os.getenv("TASK_QUEUE_MAX_ATTEMPTS", "3"))
+# Give every project its own sub-queue and let projects take turns
+REDIS_QUEUE_FAIR_SHARE = os.getenv("REDIS_QUEUE_FAIR_SHARE", "false").lower() == "true"
+# Share of the workers each priority class gets while tasks of several classes are waiting
+TASK_QUEUE_PRIORITY_WEIGHTS = {"interactive": 4, "batch": 1}
+# Task worker StatefulSet sized by the worker autoscaler
+TASK_WORKER_STATEFULSET = os.getenv("TASK_WORKER_STATEFULSET", "pr-pilot-worker")
+TASK_WORKER_NAMESPACE = os.getenv("TASK_WORKER_NAMESPACE", "default")
+TASK_WORKER_POOL_MIN = int(os.getenv("TASK_WORKER_POOL_MIN", "1"))
+TASK_WORKER_POOL_MAX = int(os.getenv("TASK_WORKER_POOL_MAX", "10"))
+# Idle workers kept on top of the ones needed for running and queued tasks
+TASK_WORKER_POOL_HEADROOM = int(os.getenv("TASK_WORKER_POOL_HEADROOM", "1"))
+TASK_WORKER_AUTOSCALE_INTERVAL_SECONDS = int(
+    os.getenv("TASK_WORKER_AUTOSCALE_INTERVAL_SECONDS", "30")
+)
+TASK_WORKER_SCALE_DOWN_DELAY_SECONDS = int(
+    os.getenv("TASK_WORKER_SCALE_DOWN_DELAY_SECONDS", "300")
+)
+# Bearer token required to read /metrics/queue/, closed to everyone if unset
+QUEUE_METRICS_TOKEN = os.getenv("QUEUE_METRICS_TOKEN")
 
 DEFAULT_GPT_MODEL = "gpt-4o"
 
@@ -21,6 +21,7 @@ from django.urls import path, include
 from django.views.generic import RedirectView
 
 from accounts.views import health_check, home
+from engine.views import queue_metrics
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -40,5 +41,6 @@ urlpatterns = [
     path("dashboard/", include("dashboard.urls")),
     path("api/", include("api.urls")),
     path("healthz/", health_check, name="health_check"),
+    path("metrics/queue/", queue_metrics, name="queue_metrics"),
     path("", home, name="home"),
 ]
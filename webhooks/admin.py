@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from webhooks.models import GitHubAppInstallation
+from webhooks.models import GitHubAppInstallation, WebhookDelivery
 
 
 class GitHubAppInstallationAdmin(admin.ModelAdmin):
@@ -20,3 +20,4 @@ class GitHubAppInstallationAdmin(admin.ModelAdmin):
 
 # Register your models here.
 admin.site.register(GitHubAppInstallation)
+admin.site.register(WebhookDelivery)
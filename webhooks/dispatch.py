@@ -0,0 +1,154 @@
+import logging
+import time
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from webhooks.handlers.app_deletion import handle_app_deletion
+from webhooks.handlers.app_installation import handle_app_installation
+from webhooks.handlers.app_installation_change import handle_app_installation_change
+from webhooks.handlers.handle_issue_comment import handle_issue_comment
+from webhooks.handlers.pull_request_review_comment import (
+    handle_pull_request_review_comment,
+)
+from webhooks.models import WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+# Deliveries still waiting after this many seconds were lost on their way to the queue
+STALE_DELIVERY_SECONDS = 60
+
+
+def record_delivery(delivery_id: str, event: str, payload: dict = None) -> bool:
+    """
+    Record a webhook delivery. Returns False if it was delivered before, unless
+    processing it failed. Then the redelivery is recorded to be processed again.
+    """
+    try:
+        with transaction.atomic():
+            WebhookDelivery.objects.create(
+                delivery_id=delivery_id, event=event, payload=payload
+            )
+        return True
+    except IntegrityError:
+        retry = {"payload": payload} if payload is not None else {}
+        return bool(
+            WebhookDelivery.objects.filter(
+                delivery_id=delivery_id, status=WebhookDelivery.FAILED
+            ).update(
+                status=WebhookDelivery.RECEIVED,
+                received_at=timezone.now(),
+                started_at=None,
+                processed_at=None,
+                error="",
+                **retry,
+            )
+        )
+
+
+def dispatch_github_event(event: str, payload: dict):
+    if event == "pull_request_review_comment" and payload["action"] == "created":
+        # Handle new pull request review comment here
+        return handle_pull_request_review_comment(payload)
+
+    if event == "issue_comment" and payload["action"] == "created":
+        # Handle new issue comment here
+        return handle_issue_comment(payload)
+
+    elif event == "installation" and payload["action"] == "created":
+        # Handle app installation here
+        return handle_app_installation(payload)
+
+    elif event == "installation" and payload["action"] == "deleted":
+        # Handle app deletion here
+        return handle_app_deletion(payload)
+
+    elif event == "installation_repositories":
+        # The user changed which repositories the app can access, need to update our DB
+        return handle_app_installation_change(payload)
+
+    else:
+        logger.info(f"Received unhandled event: {event}")
+        return JsonResponse({"status": "ignored", "message": "Unhandled event"})
+
+
+def redis_client() -> redis.Redis:
+    return redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0)
+
+
+def enqueue_delivery(delivery_id: str):
+    """Hand a recorded delivery to the webhook consumer."""
+    redis_client().rpush(settings.WEBHOOK_QUEUE, delivery_id)
+
+
+def process_delivery(delivery_id: str) -> bool:
+    """
+    Handle a recorded delivery, unless another consumer already took it.
+
+    :return: True if this call processed the delivery
+    """
+    claimed = WebhookDelivery.objects.filter(
+        delivery_id=delivery_id, status=WebhookDelivery.RECEIVED
+    ).update(status=WebhookDelivery.PROCESSING, started_at=timezone.now())
+    if not claimed:
+        return False
+    delivery = WebhookDelivery.objects.get(delivery_id=delivery_id)
+    try:
+        dispatch_github_event(delivery.event, delivery.payload)
+    except Exception as e:
+        logger.error(f"Failed to process webhook delivery {delivery_id}", exc_info=e)
+        delivery.status = WebhookDelivery.FAILED
+        delivery.error = str(e)
+    else:
+        delivery.status = WebhookDelivery.PROCESSED
+        # The ID is all that's needed to recognize redeliveries
+        delivery.payload = None
+    delivery.processed_at = timezone.now()
+    delivery.save()
+    return True
+
+
+class WebhookConsumer:
+    """Processes the webhook deliveries that the webhook view queued in Redis."""
+
+    def __init__(self):
+        self.redis = redis_client()
+        self.last_sweep = 0
+
+    def sweep(self):
+        """
+        Process deliveries that were recorded, but never made it into the queue,
+        and those whose consumer died while processing them.
+        """
+        now = timezone.now()
+        timeout = timedelta(seconds=settings.WEBHOOK_PROCESSING_TIMEOUT_SECONDS)
+        abandoned = WebhookDelivery.objects.filter(
+            status=WebhookDelivery.PROCESSING, started_at__lt=now - timeout
+        ).update(status=WebhookDelivery.RECEIVED, started_at=None)
+        if abandoned:
+            logger.warning(f"Reclaimed {abandoned} abandoned webhook deliveries")
+        cutoff = now - timedelta(seconds=STALE_DELIVERY_SECONDS)
+        # Deliveries handled in the request (sync) have no payload to process
+        stale = WebhookDelivery.objects.filter(
+            status=WebhookDelivery.RECEIVED,
+            received_at__lt=cutoff,
+            payload__isnull=False,
+        ).values_list("delivery_id", flat=True)
+        for delivery_id in stale:
+            logger.warning(f"Processing stale webhook delivery {delivery_id}")
+            process_delivery(delivery_id)
+
+    def run(self):
+        logger.info("Running webhook consumer")
+        while True:
+            item = self.redis.blpop([settings.WEBHOOK_QUEUE], timeout=5)
+            close_old_connections()
+            if item:
+                process_delivery(item[1].decode("utf-8"))
+            if time.time() - self.last_sweep > STALE_DELIVERY_SECONDS:
+                self.last_sweep = time.time()
+                self.sweep()
@@ -2,6 +2,7 @@ import logging
 
 from django.http import JsonResponse
 
+from engine.repo_prewarmer import request_prewarm
 from webhooks.handlers.util import (
     install_repository,
     uninstall_repository,
@@ -36,6 +37,11 @@ def handle_app_installation_change(payload: dict):
             f'Repository {repository["full_name"]} added to installation {installation.installation_id}'
         )
         install_repository(installation, repository, github_user)
+        request_prewarm(
+            repository["full_name"],
+            installation.installation_id,
+            repository.get("private", True),
+        )
     return JsonResponse(
         {"status": "success", "installation_id": installation.installation_id}
     )
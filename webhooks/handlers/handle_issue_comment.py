@@ -4,7 +4,9 @@ import re
 from django.http import JsonResponse
 from github import Github
 
-from engine.models.task import Task, TaskType
+from engine.models.task import TaskType
+from engine.repo_prewarmer import request_prewarm
+from webhooks.handlers.util import comment_has_task, create_comment_task
 from webhooks.jwt_tools import get_installation_access_token
 
 logger = logging.getLogger(__name__)
@@ -25,10 +27,21 @@ def handle_issue_comment(payload: dict):
     # Look for slash command pattern
     match = re.search(r"/pilot\s+(.+)", comment_text)
 
+    if match and comment_has_task(repository, comment_id):
+        logger.info(f"Comment {comment_id} in {repository} already has a task")
+        return JsonResponse({"status": "ignored", "message": "Duplicate comment"})
+
     # If a slash command is found, extract the command
     if match:
         command = match.group(1)
         logger.info(f"Found command: {command} by {commenter_username}")
+        # Let the workers fetch the repository while the task is being created
+        request_prewarm(
+            repository,
+            installation_id,
+            payload["repository"].get("private", True),
+            payload["repository"].get("size"),
+        )
         g = Github(get_installation_access_token(installation_id))
         repo = g.get_repo(repository)
         issue = repo.get_issue(number=issue_number)
@@ -67,8 +80,9 @@ Do NOT use your `comment_on_github_issue` function to respond to the user's comm
             task_args["base"] = pr.base.ref
         else:
             task_args["issue_number"] = issue_number
-        task = Task.objects.create(**task_args)
-        task.schedule()
+        task = create_comment_task(**task_args)
+        if task:
+            task.schedule()
 
     else:
         command = None
@@ -4,7 +4,8 @@ import re
 from django.http import JsonResponse
 from github import Github
 
-from engine.models.task import Task, TaskType
+from engine.models.task import TaskType
+from webhooks.handlers.util import comment_has_task, create_comment_task
 from webhooks.jwt_tools import get_installation_access_token
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,10 @@ def handle_pull_request_review_comment(payload):
     # Look for slash command pattern
     match = re.search(r"/pilot\s+(.+)", comment_text)
 
+    if match and comment_has_task(repository, comment_id):
+        logger.info(f"Comment {comment_id} in {repository} already has a task")
+        return JsonResponse({"status": "ignored", "message": "Duplicate comment"})
+
     # If a slash command is found, extract the command
     if match:
         command = match.group(1)
@@ -54,7 +59,7 @@ def handle_pull_request_review_comment(payload):
     Read the pull request and understand the user's comment in context. If the user asks for changes,
     write those changes directly to the file on which they commented.
     """
-        task = Task.objects.create(
+        task = create_comment_task(
             title=command,
             user_request=user_request,
             comment_id=comment_id,
@@ -69,7 +74,8 @@ def handle_pull_request_review_comment(payload):
             branch="main",
             pilot_command=command,
         )
-        task.schedule()
+        if task:
+            task.schedule()
 
     else:
         command = None
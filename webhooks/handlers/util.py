@@ -1,8 +1,11 @@
 import logging
+from typing import Optional
 
+from django.db import IntegrityError, transaction
 from github import Github
 
 from api.models import UserAPIKey
+from engine.models.task import Task
 from webhooks.jwt_tools import get_installation_access_token
 from webhooks.models import GithubRepository
 
@@ -72,3 +75,21 @@ def uninstall_repository(repo_data, github_user):
         logger.error(
             f'Tried to uninstall repository {repo_data["full_name"]}, but not found'
         )
+
+
+def comment_has_task(github_project: str, comment_id: int) -> bool:
+    return Task.objects.filter(
+        github_project=github_project, comment_id=comment_id
+    ).exists()
+
+
+def create_comment_task(**task_args) -> Optional[Task]:
+    """Create the task for a comment, unless a concurrent delivery already did."""
+    try:
+        with transaction.atomic():
+            return Task.objects.create(**task_args)
+    except IntegrityError:
+        logger.info(
+            f'Comment {task_args["comment_id"]} in {task_args["github_project"]} already has a task'
+        )
+        return None
@@ -1,25 +1,122 @@
 import datetime
+import json
 import logging
+import threading
 import time
+from functools import lru_cache
+from typing import Optional
+
 import jwt
-import requests
+import redis
+from cryptography.fernet import InvalidToken
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from django.conf import settings
 
+from engine.cryptography import decrypt, encrypt
+from engine.http_client import http_session
+
 logger = logging.getLogger(__name__)
 
-# Simple cache structure for storing installation tokens
-installation_tokens_cache = {}
+# Tokens are refreshed once they expire in less than this many seconds ...
+TOKEN_REFRESH_SECONDS = 600
+# ... and no longer handed out once they expire in less than this many seconds
+TOKEN_MIN_VALIDITY_SECONDS = 120
+# Longest time to wait for another process that is minting a token
+TOKEN_LOCK_TIMEOUT_SECONDS = 30
 
 
-def generate_jwt(app_id, private_key_path):
-    logger.info(f"Generating JWT for app ID {app_id}")
+class MemoryTokenCache:
+    """Installation tokens shared by the threads of this process."""
+
+    def __init__(self):
+        self.tokens = {}
+        self.locks = {}
+        self.guard = threading.Lock()
+
+    def get(self, installation_id) -> Optional[tuple]:
+        return self.tokens.get(installation_id)
+
+    def set(self, installation_id, token: str, expires_at: float):
+        self.tokens[installation_id] = (token, expires_at)
+
+    def lock(self, installation_id):
+        with self.guard:
+            return self.locks.setdefault(installation_id, threading.Lock())
+
+    def clear(self):
+        self.tokens.clear()
+        self.locks.clear()
+
+
+class RedisTokenCache:
+    """Installation tokens shared by all processes and pods, encrypted at rest."""
+
+    def __init__(self):
+        self.redis = redis.Redis(
+            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0
+        )
+
+    @staticmethod
+    def key(installation_id) -> str:
+        return f"github_installation_token:{installation_id}"
+
+    def get(self, installation_id) -> Optional[tuple]:
+        try:
+            value = self.redis.get(self.key(installation_id))
+            if value is None:
+                return None
+            cached = json.loads(decrypt(value.decode("utf-8")))
+        except (redis.RedisError, InvalidToken) as e:
+            # Minting a new token is slower, but works without the cache
+            logger.warning(f"Could not read installation token cache: {e!r}")
+            return None
+        return cached["token"], cached["expires_at"]
+
+    def set(self, installation_id, token: str, expires_at: float):
+        value = encrypt(json.dumps({"token": token, "expires_at": expires_at}))
+        ttl = int(expires_at - time.time())
+        try:
+            if ttl > 0:
+                self.redis.set(self.key(installation_id), value, ex=ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Could not write installation token cache: {e!r}")
+
+    def lock(self, installation_id):
+        return self.redis.lock(
+            f"{self.key(installation_id)}:lock",
+            timeout=TOKEN_LOCK_TIMEOUT_SECONDS,
+            blocking_timeout=TOKEN_LOCK_TIMEOUT_SECONDS,
+        )
+
+
+installation_tokens_cache = MemoryTokenCache()
+
+
+@lru_cache()
+def redis_token_cache() -> RedisTokenCache:
+    return RedisTokenCache()
+
+
+def token_cache():
+    """The installation token cache selected with `GITHUB_TOKEN_CACHE`."""
+    if settings.GITHUB_TOKEN_CACHE == "redis":
+        return redis_token_cache()
+    return installation_tokens_cache
+
+
+@lru_cache()
+def load_private_key(private_key_path):
     with open(private_key_path, "rb") as key_file:
-        private_key = serialization.load_pem_private_key(
+        return serialization.load_pem_private_key(
             key_file.read(), password=None, backend=default_backend()
         )
 
+
+def generate_jwt(app_id, private_key_path):
+    logger.info(f"Generating JWT for app ID {app_id}")
+    private_key = load_private_key(private_key_path)
+
     now = int(time.time())
     payload = {"iat": now - 60, "exp": now + (5 * 60), "iss": app_id}
 
@@ -28,18 +125,8 @@ def generate_jwt(app_id, private_key_path):
     return encoded_jwt
 
 
-def get_installation_access_token(installation_id):
-    # Check cache first
-    if installation_id in installation_tokens_cache:
-        cached_token, expiry_time = installation_tokens_cache[installation_id]
-        # If the cached token is still valid, return it
-        if time.time() < expiry_time:
-            logger.info(
-                f"Using cached installation token for installation ID {installation_id}"
-            )
-            return cached_token
-
-    # Generate a new JWT token if no valid cached token is available
+def request_installation_access_token(installation_id) -> tuple:
+    """Mint a new installation token. Returns the token and when it expires."""
     jwt_token = generate_jwt(int(settings.GITHUB_APP_ID), settings.PRIVATE_KEY_PATH)
     headers = {
         "Authorization": f"Bearer {jwt_token}",
@@ -52,22 +139,72 @@ def get_installation_access_token(installation_id):
     logger.info(
         f"Requesting new installation token for installation ID {installation_id}"
     )
-    response = requests.post(installation_token_url, headers=headers)
+    response = http_session().post(installation_token_url, headers=headers)
 
     if response.status_code == 201:
         token_data = response.json()
-        # Cache the new token along with its expiry time
-        # GitHub tokens typically expire in 1 hour, but we'll subtract
-        # a small buffer (e.g., 2 minutes) to ensure we refresh in time
+        # GitHub tokens typically expire in 1 hour
         # Date format: '2024-03-27T00:31:46Z'
         expires_at = datetime.datetime.fromisoformat(
             token_data["expires_at"].replace("Z", "+00:00")
         )
-        expiry_time = expires_at.timestamp() - 120
-        installation_tokens_cache[installation_id] = (token_data["token"], expiry_time)
-
-        return token_data["token"]
+        return token_data["token"], expires_at.timestamp()
     else:
         raise Exception(
             f"Failed to get installation token: {response.status_code}, {response.text}"
         )
+
+
+def get_installation_access_token(installation_id):
+    """
+    Return a cached installation token, minting a new one only when needed.
+
+    Only one thread or process mints a token for an installation at a time, the
+    others wait for it and use its token. Tokens are refreshed ahead of their
+    expiry. Until then, callers that don't get to refresh keep using the current one.
+    """
+    cache = token_cache()
+    cached = cache.get(installation_id)
+    remaining = cached[1] - time.time() if cached else 0
+    if remaining > TOKEN_REFRESH_SECONDS:
+        logger.debug(
+            f"Using cached installation token for installation ID {installation_id}"
+        )
+        return cached[0]
+
+    usable = remaining > TOKEN_MIN_VALIDITY_SECONDS
+    lock = cache.lock(installation_id)
+    try:
+        # Only wait for other refreshes if there's no token to fall back to
+        acquired = lock.acquire(blocking=not usable)
+    except redis.RedisError as e:
+        logger.warning(f"Could not lock installation token cache: {e}")
+        acquired = False
+    if not acquired:
+        if usable:
+            return cached[0]
+        # The lock timed out, better mint a token of our own than fail
+        return refresh_installation_access_token(cache, installation_id)
+    try:
+        # Another process might have refreshed the token while we waited
+        latest = cache.get(installation_id)
+        if latest and latest[1] - time.time() > TOKEN_REFRESH_SECONDS:
+            return latest[0]
+        try:
+            return refresh_installation_access_token(cache, installation_id)
+        except Exception as e:
+            if not usable:
+                raise
+            logger.warning(f"Keeping the current installation token: {e}")
+            return cached[0]
+    finally:
+        try:
+            lock.release()
+        except (RuntimeError, redis.RedisError) as e:
+            logger.warning(f"Could not release installation token lock: {e}")
+
+
+def refresh_installation_access_token(cache, installation_id) -> str:
+    token, expires_at = request_installation_access_token(installation_id)
+    cache.set(installation_id, token, expires_at)
+    return token
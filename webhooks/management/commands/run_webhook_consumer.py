@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from webhooks.dispatch import WebhookConsumer
+
+
+class Command(BaseCommand):
+    help = "Process queued GitHub webhook deliveries."
+
+    def handle(self, *args, **options):
+        consumer = WebhookConsumer()
+        consumer.run()
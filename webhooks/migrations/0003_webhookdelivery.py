@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webhooks", "0002_githubrepository"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookDelivery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("delivery_id", models.CharField(max_length=255, unique=True)),
+                ("event", models.CharField(max_length=255)),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.3 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+def mark_existing_deliveries_processed(apps, schema_editor):
+    # Deliveries recorded before were all handled in the request
+    WebhookDelivery = apps.get_model("webhooks", "WebhookDelivery")
+    WebhookDelivery.objects.update(status="processed")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webhooks", "0003_webhookdelivery"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookdelivery",
+            name="error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="webhookdelivery",
+            name="payload",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="webhookdelivery",
+            name="processed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="webhookdelivery",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("received", "Received"),
+                    ("processing", "Processing"),
+                    ("processed", "Processed"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="received",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(
+            mark_existing_deliveries_processed, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webhooks", "0004_webhookdelivery_error_webhookdelivery_payload_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookdelivery",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -34,3 +34,38 @@ class GitHubAppInstallation(models.Model):
 
     def __str__(self):
         return f"Installation {self.installation_id} for account {self.account.login}"
+
+
+class WebhookDelivery(models.Model):
+    """
+    A GitHub webhook delivery, recorded to ignore redeliveries. With asynchronous
+    ingestion, it also holds the payload until the webhook consumer processed it.
+    """
+
+    RECEIVED = "received"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    FAILED = "failed"
+
+    delivery_id = models.CharField(max_length=255, unique=True)
+    event = models.CharField(max_length=255)
+    received_at = models.DateTimeField(auto_now_add=True)
+    payload = models.JSONField(blank=True, null=True)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (RECEIVED, "Received"),
+            (PROCESSING, "Processing"),
+            (PROCESSED, "Processed"),
+            (FAILED, "Failed"),
+        ],
+        default=RECEIVED,
+        db_index=True,
+    )
+    # When a consumer claimed the delivery, to reclaim it if the consumer died
+    started_at = models.DateTimeField(blank=True, null=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.event} delivery {self.delivery_id}"
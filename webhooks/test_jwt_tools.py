@@ -0,0 +1,119 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import redis
+
+from webhooks import jwt_tools
+from webhooks.jwt_tools import (
+    RedisTokenCache,
+    get_installation_access_token,
+    installation_tokens_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(settings):
+    settings.GITHUB_TOKEN_CACHE = "memory"
+    installation_tokens_cache.clear()
+    yield
+    installation_tokens_cache.clear()
+
+
+@pytest.fixture
+def mint():
+    with patch("webhooks.jwt_tools.request_installation_access_token") as mint:
+        mint.side_effect = lambda installation_id: (
+            f"token-{mint.call_count}",
+            time.time() + 3600,
+        )
+        yield mint
+
+
+def test_tokens_are_cached(mint):
+    assert get_installation_access_token(1) == "token-1"
+    assert get_installation_access_token(1) == "token-1"
+    assert get_installation_access_token(2) == "token-2"
+    assert mint.call_count == 2
+
+
+def test_concurrent_callers_mint_one_token(mint):
+    minting = threading.Event()
+    original = mint.side_effect
+
+    def slow_mint(installation_id):
+        minting.set()
+        time.sleep(0.1)
+        return original(installation_id)
+
+    mint.side_effect = slow_mint
+    tokens = []
+    threads = [
+        threading.Thread(target=lambda: tokens.append(get_installation_access_token(1)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tokens == ["token-1"] * 5
+    assert mint.call_count == 1
+
+
+def test_tokens_are_refreshed_before_they_expire(mint):
+    installation_tokens_cache.set(1, "old", time.time() + 300)
+    assert get_installation_access_token(1) == "token-1"
+    assert mint.call_count == 1
+
+
+def test_current_token_is_used_while_another_caller_refreshes(mint):
+    installation_tokens_cache.set(1, "old", time.time() + 300)
+    lock = installation_tokens_cache.lock(1)
+    with lock:
+        assert get_installation_access_token(1) == "old"
+    mint.assert_not_called()
+
+
+def test_current_token_is_kept_if_refreshing_fails(mint):
+    installation_tokens_cache.set(1, "old", time.time() + 300)
+    mint.side_effect = Exception("GitHub is down")
+    assert get_installation_access_token(1) == "old"
+    installation_tokens_cache.set(1, "old", time.time() + 60)
+    with pytest.raises(Exception, match="GitHub is down"):
+        get_installation_access_token(1)
+
+
+def test_private_key_is_parsed_once(tmp_path):
+    jwt_tools.load_private_key.cache_clear()
+    with patch("webhooks.jwt_tools.serialization.load_pem_private_key") as load:
+        with patch("webhooks.jwt_tools.jwt.encode"):
+            key_path = tmp_path / "key.pem"
+            key_path.write_bytes(b"key")
+            jwt_tools.generate_jwt(1, key_path)
+            jwt_tools.generate_jwt(1, key_path)
+    load.assert_called_once()
+    jwt_tools.load_private_key.cache_clear()
+
+
+def test_redis_cache_stores_tokens_encrypted():
+    with patch("webhooks.jwt_tools.redis.Redis"):
+        cache = RedisTokenCache()
+    expires_at = time.time() + 3600
+    cache.set(1, "secret-token", expires_at)
+    key, value = cache.redis.set.call_args.args
+    assert key == "github_installation_token:1"
+    assert "secret-token" not in value
+    assert 3590 < cache.redis.set.call_args.kwargs["ex"] <= 3600
+    cache.redis.get.return_value = value.encode()
+    assert cache.get(1) == ("secret-token", expires_at)
+
+
+def test_tokens_are_minted_when_redis_is_down(settings, mint):
+    settings.GITHUB_TOKEN_CACHE = "redis"
+    cache = MagicMock()
+    cache.get.return_value = None
+    cache.lock.return_value.acquire.side_effect = redis.ConnectionError()
+    with patch("webhooks.jwt_tools.redis_token_cache", return_value=cache):
+        assert get_installation_access_token(1) == "token-1"
+    cache.set.assert_called_once()
@@ -1,10 +1,19 @@
+import hashlib
+import hmac
+import json
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
 
 import pytest
+from django.http import JsonResponse
+from django.utils import timezone
 
 from api.models import UserAPIKey
-from webhooks.handlers.util import install_repository
-from webhooks.models import GitHubAppInstallation, GitHubAccount
+from engine.models.task import Task
+from webhooks.dispatch import WebhookConsumer, process_delivery
+from webhooks.handlers.handle_issue_comment import handle_issue_comment
+from webhooks.handlers.util import create_comment_task, install_repository
+from webhooks.models import GitHubAppInstallation, GitHubAccount, WebhookDelivery
 
 
 @pytest.fixture(autouse=True)
@@ -44,3 +53,222 @@ def test_install_repository_truncates_api_key_name(mock_github):
     # Verify the API key name was truncated
     api_key = UserAPIKey.objects.last()
     assert len(api_key.name) <= 49, "API key name should be truncated to 49 characters"
+
+
+def post_webhook(client, settings, payload: dict, delivery_id: str):
+    settings.GITHUB_WEBHOOK_SECRET = "secret"
+    body = json.dumps(payload).encode()
+    signature = hmac.new(b"secret", msg=body, digestmod=hashlib.sha256).hexdigest()
+    return client.post(
+        "/webhooks/github/",
+        body,
+        content_type="application/json",
+        headers={
+            "X-Hub-Signature-256": f"sha256={signature}",
+            "X-GitHub-Event": "issue_comment",
+            "X-GitHub-Delivery": delivery_id,
+        },
+    )
+
+
+@pytest.mark.django_db
+@patch("webhooks.dispatch.handle_issue_comment")
+def test_redelivered_webhooks_are_ignored(handle_issue_comment, client, settings):
+    handle_issue_comment.return_value = JsonResponse({"status": "ok"})
+    payload = {"action": "created"}
+
+    assert post_webhook(client, settings, payload, "delivery-1").json() == {
+        "status": "ok"
+    }
+    response = post_webhook(client, settings, payload, "delivery-1")
+    assert response.json()["message"] == "Duplicate delivery"
+    assert handle_issue_comment.call_count == 1
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.event == "issue_comment"
+    assert delivery.status == WebhookDelivery.PROCESSED
+
+
+@pytest.mark.django_db
+@patch("webhooks.dispatch.handle_issue_comment")
+def test_failed_deliveries_can_be_redelivered(handle_issue_comment, client, settings):
+    handle_issue_comment.side_effect = [
+        ValueError("boom"),
+        JsonResponse({"status": "ok"}),
+    ]
+    payload = {"action": "created"}
+
+    with pytest.raises(ValueError):
+        post_webhook(client, settings, payload, "delivery-1")
+    assert not WebhookDelivery.objects.exists()
+    assert post_webhook(client, settings, payload, "delivery-1").json() == {
+        "status": "ok"
+    }
+
+
+@pytest.mark.django_db
+@patch("webhooks.handlers.handle_issue_comment.Github")
+def test_comments_with_a_task_are_ignored(mock_github, task):
+    payload = {
+        "comment": {
+            "user": {"login": task.github_user},
+            "id": task.comment_id,
+            "html_url": "https://github.com",
+            "body": "/pilot do it",
+        },
+        "issue": {"number": 1},
+        "repository": {"full_name": task.github_project, "private": True},
+        "installation": {"id": 1},
+    }
+    response = handle_issue_comment(payload)
+
+    assert json.loads(response.content)["message"] == "Duplicate comment"
+    mock_github.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_create_comment_task_only_once(task):
+    assert (
+        create_comment_task(
+            github_project=task.github_project,
+            comment_id=task.comment_id,
+            installation_id=1,
+        )
+        is None
+    )
+    assert Task.objects.count() == 1
+
+
+@pytest.mark.django_db
+@patch("webhooks.views.enqueue_delivery")
+@patch("webhooks.dispatch.handle_issue_comment")
+def test_async_webhooks_are_queued(handle_issue_comment, enqueue, client, settings):
+    settings.WEBHOOK_STRATEGY = "redis"
+    payload = {"action": "created"}
+
+    response = post_webhook(client, settings, payload, "delivery-1")
+
+    assert response.status_code == 202
+    enqueue.assert_called_once_with("delivery-1")
+    handle_issue_comment.assert_not_called()
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.payload == payload
+    assert delivery.status == WebhookDelivery.RECEIVED
+
+
+@pytest.mark.django_db
+@patch("webhooks.dispatch.handle_issue_comment")
+def test_process_delivery_once(handle_issue_comment):
+    WebhookDelivery.objects.create(
+        delivery_id="delivery-1", event="issue_comment", payload={"action": "created"}
+    )
+
+    assert process_delivery("delivery-1")
+    assert not process_delivery("delivery-1")
+    handle_issue_comment.assert_called_once_with({"action": "created"})
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.status == WebhookDelivery.PROCESSED
+    assert delivery.payload is None
+    assert delivery.processed_at
+
+
+@pytest.mark.django_db
+@patch("webhooks.dispatch.handle_issue_comment", side_effect=ValueError("boom"))
+def test_process_delivery_records_failures(handle_issue_comment):
+    WebhookDelivery.objects.create(
+        delivery_id="delivery-1", event="issue_comment", payload={"action": "created"}
+    )
+
+    process_delivery("delivery-1")
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.status == WebhookDelivery.FAILED
+    assert delivery.error == "boom"
+    assert delivery.payload == {"action": "created"}
+
+
+@pytest.mark.django_db
+@patch("webhooks.dispatch.redis.Redis")
+@patch("webhooks.dispatch.handle_issue_comment")
+def test_sweep_processes_stale_deliveries(handle_issue_comment, _):
+    for delivery_id in ["stale", "fresh"]:
+        WebhookDelivery.objects.create(
+            delivery_id=delivery_id,
+            event="issue_comment",
+            payload={"action": "created"},
+        )
+    WebhookDelivery.objects.filter(delivery_id="stale").update(
+        received_at=timezone.now() - timedelta(minutes=5)
+    )
+
+    WebhookConsumer().sweep()
+
+    assert WebhookDelivery.objects.get(delivery_id="stale").status == "processed"
+    assert WebhookDelivery.objects.get(delivery_id="fresh").status == "received"
+
+
+@pytest.mark.django_db
+@patch("webhooks.views.enqueue_delivery")
+def test_redelivery_of_failed_delivery_is_queued_again(enqueue, client, settings):
+    settings.WEBHOOK_STRATEGY = "redis"
+    WebhookDelivery.objects.create(
+        delivery_id="failed",
+        event="issue_comment",
+        payload={"action": "created"},
+        status=WebhookDelivery.FAILED,
+        error="boom",
+    )
+    WebhookDelivery.objects.create(
+        delivery_id="processed",
+        event="issue_comment",
+        status=WebhookDelivery.PROCESSED,
+    )
+
+    assert (
+        post_webhook(client, settings, {"action": "created"}, "failed").status_code
+        == 202
+    )
+    response = post_webhook(client, settings, {"action": "created"}, "processed")
+
+    assert json.loads(response.content)["message"] == "Duplicate delivery"
+    enqueue.assert_called_once_with("failed")
+    delivery = WebhookDelivery.objects.get(delivery_id="failed")
+    assert delivery.status == WebhookDelivery.RECEIVED
+    assert delivery.error == ""
+
+
+@pytest.mark.django_db
+@patch("webhooks.dispatch.redis.Redis")
+@patch("webhooks.dispatch.handle_issue_comment")
+def test_sweep_reclaims_abandoned_deliveries(handle_issue_comment, _, settings):
+    settings.WEBHOOK_PROCESSING_TIMEOUT_SECONDS = 600
+    long_ago = timezone.now() - timedelta(minutes=30)
+    for delivery_id, started_at in [
+        ("abandoned", long_ago),
+        ("running", timezone.now()),
+    ]:
+        WebhookDelivery.objects.create(
+            delivery_id=delivery_id,
+            event="issue_comment",
+            payload={"action": "created"},
+            status=WebhookDelivery.PROCESSING,
+            started_at=started_at,
+        )
+    WebhookDelivery.objects.update(received_at=long_ago)
+
+    WebhookConsumer().sweep()
+
+    handle_issue_comment.assert_called_once()
+    assert WebhookDelivery.objects.get(delivery_id="abandoned").status == "processed"
+    assert WebhookDelivery.objects.get(delivery_id="running").status == "processing"
+
+
+@pytest.mark.django_db
+@patch("webhooks.dispatch.redis.Redis")
+@patch("webhooks.dispatch.handle_issue_comment")
+def test_sweep_skips_deliveries_without_payload(handle_issue_comment, _):
+    WebhookDelivery.objects.create(delivery_id="sync", event="issue_comment")
+    WebhookDelivery.objects.update(received_at=timezone.now() - timedelta(minutes=5))
+
+    WebhookConsumer().sweep()
+
+    handle_issue_comment.assert_not_called()
+    assert WebhookDelivery.objects.get().status == WebhookDelivery.RECEIVED
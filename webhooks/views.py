@@ -2,21 +2,19 @@ import hashlib
 import hmac
 import json
 import logging
+import uuid
 from decimal import Decimal
 
+import redis
 import stripe
 from django.conf import settings
 from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
 from accounts.models import UserBudget
-from webhooks.handlers.app_deletion import handle_app_deletion
-from webhooks.handlers.app_installation import handle_app_installation
-from webhooks.handlers.app_installation_change import handle_app_installation_change
-from webhooks.handlers.handle_issue_comment import handle_issue_comment
-from webhooks.handlers.pull_request_review_comment import (
-    handle_pull_request_review_comment,
-)
+from webhooks.dispatch import dispatch_github_event, enqueue_delivery, record_delivery
+from webhooks.models import WebhookDelivery
 
 logger = logging.getLogger(__name__)
 
@@ -86,30 +84,40 @@ def github_webhook(request):
     if request.method == "POST":
         payload = json.loads(request.body.decode("utf-8"))
         event = request.headers.get("X-GitHub-Event", "ping")  # Get the event type
-
-        if event == "pull_request_review_comment" and payload["action"] == "created":
-            # Handle new pull request review comment here
-            return handle_pull_request_review_comment(payload)
-
-        if event == "issue_comment" and payload["action"] == "created":
-            # Handle new issue comment here
-            return handle_issue_comment(payload)
-
-        elif event == "installation" and payload["action"] == "created":
-            # Handle app installation here
-            return handle_app_installation(payload)
-
-        elif event == "installation" and payload["action"] == "deleted":
-            # Handle app deletion here
-            return handle_app_deletion(payload)
-
-        elif event == "installation_repositories":
-            # The user changed which repositories the app can access, need to update our DB
-            return handle_app_installation_change(payload)
-
-        else:
-            logger.info(f"Received unhandled event: {event}")
-            return JsonResponse({"status": "ignored", "message": "Unhandled event"})
+        delivery_id = request.headers.get("X-GitHub-Delivery")
+
+        if settings.WEBHOOK_STRATEGY == "redis":
+            # Respond right away, GitHub gives up on deliveries after 10 seconds
+            delivery_id = delivery_id or str(uuid.uuid4())
+            if not record_delivery(delivery_id, event, payload):
+                logger.info(f"Ignoring redelivery {delivery_id} of {event} event")
+                return JsonResponse(
+                    {"status": "ignored", "message": "Duplicate delivery"}
+                )
+            try:
+                enqueue_delivery(delivery_id)
+            except redis.RedisError as e:
+                # The consumer picks up deliveries that didn't make it into the queue
+                logger.error(f"Could not queue webhook delivery {delivery_id}: {e}")
+            return JsonResponse(
+                {"status": "accepted", "delivery_id": delivery_id}, status=202
+            )
+
+        if delivery_id and not record_delivery(delivery_id, event):
+            logger.info(f"Ignoring redelivery {delivery_id} of {event} event")
+            return JsonResponse({"status": "ignored", "message": "Duplicate delivery"})
+        try:
+            response = dispatch_github_event(event, payload)
+        except Exception:
+            # Let GitHub redeliver events that we failed to handle
+            if delivery_id:
+                WebhookDelivery.objects.filter(delivery_id=delivery_id).delete()
+            raise
+        if delivery_id:
+            WebhookDelivery.objects.filter(delivery_id=delivery_id).update(
+                status=WebhookDelivery.PROCESSED, processed_at=timezone.now()
+            )
+        return response
 
     else:
         return JsonResponse(